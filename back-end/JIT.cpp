@@ -23,7 +23,24 @@ llvm::Expected<llvm::orc::ThreadSafeModule> llvm::orc::OptimizationTransform::op
 }
 
 llvm::Expected<llvm::orc::ThreadSafeModule&> llvm::orc::OptimizationTransform::operator()(llvm::orc::ThreadSafeModule &TSM) {
-    TSM.withModuleDo([this](llvm::Module &M) {
+    std::unique_ptr<llvm::Module> cached;
+    TSM.withModuleDo([this, &cached](llvm::Module &M) {
+        std::string key;
+        if (this->Cache != nullptr) {
+#ifdef LOG
+            auto start = std::chrono::high_resolution_clock::now();
+#endif
+            cached = this->Cache->getOptimizedModule(M, this->Optimize, key);
+#ifdef LOG
+            auto end = std::chrono::high_resolution_clock::now();
+            auto elapsed = std::chrono::duration<double,std::milli>(end-start).count();
+            print_log_data("Cache", LogType::List, LogPart::BackEnd, M.getModuleIdentifier() + " " + this->Tag +
+                           (cached ? " hit " : " miss ") + std::to_string(elapsed));
+#endif
+            if (cached)
+                return;
+        }
+
         llvm::LoopAnalysisManager lam;
         llvm::FunctionAnalysisManager fam;
         llvm::CGSCCAnalysisManager cgam;
@@ -47,7 +64,12 @@ llvm::Expected<llvm::orc::ThreadSafeModule&> llvm::orc::OptimizationTransform::o
         auto elapsed = std::chrono::duration<double,std::milli>(end-start).count();
         print_log_data(this->Tag, LogType::List, LogPart::BackEnd, M.getModuleIdentifier() + " " + std::to_string(elapsed));
 #endif
+        if (this->Cache != nullptr)
+            this->Cache->notifyModuleOptimized(key, M);
     });
+    // The cached module is in the same context, but it can only replace the module outside of the lock of the context.
+    if (cached)
+        TSM = llvm::orc::ThreadSafeModule(std::move(cached), TSM.getContext());
     return TSM;
 }
 
@@ -63,16 +85,18 @@ llvm::orc::JIT::JIT(std::unique_ptr<llvm::orc::ExecutionSession> ES,
          std::unique_ptr<llvm::orc::RedirectableSymbolManager> RSM,
          std::unique_ptr<llvm::orc::ObjectLinkingLayer> OL,
          llvm::orc::RequestModuleCallback RM,
-         std::string Optimize, std::string ReOptimize)
+         std::string Optimize, std::string ReOptimize,
+         std::unique_ptr<DiskObjectCache> Cache)
         : BaseJIT(std::move(RM)), ExecutionSession(std::move(ES)),
           EPCIU(std::move(EPCIU)), DataLayout(DL),
           Mangle(*this->ExecutionSession, this->DataLayout),
           MainJD(this->ExecutionSession->getJITDylibByName("main")),
           ObjectLayer(std::move(OL)),
+          ObjectCache(std::move(Cache)),
           CompileLayer(
                   std::move(std::make_unique<llvm::orc::IRCompileLayer>(
                           *this->ExecutionSession, *this->ObjectLayer,
-                          cantFail(createCompiler(std::move(JTMB)))
+                          cantFail(createCompiler(std::move(JTMB), this->ObjectCache.get()))
                   ))
           ),
           CompileOnDemandLayer(
@@ -84,7 +108,7 @@ llvm::orc::JIT::JIT(std::unique_ptr<llvm::orc::ExecutionSession> ES,
           ),
           OptimizeLayer(
                   std::move(std::make_unique<llvm::orc::IRTransformLayer>(
-                          *this->ExecutionSession, *this->CompileOnDemandLayer, OptimizationTransform(std::move(Optimize), "Opt")
+                          *this->ExecutionSession, *this->CompileOnDemandLayer, OptimizationTransform(std::move(Optimize), "Opt", this->ObjectCache.get())
                   ))
           ),
           ReOptLayer(
@@ -92,7 +116,7 @@ llvm::orc::JIT::JIT(std::unique_ptr<llvm::orc::ExecutionSession> ES,
                           *this->ExecutionSession, *this->OptimizeLayer, std::move(RSM)
                   ))
           ),
-          ReOptimizationTransform(std::move(ReOptimize), "ReOpt") {
+          ReOptimizationTransform(std::move(ReOptimize), "ReOpt", this->ObjectCache.get()) {
     this->MainJD->addGenerator(
             cantFail(
                     DynamicLibrarySearchGenerator::GetForCurrentProcess(DL.getGlobalPrefix())
@@ -134,6 +158,10 @@ llvm::Expected<std::unique_ptr<llvm::orc::BaseJIT>> llvm::orc::JIT::create(llvm:
     std::string optimize = O1;
     std::string reOptimize = O2;
     uint64_t threshold = ReOptimizeLayer::CallCountThreshold;
+    std::string cache;
+    uint64_t cacheSize = 512 * 1024 * 1024;
+    bool cacheCold = false;
+    uint64_t threads = 0;
     for (const auto& argument : Arguments) {
         auto splitArgument = split_once(argument, '=');
         if (splitArgument[0] == "-opt") {
@@ -146,9 +174,32 @@ llvm::Expected<std::unique_ptr<llvm::orc::BaseJIT>> llvm::orc::JIT::create(llvm:
             PRINT_ERROR(!is_number(splitArgument[1]), "An invalid value was given for the threshold.")
             threshold = std::stoull(splitArgument[1]);
         }
+        else if (splitArgument[0] == "-cache") {
+            PRINT_ERROR(splitArgument[1].empty(), "No directory was given for the cache.")
+            cache = splitArgument[1];
+        }
+        else if (splitArgument[0] == "-cache-size") {
+            PRINT_ERROR(!is_number(splitArgument[1]), "An invalid value was given for the size of the cache.")
+            cacheSize = std::stoull(splitArgument[1]);
+        }
+        else if (splitArgument[0] == "-cache-cold") {
+            cacheCold = true;
+        }
+        else if (splitArgument[0] == "-threads") {
+            PRINT_ERROR(
+                    !is_number(splitArgument[1]) || std::stoull(splitArgument[1]) == 0,
+                    "An invalid value was given for the number of threads."
+            )
+            threads = std::stoull(splitArgument[1]);
+        }
     }
     ReOptimizeLayer::CallCountThreshold = threshold;
-    auto epc = SelfExecutorProcessControl::Create();
+    // Without a number of threads the tasks of the session, such as compiling a module, run in place on the thread
+    // that needs them.
+    std::unique_ptr<TaskDispatcher> dispatcher;
+    if (threads != 0)
+        dispatcher = std::make_unique<ThreadPoolTaskDispatcher>(threads);
+    auto epc = SelfExecutorProcessControl::Create(nullptr, std::move(dispatcher));
     if (!epc)
         return epc.takeError();
 
@@ -171,6 +222,10 @@ llvm::Expected<std::unique_ptr<llvm::orc::BaseJIT>> llvm::orc::JIT::create(llvm:
     if (!dl)
         return dl.takeError();
 
+    std::unique_ptr<DiskObjectCache> objectCache;
+    if (!cache.empty())
+        objectCache = std::make_unique<DiskObjectCache>(cache, jtmb, cacheSize, cacheCold);
+
     std::unique_ptr<jitlink::JITLinkMemoryManager> temp = std::make_unique<jitlink::InProcessMemoryManager>(4096);
     auto ol = createLinkingLayer(*es, temp);
     if (!ol)
@@ -184,7 +239,7 @@ llvm::Expected<std::unique_ptr<llvm::orc::BaseJIT>> llvm::orc::JIT::create(llvm:
     return std::make_unique<JIT>(std::move(es), std::move(*epciu),
                                  std::move(jtmb), std::move(*dl), std::move(*jlrsm),
                                  std::move(*ol), std::move(AddModule),
-                                 optimize, reOptimize);
+                                 optimize, reOptimize, std::move(objectCache));
 }
 
 llvm::Error llvm::orc::JIT::addModule(llvm::orc::ThreadSafeModule ThreadSafeModule) {
@@ -13,6 +13,8 @@
 #include "BaseJIT.h"
 #include "../reOptimize/ReOptimizeLayer.h"
 #include "../reOptimize/JITLinkRedirectableSymbolManager.h"
+#include "../util/DiskObjectCache.h"
+#include "../util/ThreadPoolTaskDispatcher.h"
 #include "../util/Util.h"
 
 namespace llvm {
@@ -24,14 +26,16 @@ namespace llvm {
         private:
             std::string Optimize;
             std::string Tag;
+            DiskObjectCache *Cache;
         public:
             /**
              * The constructor for the optimisations.
              * @param Optimize The pass pipeline.
              * @param Tag The tag to use when logging.
+             * @param Cache The cache for optimized modules, or nullptr to always optimise.
              */
-            explicit OptimizationTransform(std::string Optimize, std::string Tag)
-                : Optimize(std::move(Optimize)), Tag(std::move(Tag)) {}
+            explicit OptimizationTransform(std::string Optimize, std::string Tag, DiskObjectCache *Cache = nullptr)
+                : Optimize(std::move(Optimize)), Tag(std::move(Tag)), Cache(Cache) {}
 
             /**
              * The function to call when optimising.
@@ -58,6 +62,7 @@ namespace llvm {
             std::unique_ptr<llvm::orc::ExecutionSession> ExecutionSession;
             std::unique_ptr<llvm::orc::EPCIndirectionUtils> EPCIU;
             std::unique_ptr<llvm::orc::ObjectLinkingLayer> ObjectLayer;
+            std::unique_ptr<DiskObjectCache> ObjectCache;
             std::unique_ptr<llvm::orc::IRCompileLayer> CompileLayer;
             // We rely on the internal state of COD layer, do the COD layer first, and then the Optimize layer,
             // they can't see if the other has created a library for some implementation, since it is not possible to
@@ -90,6 +95,7 @@ namespace llvm {
              * @param RM The callback used to request more information from the front-end.
              * @param Optimize The string to use indicate the llvm passes to use when optimizing.
              * @param ReOptimize The string to use indicate the llvm passes to use when re-optimizing.
+             * @param Cache The cache for optimized modules and compiled objects, or nullptr to always optimize and compile.
              */
             JIT(std::unique_ptr<llvm::orc::ExecutionSession> ES,
                 std::unique_ptr<llvm::orc::EPCIndirectionUtils> EPCIU,
@@ -98,13 +104,17 @@ namespace llvm {
                 std::unique_ptr<llvm::orc::RedirectableSymbolManager> TSM,
                 std::unique_ptr<llvm::orc::ObjectLinkingLayer> OL,
                 llvm::orc::RequestModuleCallback RM,
-                std::string Optimize, std::string ReOptimize);
+                std::string Optimize, std::string ReOptimize,
+                std::unique_ptr<DiskObjectCache> Cache = nullptr);
             /**
              * The destructor to deallocate resource associated with the JIT.
              */
             ~JIT() override;
             /**
-             * Create the JIT.
+             * Create the JIT. The arguments are -opt and -reopt for the pass pipelines, -threshold for the call count at
+             * which a function is reoptimized, -threads for the number of threads that compile and optimize modules
+             * concurrently, and -cache for the directory of a persistent cache of optimized modules and compiled objects,
+             * with -cache-size for its maximum size in bytes, and -cache-cold to only write to the cache.
              * @param RequestModule The callback that is used by the back-end to request another module from the front-end.
              * @param Arguments The arguments for the back-end.
              * @return An object with either the jit or an error depending on if the lookup was successful.
@@ -0,0 +1,386 @@
+"""
+This module contains an ablation of the optimization pipelines of the JIT, which drops a pass or a group of passes
+from the pipeline of the first compilation or of the reoptimization, and measures the benchmarks again with the
+harness. The change in the time spent in the pipelines, as logged by the JIT under the Opt and ReOpt tags, and the
+change in the rest of the wall clock time are attributed to the dropped passes, which gives a ranking of the passes
+that do not pay for themselves, to find a cheaper pipeline for the first tier.
+"""
+
+import argparse
+import glob
+import math
+import sqlite3
+import typing
+
+from . import analyze
+from . import autotune
+from . import classes
+from . import common
+from . import files
+
+
+PIPELINE_TAGS = {"opt": "Opt", "reopt": "ReOpt"}
+"""
+The tag under which the JIT logs the time spent in the pipeline of each tier.
+"""
+
+Node = typing.Tuple[str, typing.Optional[list]]
+"""
+An element of a pipeline, which is the name of the pass with its parameters, and the nested pipeline of a pass manager
+or adaptor, or None for a single pass.
+"""
+
+
+def parse_pipeline(pipeline: str) -> typing.List[Node]:
+    """
+    Parse a textual pipeline of the new pass manager, such as function<eager-inv>(sroa,early-cse<>),globaldce.
+    :param pipeline: The pipeline.
+    :return: The elements of the pipeline.
+    """
+    def __temp__(position: int) -> typing.Tuple[typing.List[Node], int]:
+        nodes = []
+        while True:
+            start = position
+            depth = 0
+            while position < len(pipeline) and (depth > 0 or pipeline[position] not in ",()"):
+                if pipeline[position] == "<":
+                    depth += 1
+                elif pipeline[position] == ">":
+                    depth -= 1
+                position += 1
+            name = pipeline[start:position]
+            children = None
+            if position < len(pipeline) and pipeline[position] == "(":
+                children, position = __temp__(position + 1)
+                if position >= len(pipeline) or pipeline[position] != ")":
+                    print(f"Unbalanced parentheses in the pipeline at {position}.")
+                    exit(-1)
+                position += 1
+            if name == "":
+                print(f"Empty pass name in the pipeline at {start}.")
+                exit(-1)
+            nodes.append((name, children))
+            if position < len(pipeline) and pipeline[position] == ",":
+                position += 1
+                continue
+            return nodes, position
+
+    result, end = __temp__(0)
+    if end != len(pipeline):
+        print(f"Unexpected {pipeline[end]} in the pipeline at {end}.")
+        exit(-1)
+    return result
+
+
+def format_pipeline(nodes: typing.List[Node]) -> str:
+    """
+    Format the elements of a pipeline back into the textual pipeline.
+    :param nodes: The elements of the pipeline.
+    :return: The pipeline.
+    """
+    return ",".join(map(lambda x: x[0] + (f"({format_pipeline(x[1])})" if x[1] is not None else ""), nodes))
+
+
+def get_pass_name(name: str) -> str:
+    """
+    Get the name of a pass without its parameters.
+    :param name: The name of the pass with its parameters.
+    :return: The name of the pass.
+    """
+    return name.split("<", 1)[0]
+
+
+def get_elements(nodes: typing.List[Node], depth: int) -> typing.List[typing.Tuple[typing.Tuple[int, ...], str]]:
+    """
+    Get the elements of a pipeline that can be dropped, up to a nesting depth. A pass manager or adaptor is dropped
+    together with its nested pipeline.
+    :param nodes: The elements of the pipeline.
+    :param depth: The maximum nesting depth, where 1 is the top level.
+    :return: The path of indices of each element, with a label that is the path of pass names, where a repeated pass
+    name within the same pipeline gets the number of its occurrence.
+    """
+    elements = []
+
+    def __temp__(current: typing.List[Node], path: typing.Tuple[int, ...], label: str, level: int):
+        names = list(map(lambda x: get_pass_name(x[0]), current))
+        for i, (_, children) in enumerate(current):
+            name = names[i]
+            if names.count(name) > 1:
+                name += f"#{names[:i].count(name) + 1}"
+            elements.append((path + (i,), label + name))
+            if children is not None and level < depth:
+                __temp__(children, path + (i,), label + name + "/", level + 1)
+
+    __temp__(nodes, (), "", 1)
+    return elements
+
+
+def remove(nodes: typing.List[Node], drop: typing.Callable[[typing.Tuple[int, ...], str], bool], path: typing.Tuple[int, ...] = ()) -> typing.List[Node]:
+    """
+    Remove elements from a pipeline, where a pass manager or adaptor whose nested pipeline becomes empty is removed as
+    well.
+    :param nodes: The elements of the pipeline.
+    :param drop: If an element should be removed, given its path of indices and its name.
+    :param path: The path of indices of the pipeline itself.
+    :return: The elements that are left.
+    """
+    result = []
+    for i, (name, children) in enumerate(nodes):
+        if drop(path + (i,), name):
+            continue
+        if children is not None:
+            left = remove(children, drop, path + (i,))
+            if len(children) != 0 and len(left) == 0:
+                continue
+            result.append((name, left))
+        else:
+            result.append((name, None))
+    return result
+
+
+def split_args(args: str) -> typing.Tuple[typing.Dict[str, str], typing.List[str]]:
+    """
+    Split the arguments of the back-end into the pipelines of both tiers and the other arguments.
+    :param args: The arguments of the back-end.
+    :return: The pipeline of each tier that is given, keyed on opt or reopt, and the other arguments.
+    """
+    pipelines = {}
+    rest = []
+    for arg in args.split():
+        key, _, value = arg.partition("=")
+        if key in ["-opt", "-reopt"]:
+            pipelines[key[1:]] = value
+        else:
+            rest.append(arg)
+    return pipelines, rest
+
+
+def get_candidates(
+        base: classes.Args,
+        tier: str,
+        mode: str,
+        depth: int
+) -> typing.List[typing.Tuple[str, classes.Args]]:
+    """
+    Get the candidate arguments, which are the base arguments with a pass or a group of passes dropped from the
+    pipeline of a tier.
+    :param base: The base arguments, which should give the pipeline of the tier.
+    :param tier: Either opt for the first compilation or reopt for the reoptimization.
+    :param mode: Either element to drop a single element of the pipeline, or name to drop every occurrence of a pass.
+    :param depth: The maximum nesting depth of the elements that are dropped, only used for the element mode.
+    :return: The label of what is dropped with the arguments of each candidate.
+    """
+    pipelines, rest = split_args(base.args)
+    if tier not in pipelines:
+        print(f"The arguments {base.name} do not give the -{tier} pipeline.")
+        exit(-1)
+    nodes = parse_pipeline(pipelines[tier])
+    if mode == "element":
+        removals = [(label, (lambda p: lambda x, _: x == p)(path)) for path, label in get_elements(nodes, depth)]
+    else:
+        names = []
+
+        def __temp__(current: typing.List[Node]):
+            for name, children in current:
+                if children is None and get_pass_name(name) not in names:
+                    names.append(get_pass_name(name))
+                elif children is not None:
+                    __temp__(children)
+
+        __temp__(nodes)
+        removals = [(name, (lambda n: lambda _, x: get_pass_name(x) == n)(name)) for name in names]
+    candidates = []
+    for label, drop in removals:
+        left = remove(nodes, drop)
+        if len(left) == 0:
+            continue
+        changed = dict(pipelines)
+        changed[tier] = format_pipeline(left)
+        args = " ".join(rest + [f"-{key}={value}" for key, value in changed.items()])
+        candidates.append((label, classes.Args(f"{base.name}-{tier}-ablate-{len(candidates)}", args)))
+    return candidates
+
+
+def get_pipeline_times(run_id: int) -> typing.Dict[int, float]:
+    """
+    Get the time spent in the optimization pipelines by each run of the JIT of a run of the harness.
+    :param run_id: The id of the run of the harness.
+    :return: The time in milliseconds of both tiers together, keyed on the id of the result.
+    """
+    c = sqlite3.connect(files.get_results_file())
+    rows = c.execute(
+        "SELECT t.result_id, t.value FROM telemetry t JOIN results r ON r.id = t.result_id "
+        "WHERE r.run_id = ? AND t.part = ? AND t.tag IN (?, ?)",
+        (run_id, classes.LogPart.BackEnd.name, PIPELINE_TAGS["opt"], PIPELINE_TAGS["reopt"])
+    ).fetchall()
+    c.close()
+    times: typing.Dict[int, float] = {}
+    for result_id, value in rows:
+        for entry in value.split(","):
+            data = entry.split("\\", 1)[-1].rsplit(" ", 1)
+            try:
+                times[result_id] = times.get(result_id, 0.0) + float(data[-1])
+            except ValueError:
+                continue
+    return times
+
+
+def get_affected(run_id: int, tier: str) -> typing.List[str]:
+    """
+    Get the benchmarks that run the pipeline of a tier at all, since dropping passes from a pipeline that is never
+    run can not change anything.
+    :param run_id: The id of the run of the harness with the base arguments.
+    :param tier: Either opt or reopt.
+    :return: The affected benchmarks as suite/benchmark.
+    """
+    c = sqlite3.connect(files.get_results_file())
+    rows = c.execute(
+        "SELECT DISTINCT r.suite, r.benchmark FROM telemetry t JOIN results r ON r.id = t.result_id "
+        "WHERE r.run_id = ? AND t.part = ? AND t.tag = ? ORDER BY r.suite, r.benchmark",
+        (run_id, classes.LogPart.BackEnd.name, PIPELINE_TAGS[tier])
+    ).fetchall()
+    c.close()
+    return list(map(lambda x: f"{x[0]}/{x[1]}", rows))
+
+
+def measure(run_id: int) -> typing.Dict[typing.Tuple[str, str, str], typing.Tuple[float, float, bool]]:
+    """
+    Summarize the runs of the JIT of a run of the harness.
+    :param run_id: The id of the run of the harness.
+    :return: The mean wall clock time and the mean time spent in the pipelines in milliseconds, and if any run failed,
+    keyed on the suite, benchmark, and name of the back-end arguments.
+    """
+    times = get_pipeline_times(run_id)
+    runs: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.Tuple[float, float, int]]] = {}
+    for result_id, suite, benchmark, name, wall_ns, returncode in autotune.get_runs(run_id):
+        runs.setdefault((suite, benchmark, name), []).append((wall_ns / 1_000_000, times.get(result_id, 0.0), returncode))
+    return {
+        key: (sum(map(lambda x: x[0], values)) / len(values), sum(map(lambda x: x[1], values)) / len(values),
+              any(map(lambda x: x[2] != 0, values)))
+        for key, values in runs.items()
+    }
+
+
+def attribute(
+        base: typing.Dict[typing.Tuple[str, str], typing.Tuple[float, float, bool]],
+        candidate: typing.Dict[typing.Tuple[str, str], typing.Tuple[float, float, bool]]
+) -> typing.Tuple[typing.List[typing.List[typing.Any]], typing.Optional[typing.List[typing.Any]]]:
+    """
+    Attribute the change from the base arguments to a candidate to the dropped passes. The compile cost of the passes is
+    the time in the pipelines they save when dropped, and their runtime benefit is the rest of the wall clock time they
+    save when kept, so that the net benefit is negative when the passes do not pay for themselves.
+    :param base: The summary of the base arguments for each benchmark, see measure.
+    :param candidate: The summary of the candidate for each benchmark, see measure.
+    :return: For each benchmark the suite, benchmark, compile cost, runtime benefit, and net benefit in milliseconds,
+    and the totals over the benchmarks with the geometric mean of the relative change in wall clock time when the
+    passes are dropped, the number of benchmarks where dropping them is faster, and the number of benchmarks, or None if
+    a run failed.
+    """
+    rows = []
+    log_ratio = 0.0
+    wins = 0
+    for (suite, benchmark), (base_wall, base_compile, base_failed) in sorted(base.items()):
+        if base_failed or (suite, benchmark) not in candidate:
+            continue
+        wall, compile_time, failed = candidate[(suite, benchmark)]
+        if failed:
+            return rows, None
+        cost = base_compile - compile_time
+        benefit = (wall - compile_time) - (base_wall - base_compile)
+        rows.append([suite, benchmark, cost, benefit, benefit - cost])
+        log_ratio += math.log(wall / base_wall) if wall > 0 and base_wall > 0 else 0.0
+        wins += wall < base_wall
+    if len(rows) == 0:
+        return rows, None
+    return rows, [
+        sum(map(lambda x: x[2], rows)),
+        sum(map(lambda x: x[3], rows)),
+        sum(map(lambda x: x[4], rows)),
+        math.exp(log_ratio / len(rows)) - 1,
+        wins,
+        len(rows)
+    ]
+
+
+def main():
+    """
+    The main function for the ablation of the optimization pipelines of the JIT.
+    """
+    parser = argparse.ArgumentParser(
+        prog="ablation",
+        description="Rank the passes of an optimization pipeline of the JIT by their compile cost and runtime benefit."
+    )
+    parser.add_argument("-j", required=True, help="The jit to use.")
+    parser.add_argument("-f", required=True, help="The front-end of the benchmarks.")
+    parser.add_argument("-b", required=True, help="The back-end that is used in the jit.")
+    parser.add_argument("--base", required=True, help="The name of the arguments of the back-end to start from.")
+    parser.add_argument("--args-file", help="A file with the arguments to start from instead of the standard ones, see the autotuner.")
+    parser.add_argument("--tier", choices=["opt", "reopt"], default="opt",
+                        help="The pipeline to drop passes from, of the first compilation or of the reoptimization.")
+    parser.add_argument("--mode", choices=["element", "name"], default="element",
+                        help="If single elements of the pipeline are dropped, or every occurrence of a pass.")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="The maximum nesting depth of the elements that are dropped, where 1 is the top level.")
+    parser.add_argument("--benchmarks", nargs="+", default=["*"],
+                        help="The patterns of the benchmarks to measure, given as suite/benchmark.")
+    parser.add_argument("--samples", type=int, default=5,
+                        help="The number of compilations of each benchmark for each candidate.")
+    parser.add_argument("-p", type=int, default=1, help="The number of workers of the harness.")
+    parser.add_argument("--cache", action="store_true", help="If the harness should reuse compiled benchmarks.")
+    parser.add_argument("-o", help="The csv file to write the change of each candidate on each benchmark to.")
+    args = parser.parse_args()
+    if not common.valid_back_end(args.b):
+        print("Invalid back-end given.")
+        exit(-1)
+    if args.depth < 1 or args.samples < 1:
+        print("The depth and the number of samples should be at least 1.")
+        exit(-1)
+    standard = common.load_args_file(args.args_file) if args.args_file is not None else common.back_end_args(args.b)
+    matching = [x for x in standard if x.name == args.base]
+    if len(matching) == 0:
+        print(f"There are no arguments named {args.base}.")
+        exit(-1)
+    base = matching[0]
+    candidates = get_candidates(base, args.tier, args.mode, args.depth)
+    if len(candidates) == 0:
+        print("There is nothing to drop from the pipeline.")
+        exit(-1)
+
+    print(f"measuring the base arguments {base.name}")
+    base_run = autotune.run_harness(args, [base], args.benchmarks, args.samples)
+    affected = get_affected(base_run, args.tier)
+    if len(affected) == 0:
+        print(f"No benchmark runs the -{args.tier} pipeline.")
+        exit(-1)
+    print(f"measuring {len(candidates)} candidates on {len(affected)} benchmarks")
+    run = autotune.run_harness(args, list(map(lambda x: x[1], candidates)), list(map(glob.escape, affected)), args.samples)
+    base_summary = {(suite, benchmark): value for (suite, benchmark, _), value in measure(base_run).items()
+                    if f"{suite}/{benchmark}" in affected}
+    summary = measure(run)
+
+    ranking = []
+    benchmark_rows = []
+    for label, candidate in candidates:
+        rows, total = attribute(base_summary, {(suite, benchmark): value for (suite, benchmark, name), value in summary.items()
+                                               if name == candidate.name})
+        benchmark_rows += [[label, candidate.name] + row for row in rows]
+        ranking.append((label, candidate, total))
+    ranking.sort(key=lambda x: (x[2] is None, x[2][3] if x[2] is not None else 0.0))
+    for i, (label, candidate, total) in enumerate(ranking):
+        if total is None:
+            print(f"{i + 1}. {label} ({candidate.name}): failed")
+            continue
+        cost, benefit, net, change, wins, count = total
+        print(f"{i + 1}. {label} ({candidate.name}): compile cost {cost:.3f} ms, runtime benefit {benefit:.3f} ms, "
+              f"net {net:.3f} ms, {change * 100:+.2f}% wall clock time when dropped, faster on {wins} of "
+              f"{count} benchmarks")
+    if args.o is not None:
+        with open(args.o, "w", newline="") as f:
+            analyze.write_rows(f, ["dropped", "name", "suite", "benchmark", "compile_cost_ms", "runtime_benefit_ms",
+                                   "net_benefit_ms"], benchmark_rows)
+    if len(ranking) != 0 and ranking[0][2] is not None and ranking[0][2][3] < 0:
+        print(f"classes.Args(\"{ranking[0][1].name}\", \"{ranking[0][1].args}\")")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+This module contains the analysis of the results of the benchmarks, which computes the speedup of each configuration of
+the JIT over the reference implementation per benchmark, and the geometric mean of the speedups per suite, with
+bootstrap confidence intervals. The results can be read from the time data csv files or from the results database.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import typing
+
+import numpy as np
+
+from . import files
+from . import results
+
+
+REFERENCE = "reference"
+"""
+The name of the configuration of the reference implementation.
+"""
+
+
+def get_config_name(front_end: str, back_end: str) -> str:
+    """
+    Get the name of a configuration of the JIT, which is the name of the back-end arguments, prefixed by the name of the
+    front-end arguments if there are any.
+    :param front_end: The name of the front-end arguments.
+    :param back_end: The name of the back-end arguments.
+    :return: The name of the configuration.
+    """
+    return back_end if front_end in ("", "None") else f"{front_end}/{back_end}"
+
+
+def split_name(name: str) -> typing.Tuple[str, str]:
+    """
+    Split the name of a row in the csv files in the suite, which are the first two parts of the path, and the benchmark.
+    :param name: The name of the row, without the name of the configuration.
+    :return: The suite and the benchmark.
+    """
+    parts = name.split("/", 2)
+    if len(parts) < 3:
+        return "/".join(parts[:-1]), parts[-1]
+    return parts[0] + "/" + parts[1], parts[2]
+
+
+def get_run_width(row: typing.List[str], start: int) -> int:
+    """
+    Detect how many columns there are for each run in a row of the time data of the reference implementation. The
+    current format has nine columns starting with the wall clock time and the exit code, followed by the user time in
+    nanoseconds, while the older format only has the wall clock time and the exit code.
+    :param row: The row.
+    :param start: The column of the first run.
+    :return: The number of columns for each run.
+    """
+    values = len(row) - start
+    if values % 9 == 0 and values >= 9 and "." not in row[start + 2]:
+        return 9
+    return 2
+
+
+def read_time_data(time_data_file: str) -> typing.Tuple[typing.List[str], typing.List[str], typing.List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read a csv file with time data, either in the current format or in the older format with only the wall clock time
+    and exit code for each run. The rows of the JIT are recognized by the front-end and back-end arguments, which are
+    repeated for each run.
+    :param time_data_file: The csv file.
+    :return: The suite, benchmark, and configuration of each row, the wall clock times and exit codes of all runs, and
+    the number of runs of each row.
+    """
+    suites = []
+    benchmarks = []
+    configs = []
+    times = []
+    codes = []
+    with open(time_data_file, "r", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            if row[1].startswith("front-end "):
+                name = row[0].rsplit(" ", 1)[0]
+                runs = row.count(row[1])
+                stride = (len(row) - 1) // runs
+                start = 3
+                front_end = row[1].removeprefix("front-end ").split(":", 1)[0]
+                back_end = row[2].removeprefix("back-end ").split(":", 1)[0]
+                config = get_config_name(front_end, back_end)
+            else:
+                name = row[0]
+                stride = get_run_width(row, 1)
+                start = 1
+                config = REFERENCE
+            suite, benchmark = split_name(name)
+            suites.append(suite)
+            benchmarks.append(benchmark)
+            configs.append(config)
+            times.append(np.array(row[start::stride], dtype=float))
+            codes.append(np.array(row[start + 1::stride], dtype=float))
+    return suites, benchmarks, configs, np.concatenate(times) if times else np.empty(0), np.concatenate(codes) if codes else np.empty(0), np.array(list(map(len, times)), dtype=np.int64)
+
+
+def load_time_data(time_data_files: typing.List[str]) -> typing.Dict[str, np.ndarray]:
+    """
+    Load the runs from time data csv files, see read_time_data.
+    :param time_data_files: The csv files.
+    :return: The suite, benchmark, configuration, wall clock time in milliseconds, and exit code of each run.
+    """
+    columns: typing.Dict[str, typing.List[np.ndarray]] = {"suite": [], "benchmark": [], "config": [], "wall_ms": [], "returncode": []}
+    for time_data_file in time_data_files:
+        suites, benchmarks, configs, times, codes, counts = read_time_data(time_data_file)
+        columns["suite"].append(np.repeat(np.array(suites, dtype=object), counts))
+        columns["benchmark"].append(np.repeat(np.array(benchmarks, dtype=object), counts))
+        columns["config"].append(np.repeat(np.array(configs, dtype=object), counts))
+        columns["wall_ms"].append(times)
+        columns["returncode"].append(codes)
+    return {k: np.concatenate(v) for k, v in columns.items()}
+
+
+def load_csv(jit_file: str, reference_file: str) -> typing.Dict[str, np.ndarray]:
+    """
+    Load the runs from the time data csv files of the JIT and the reference implementation.
+    :param jit_file: The csv file with the time data of the JIT.
+    :param reference_file: The csv file with the time data of the reference implementation.
+    :return: The runs, see load_time_data.
+    """
+    return load_time_data([jit_file, reference_file])
+
+
+def load_database(database_file: str, run: typing.Optional[int]) -> typing.Dict[str, np.ndarray]:
+    """
+    Load the runs from the results database.
+    :param database_file: The database.
+    :param run: The id of the run of the harness to load, or None for the most recent run.
+    :return: The suite, benchmark, configuration, wall clock time in milliseconds, and exit code of each run.
+    """
+    c = results.connect(database_file)
+    if run is None:
+        run = results.get_latest_run(c)
+    rows = c.execute(
+        "SELECT suite, benchmark, component, front_end, back_end, wall_ns, returncode FROM results WHERE run_id = ?",
+        (run,)
+    ).fetchall()
+    c.close()
+    if len(rows) == 0:
+        print("There are no results for the run.")
+        exit(-1)
+    suite, benchmark, component, front_end, back_end = map(lambda x: np.array(x, dtype=str), list(zip(*rows))[:5])
+    wall_ns, returncode = map(lambda x: np.array(x, dtype=float), list(zip(*rows))[5:])
+    front_end = np.where(np.isin(front_end, ["", "None"]), "", np.char.add(front_end, "/"))
+    config = np.where(component == "jit", np.char.add(front_end, back_end), REFERENCE)
+    return {
+        "suite": suite.astype(object),
+        "benchmark": benchmark.astype(object),
+        "config": config.astype(object),
+        "wall_ms": wall_ns / 1_000_000,
+        "returncode": returncode
+    }
+
+
+def group(keys: typing.List[np.ndarray]) -> typing.Tuple[typing.List[np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group rows on the combination of multiple keys.
+    :param keys: The keys of each row.
+    :return: The keys of each group, the order of the rows that places the rows of a group next to each other, and the
+    start and size of each group in that order.
+    """
+    codes = []
+    for key in keys:
+        codes.append(np.unique(key.astype(str), return_inverse=True)[1].reshape(-1))
+    combined = np.ravel_multi_index(codes, [int(c.max()) + 1 if c.size else 1 for c in codes])
+    _, first, inverse, sizes = np.unique(combined, return_index=True, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return [key[first] for key in keys], order, starts, sizes
+
+
+def bootstrap_means(values: np.ndarray, starts: np.ndarray, sizes: np.ndarray, resamples: int, rng: np.random.Generator, chunk: int = 1 << 22) -> np.ndarray:
+    """
+    Compute the mean of each group of values for bootstrap resamples, where each group is resampled with replacement.
+    All groups are resampled at once, by drawing for every value of a resample an index within its own group, and the
+    resamples are computed in chunks so that the memory used does not grow with the number of resamples.
+    :param values: The values, where the values of a group are next to each other.
+    :param starts: The start of each group.
+    :param sizes: The size of each group.
+    :param resamples: The number of resamples.
+    :param rng: The random number generator.
+    :param chunk: The maximum number of resampled values that are computed at the same time.
+    :return: The mean of each group for each resample.
+    """
+    result = np.empty((resamples, len(sizes)))
+    if values.size == 0:
+        return result
+    group_of = np.repeat(np.arange(len(sizes)), sizes)
+    offsets = starts[group_of]
+    lengths = sizes[group_of]
+    step = max(1, chunk // values.size)
+    for first in range(0, resamples, step):
+        count = min(step, resamples - first)
+        indices = offsets + rng.integers(0, lengths, size=(count, values.size))
+        result[first:first + count] = np.add.reduceat(values[indices], starts, axis=1) / sizes
+    return result
+
+
+def analyze(runs: typing.Dict[str, np.ndarray], resamples: int, seed: int) -> typing.Tuple[typing.List[typing.List[typing.Any]], typing.List[typing.List[typing.Any]]]:
+    """
+    Compute the speedup of each configuration of the JIT over the reference implementation per benchmark, and the
+    geometric mean of the speedups per suite, with 95% bootstrap confidence intervals. Runs that failed are ignored.
+    :param runs: The runs, see load_csv.
+    :param resamples: The number of bootstrap resamples.
+    :param seed: The seed of the random number generator for the bootstrap.
+    :return: The rows for the speedups per benchmark, and the rows for the geometric means per suite.
+    """
+    valid = (runs["returncode"] == 0) & (runs["wall_ms"] > 0)
+    runs = {k: v[valid] for k, v in runs.items()}
+    (suites, benchmarks, configs), order, starts, sizes = group([runs["suite"], runs["benchmark"], runs["config"]])
+    values = runs["wall_ms"][order]
+    means = np.add.reduceat(values, starts) / sizes
+    samples = bootstrap_means(values, starts, sizes, resamples, np.random.default_rng(seed))
+
+    benchmark_keys = np.char.add(np.char.add(suites.astype(str), "\0"), benchmarks.astype(str))
+    is_reference = configs == REFERENCE
+    reference_of = dict(zip(benchmark_keys[is_reference], np.flatnonzero(is_reference)))
+    jit_groups = np.flatnonzero(~is_reference & np.isin(benchmark_keys, list(reference_of.keys())))
+    reference_groups = np.array([reference_of[k] for k in benchmark_keys[jit_groups]], dtype=np.int64)
+    if len(jit_groups) == 0:
+        return [], []
+
+    speedups = means[reference_groups] / means[jit_groups]
+    bootstrap_speedups = samples[:, reference_groups] / samples[:, jit_groups]
+    low, high = np.percentile(bootstrap_speedups, [2.5, 97.5], axis=0)
+    benchmark_rows = list(map(list, zip(
+        suites[jit_groups], benchmarks[jit_groups], configs[jit_groups], means[reference_groups], means[jit_groups],
+        speedups, low, high, sizes[reference_groups], sizes[jit_groups]
+    )))
+
+    (suite_names, suite_configs), suite_order, suite_starts, suite_sizes = group([suites[jit_groups], configs[jit_groups]])
+    log_speedups = np.log(speedups[suite_order])
+    geometric_means = np.exp(np.add.reduceat(log_speedups, suite_starts) / suite_sizes)
+    bootstrap_log = np.log(bootstrap_speedups[:, suite_order])
+    bootstrap_geometric = np.exp(np.add.reduceat(bootstrap_log, suite_starts, axis=1) / suite_sizes)
+    suite_low, suite_high = np.percentile(bootstrap_geometric, [2.5, 97.5], axis=0)
+    suite_rows = list(map(list, zip(suite_names, suite_configs, geometric_means, suite_low, suite_high, suite_sizes)))
+    return benchmark_rows, suite_rows
+
+
+def write_rows(output: typing.TextIO, header: typing.List[str], rows: typing.List[typing.List[typing.Any]]) -> None:
+    """
+    Write rows as csv.
+    :param output: Where to write the rows to.
+    :param header: The names of the columns.
+    :param rows: The rows.
+    """
+    writer = csv.writer(output)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+
+def main():
+    """
+    The main function to analyze the results of the benchmarks.
+    """
+    parser = argparse.ArgumentParser(
+        prog="analyze",
+        description="Compute the speedups of the JIT over the reference implementation with bootstrap confidence intervals."
+    )
+    parser.add_argument("-j", help="The csv file with the time data of the JIT.")
+    parser.add_argument("-r", help="The csv file with the time data of the reference implementation.")
+    parser.add_argument("-d", nargs="?", const=files.get_results_file(),
+                        help="Read from the results database instead of csv files, the default is the database in the data directory.")
+    parser.add_argument("--run", type=int, help="The run in the database to analyze, the default is the most recent run.")
+    parser.add_argument("-n", type=int, default=1000, help="The number of bootstrap resamples.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed for the bootstrap resamples.")
+    parser.add_argument("-o", help="The directory to write speedups.csv and suites.csv to, the default is the console.")
+    args = parser.parse_args()
+    if args.d is not None:
+        runs = load_database(args.d, args.run)
+    elif args.j is not None and args.r is not None:
+        runs = load_csv(args.j, args.r)
+    else:
+        print("Either a database or the time data of both the JIT and the reference implementation is needed.")
+        exit(-1)
+    benchmark_rows, suite_rows = analyze(runs, args.n, args.seed)
+    benchmark_header = ["suite", "benchmark", "config", "reference ms", "jit ms", "speedup", "low", "high", "reference runs", "jit runs"]
+    suite_header = ["suite", "config", "geometric mean speedup", "low", "high", "benchmarks"]
+    if args.o is None:
+        write_rows(sys.stdout, benchmark_header, benchmark_rows)
+        print()
+        write_rows(sys.stdout, suite_header, suite_rows)
+        return
+    os.makedirs(args.o, exist_ok=True)
+    with open(os.path.join(args.o, "speedups.csv"), "w", newline="") as f:
+        write_rows(f, benchmark_header, benchmark_rows)
+    with open(os.path.join(args.o, "suites.csv"), "w", newline="") as f:
+        write_rows(f, suite_header, suite_rows)
+
+
+if __name__ == '__main__':
+    main()
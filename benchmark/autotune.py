@@ -0,0 +1,246 @@
+"""
+This module contains an autotuner for the tiering of the JIT, which searches the call count threshold of the
+ReOptimizeLayer and the pair of optimization pipelines for the first compilation and the reoptimization. The candidates
+are measured with the harness itself, and narrowed down with successive halving, where the budget of runs is split
+evenly over the rounds, and only the best fraction of the candidates of a round is measured again in the next round.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import typing
+
+from . import classes
+from . import common
+from . import files
+from . import results
+
+
+def get_candidates(back_end: str, pipelines: typing.Optional[typing.List[str]], thresholds: typing.List[int]) -> typing.List[classes.Args]:
+    """
+    Get the candidate arguments for the back-end, which are each combination of a pair of pipelines from the standard
+    arguments of the back-end with a threshold.
+    :param back_end: The name of the back-end.
+    :param pipelines: The names of the standard arguments to use, or None to use all of them.
+    :param thresholds: The call count thresholds.
+    :return: The candidates.
+    """
+    standard = common.back_end_args(back_end)
+    if pipelines is not None:
+        missing = [name for name in pipelines if name not in map(lambda x: x.name, standard)]
+        if len(missing) != 0:
+            print(f"The back-end {back_end} has no arguments named {', '.join(missing)}.")
+            exit(-1)
+        standard = [args for args in standard if args.name in pipelines]
+    return [classes.Args(f"{args.name}-t{threshold}", f"{args.args} -threshold={threshold}")
+            for args in standard for threshold in thresholds]
+
+
+def get_unit(suite: str, benchmark: str, group_by: str) -> str:
+    """
+    Get the unit that is tuned separately that a benchmark belongs to.
+    :param suite: The suite of the benchmark.
+    :param benchmark: The benchmark.
+    :param group_by: Either benchmark to tune each benchmark separately, or suite to tune each suite.
+    :return: The name of the unit.
+    """
+    return f"{suite}/{benchmark}" if group_by == "benchmark" else suite
+
+
+def get_patterns(units: typing.List[str], group_by: str) -> typing.List[str]:
+    """
+    Get the patterns that select the benchmarks of units in the harness, see common.select_sources.
+    :param units: The units.
+    :param group_by: How the benchmarks are grouped into units, see get_unit.
+    :return: The patterns.
+    """
+    return [glob.escape(unit) + ("" if group_by == "benchmark" else "/*") for unit in units]
+
+
+def run_harness(
+        args: typing.Any,
+        candidates: typing.List[classes.Args],
+        patterns: typing.List[str],
+        samples: int
+) -> int:
+    """
+    Measure candidates with the harness, where each benchmark is compiled and run the given number of times for each
+    candidate. The harness is run as a separate process, which stores its results in the results database.
+    :param args: The arguments of the tool, with the front-end, JIT, back-end, number of workers, and if the cache is used.
+    :param candidates: The candidates to measure.
+    :param patterns: The patterns of the benchmarks to measure the candidates on.
+    :param samples: The number of compilations of each benchmark for each candidate, with a single run each.
+    :return: The id of the run of the harness in the results database.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(list(map(lambda x: {"name": x.name, "args": x.args}, candidates)), f)
+        args_file = f.name
+    command = ([sys.executable, "-m", "benchmark.run", "-f", args.f, "-j", args.j, "-b", args.b, "-s",
+                "--adaptive", "--precision", "0", "--min-samples", str(samples), "--max-samples", str(samples),
+                "--args-file", args_file, "--benchmarks"] + patterns +
+               (["-p", str(args.p)] if args.p != 1 else []) +
+               (["--cache"] if args.cache else []))
+    process = subprocess.run(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.remove(args_file)
+    if process.returncode != 0:
+        print(f"The harness failed with exit code {process.returncode}.")
+        exit(-1)
+    c = sqlite3.connect(files.get_results_file())
+    run_id = results.get_latest_run(c)
+    c.close()
+    return run_id
+
+
+def get_runs(run_id: int) -> typing.List[typing.Tuple[int, str, str, str, int, int]]:
+    """
+    Get the runs of the JIT of a run of the harness.
+    :param run_id: The id of the run of the harness.
+    :return: The id, suite, benchmark, name of the back-end arguments, wall clock time in nanoseconds, and exit code of
+    each run.
+    """
+    c = sqlite3.connect(files.get_results_file())
+    rows = c.execute(
+        "SELECT id, suite, benchmark, back_end, wall_ns, returncode FROM results WHERE run_id = ? AND component = 'jit' "
+        "ORDER BY id",
+        (run_id,)
+    ).fetchall()
+    c.close()
+    return rows
+
+
+def get_scores(
+        measurements: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.Tuple[int, int]]],
+        unit: str,
+        candidates: typing.List[str],
+        group_by: str
+) -> typing.Dict[str, float]:
+    """
+    Score the candidates of a unit on all runs so far, which is the geometric mean over the benchmarks of the unit of
+    the mean wall clock time. A candidate with a failed run on any benchmark of the unit is never chosen.
+    :param measurements: The wall clock time in nanoseconds and exit code of each run, keyed on the suite, benchmark,
+    and name of the candidate.
+    :param unit: The unit.
+    :param candidates: The names of the candidates.
+    :param group_by: How the benchmarks are grouped into units, see get_unit.
+    :return: The score of each candidate, lower is better.
+    """
+    benchmarks = set((suite, benchmark) for suite, benchmark, _ in measurements
+                     if get_unit(suite, benchmark, group_by) == unit)
+    scores = {}
+    for candidate in candidates:
+        total = 0.0
+        for suite, benchmark in benchmarks:
+            runs = measurements.get((suite, benchmark, candidate), [])
+            if len(runs) == 0 or any(map(lambda x: x[1] != 0, runs)):
+                total = math.inf
+                break
+            total += math.log(sum(map(lambda x: x[0], runs)) / len(runs))
+        scores[candidate] = math.exp(total / len(benchmarks)) if len(benchmarks) != 0 and total != math.inf else math.inf
+    return scores
+
+
+def tune(args: typing.Any, candidates: typing.List[classes.Args]) -> typing.Dict[str, typing.Tuple[classes.Args, float]]:
+    """
+    Tune each unit with successive halving. Every round the budget of runs per benchmark is split evenly over the
+    candidates that are left, which are then measured together with the harness, grouping the units that have the same
+    candidates left into a single run of the harness. The best 1/eta of the candidates of each unit go to the next
+    round, until a single candidate is left.
+    :param args: The arguments of the autotuner.
+    :param candidates: The candidates.
+    :return: The best candidate of each unit with its mean wall clock time in milliseconds.
+    """
+    by_name = {candidate.name: candidate for candidate in candidates}
+    rounds = max(1, math.ceil(math.log(len(candidates), args.eta))) if len(candidates) > 1 else 1
+    measurements: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.Tuple[int, int]]] = {}
+    left: typing.Dict[str, typing.List[str]] = {}
+    for r in range(rounds):
+        if r == 0:
+            plans = [(list(by_name), args.benchmarks)]
+        else:
+            shared: typing.Dict[typing.Tuple[str, ...], typing.List[str]] = {}
+            for unit, names in left.items():
+                if len(names) > 1:
+                    shared.setdefault(tuple(names), []).append(unit)
+            plans = [(list(names), get_patterns(units, args.group_by)) for names, units in shared.items()]
+        for names, patterns in plans:
+            samples = max(2, args.budget // (rounds * len(names)))
+            print(f"round {r + 1} of {rounds}: {len(names)} candidates with {samples} samples")
+            run_id = run_harness(args, [by_name[x] for x in names], patterns, samples)
+            for _, suite, benchmark, name, wall_ns, returncode in get_runs(run_id):
+                measurements.setdefault((suite, benchmark, name), []).append((wall_ns, returncode))
+        if r == 0:
+            units = sorted(set(get_unit(suite, benchmark, args.group_by) for suite, benchmark, _ in measurements))
+            if len(units) == 0:
+                print("No benchmark matched the patterns.")
+                exit(-1)
+            left = {unit: list(by_name) for unit in units}
+        for unit, names in left.items():
+            scores = get_scores(measurements, unit, names, args.group_by)
+            keep = 1 if r == rounds - 1 else max(1, math.ceil(len(names) / args.eta))
+            left[unit] = sorted(names, key=lambda x: scores[x])[:keep]
+    best = {}
+    for unit, names in left.items():
+        score = get_scores(measurements, unit, names[:1], args.group_by)[names[0]]
+        best[unit] = (by_name[names[0]], score / 1_000_000)
+    return best
+
+
+def main():
+    """
+    The main function to tune the tiering of the JIT.
+    """
+    parser = argparse.ArgumentParser(
+        prog="autotune",
+        description="Search the reoptimization threshold and pipelines that minimize the wall clock time of the JIT."
+    )
+    parser.add_argument("-j", required=True, help="The jit to use.")
+    parser.add_argument("-f", required=True, help="The front-end of the benchmarks.")
+    parser.add_argument("-b", required=True, help="The back-end that is used in the jit.")
+    parser.add_argument("--benchmarks", nargs="+", default=["*"],
+                        help="The patterns of the benchmarks to tune on, given as suite/benchmark.")
+    parser.add_argument("--group-by", choices=["benchmark", "suite"], default="suite",
+                        help="If the best configuration is searched for each benchmark or for each suite.")
+    parser.add_argument("--thresholds", default="10,100,1000,10000,100000",
+                        help="The call count thresholds to search, separated by commas.")
+    parser.add_argument("--pipelines", help="The standard arguments of the back-end to search, separated by commas, the default is all.")
+    parser.add_argument("--budget", type=int, default=120,
+                        help="The number of runs of each benchmark over all candidates and rounds.")
+    parser.add_argument("--eta", type=int, default=3, help="The factor by which the candidates are reduced each round.")
+    parser.add_argument("-p", type=int, default=1, help="The number of workers of the harness.")
+    parser.add_argument("--cache", action="store_true", help="If the harness should reuse compiled benchmarks.")
+    parser.add_argument("-o", help="The arguments file to write the best configurations to, for --args-file.")
+    args = parser.parse_args()
+    if not common.valid_back_end(args.b):
+        print("Invalid back-end given.")
+        exit(-1)
+    if args.eta < 2 or args.budget < 2:
+        print("The reduction factor and the budget should be at least 2.")
+        exit(-1)
+    thresholds = args.thresholds.split(",")
+    if not all(map(lambda x: x.isdigit(), thresholds)):
+        print("The thresholds should be non-negative integers.")
+        exit(-1)
+    candidates = get_candidates(args.b, args.pipelines.split(",") if args.pipelines is not None else None,
+                                list(map(int, thresholds)))
+    best = tune(args, candidates)
+
+    entries: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for unit, (candidate, score) in sorted(best.items()):
+        print(f"{unit}: {candidate.name} ({score:.3f} ms)")
+        entry = entries.setdefault(candidate.name, {"name": candidate.name, "args": candidate.args, "units": []})
+        entry["units"].append(unit)
+    if args.o is not None:
+        with open(args.o, "w") as f:
+            json.dump(list(entries.values()), f, indent=4)
+    for entry in entries.values():
+        print(f"classes.Args(\"{entry['name']}\", \"{entry['args']}\")")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+This module contains a content-addressed cache for compiled benchmarks, which is keyed on the compiler version, the
+compile command, and the contents of the files that are compiled. The least recently used entries are evicted once the
+cache grows beyond its maximum size.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import typing
+
+from . import files
+from . import timing
+
+
+compiler_versions: typing.Dict[str, str] = {}
+"""
+The version of each compiler that is used, so that it only needs to be retrieved once.
+"""
+
+
+def get_metadata_file(entry: str) -> str:
+    """
+    Add the name of the file with the metadata of a cache entry to the path of the entry.
+    :param entry: The path to the cache entry.
+    :return: The path to the metadata file.
+    """
+    return os.path.join(entry, ".metadata.json")
+
+
+def get_compiler_version(compiler: str) -> str:
+    """
+    Get the full version of a compiler.
+    :param compiler: The compiler as it can be used in the command line.
+    :return: The output of the compiler when asked for its version.
+    """
+    if compiler not in compiler_versions:
+        compiler_versions[compiler] = timing.spawn([compiler, "--version"]).stdout.decode()
+    return compiler_versions[compiler]
+
+
+def hash_files(paths: typing.List[str]) -> str:
+    """
+    Hash the names and contents of files, the order in which they are given does not matter.
+    :param paths: The paths to the files.
+    :return: The hash of the files.
+    """
+    sha = hashlib.sha256()
+    for path in sorted(paths):
+        sha.update(path.encode())
+        sha.update(b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                sha.update(block)
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def compute_key(command: typing.List[str], source_files: typing.List[str]) -> str:
+    """
+    Compute the key of a compilation.
+    :param command: The compile command, where the first element is the compiler.
+    :param source_files: All files that can influence the compilation, which are the sources and included files.
+    :return: The key of the compilation.
+    """
+    sha = hashlib.sha256()
+    sha.update(get_compiler_version(command[0]).encode())
+    sha.update(b"\0".join(map(lambda x: x.encode(), command)))
+    sha.update(hash_files(source_files).encode())
+    return sha.hexdigest()
+
+
+def lookup(key: str, target: str) -> typing.Optional[float]:
+    """
+    Copy the compiled files of a cache entry to a directory, if the entry exists.
+    :param key: The key of the compilation.
+    :param target: The directory to copy the compiled files to.
+    :return: The time in milliseconds it took to compile the entry originally, or None if there is no entry.
+    """
+    entry = os.path.join(files.get_cache_directory(), key)
+    try:
+        with open(get_metadata_file(entry), "r") as f:
+            metadata = json.load(f)
+        for name in metadata["files"]:
+            shutil.copy2(os.path.join(entry, name), os.path.join(target, name))
+        os.utime(entry)
+    except (OSError, ValueError, KeyError):
+        return None
+    return metadata["time"]
+
+
+def store(key: str, source: str, time: float, maximum_size: int) -> None:
+    """
+    Store the compiled files in a directory as a cache entry, and evict entries if the cache is too large.
+    :param key: The key of the compilation.
+    :param source: The directory with the compiled files.
+    :param time: The time in milliseconds it took to compile.
+    :param maximum_size: The maximum size of the cache in bytes.
+    """
+    directory = files.get_cache_directory()
+    os.makedirs(directory, exist_ok=True)
+    entry = os.path.join(directory, key)
+    if os.path.isdir(entry):
+        return
+    temporary = tempfile.mkdtemp(prefix=".tmp_", dir=directory)
+    names = sorted(filter(lambda x: os.path.isfile(os.path.join(source, x)), os.listdir(source)))
+    for name in names:
+        shutil.copy2(os.path.join(source, name), os.path.join(temporary, name))
+    with open(get_metadata_file(temporary), "w") as f:
+        json.dump({"files": names, "time": time}, f)
+    try:
+        os.rename(temporary, entry)
+    except OSError:
+        shutil.rmtree(temporary, ignore_errors=True)
+    evict(maximum_size)
+
+
+def get_size(entry: str) -> int:
+    """
+    Get the size of a cache entry.
+    :param entry: The path to the cache entry.
+    :return: The size of the entry in bytes.
+    """
+    return sum(map(lambda x: os.path.getsize(os.path.join(entry, x)), os.listdir(entry)))
+
+
+def evict(maximum_size: int) -> None:
+    """
+    Remove the least recently used cache entries until the cache is not larger than the maximum size.
+    :param maximum_size: The maximum size of the cache in bytes.
+    """
+    directory = files.get_cache_directory()
+    entries = []
+    for name in os.listdir(directory):
+        entry = os.path.join(directory, name)
+        if name.startswith(".tmp_") or not os.path.isdir(entry):
+            continue
+        try:
+            entries.append((os.path.getmtime(entry), get_size(entry), entry))
+        except OSError:
+            continue
+    total = sum(map(lambda x: x[1], entries))
+    for _, size, entry in sorted(entries):
+        if total <= maximum_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
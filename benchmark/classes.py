@@ -3,6 +3,8 @@ This module contains general data structures used by other modules that are shar
 the front-end.
 """
 
+import datetime
+import time
 import typing
 import subprocess
 from enum import Enum
@@ -16,9 +18,9 @@ class Data:
         """
         The constructor for the data extracted from a JIT.
         :param meta_data: The metadata for the current line, the expected structure is [DATA,time,type,part,tag], with
-        DATA being a string liter, time being the time of the log, type being a description of how to handle the data
-        see LogType, part indicates if it is from the front-end or back-end see LogPart, and tag is an indication of
-        what data belongs together.
+        DATA being a string liter, time being the time of the log in microseconds since the epoch, type being a
+        description of how to handle the data see LogType, part indicates if it is from the front-end or back-end see
+        LogPart, and tag is an indication of what data belongs together.
         :param data: The data that is logged.
         """
         split_meta_data = meta_data[1:-1].split(",")
@@ -87,6 +89,120 @@ class LogPart(Enum):
             return LogPart.Whole
 
 
+class TagAggregate:
+    """
+    The data logged by a JIT for a single tag, which is aggregated while the output of the JIT is being read.
+    """
+    __slots__ = ("type", "entries", "total", "count")
+
+    def __init__(self, type: LogType):
+        """
+        The constructor for the aggregated data of a tag.
+        :param type: How the data of the tag should be processed, see LogType.
+        """
+        self.type = type
+        self.entries: typing.List[typing.Tuple[int, str]] = []
+        self.total = 0
+        self.count = 0
+
+    def add(self, time: int, data: str) -> None:
+        """
+        Add the data of a line to the aggregate, where only the sum and count are kept for an average.
+        :param time: The time of the log.
+        :param data: The data that is logged.
+        """
+        if self.type == LogType.List:
+            self.entries.append((time, data))
+        else:
+            if not data.isnumeric():
+                print("Got non numeric value for average log type.")
+                exit(-1)
+            self.total += int(data)
+            self.count += 1
+
+
+class LogStream:
+    """
+    A parser for the output of a JIT, which is given in chunks while the JIT is running. Only the lines with the
+    structure described in Data are kept, aggregated per part and tag, so that the memory used does not depend on how
+    much else is written to the output.
+    """
+    __slots__ = ("aggregates", "pending", "skipping")
+
+    def __init__(self):
+        """
+        The constructor for the parser, without any output read yet.
+        """
+        self.aggregates: typing.Dict[typing.Tuple[LogPart, str], TagAggregate] = {}
+        self.pending = b""
+        self.skipping = False
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Parse the next chunk of the output. The incomplete line at the end is kept until the rest of it is given, unless
+        it is already known that it is not logged data.
+        :param chunk: The chunk of the output.
+        """
+        lines = chunk.split(b"\n")
+        if self.skipping:
+            if len(lines) == 1:
+                return
+            self.skipping = False
+            lines[0] = b""
+        else:
+            lines[0] = self.pending + lines[0]
+        self.pending = lines.pop()
+        for line in lines:
+            if line.startswith(b"[DATA,"):
+                self.add_line(line.rstrip(b"\r").decode())
+        if not self.pending.startswith(b"[DATA,") and not b"[DATA,".startswith(self.pending):
+            self.pending = b""
+            self.skipping = True
+
+    def close(self) -> None:
+        """
+        Parse the last line of the output, once all chunks are given.
+        """
+        if self.pending.startswith(b"[DATA,"):
+            self.add_line(self.pending.rstrip(b"\r").decode())
+        self.pending = b""
+        self.skipping = False
+
+    def add_line(self, line: str) -> None:
+        """
+        Add a line with logged data to the aggregate of its part and tag.
+        :param line: The line, see Data for the structure.
+        """
+        parts = line.split(None, 1)
+        meta_data = parts[0][1:-1].split(",")
+        self.add(
+            int(meta_data[1]),
+            LogType.from_string(meta_data[2]),
+            LogPart.from_string(meta_data[3]),
+            meta_data[4],
+            parts[1] if len(parts) > 1 else ""
+        )
+
+    def add(self, time: int, type: LogType, part: LogPart, tag: str, data: str) -> None:
+        """
+        Add logged data to the aggregate of its part and tag.
+        :param time: The time of the log.
+        :param type: How the data should be processed.
+        :param part: The part of the JIT that logged the data.
+        :param tag: The tag of the data.
+        :param data: The data that is logged.
+        """
+        key = (part, tag)
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = TagAggregate(type)
+            self.aggregates[key] = aggregate
+        elif aggregate.type != type:
+            print("Invalid type for log data.")
+            exit(-1)
+        aggregate.add(time, data)
+
+
 class Component(Enum):
     """
     What should be run for the benchmark.
@@ -172,3 +288,340 @@ class ComponentData:
         and the JIT should be run, otherwise False.
         """
         return self.component == Component.JIT or self.component == Component.BOTH
+
+
+class Cell:
+    """
+    An independent unit of work within a benchmark run, which is a single compilation of a benchmark for a specific
+    configuration followed by all runs that happen within that compilation.
+    """
+    def __init__(
+            self,
+            jit: bool,
+            source_directory: str,
+            front_end_args: typing.Optional[Args],
+            back_end_args: typing.Optional[Args],
+            recompilation: int,
+            position: int = 0
+    ):
+        """
+        The constructor for a cell.
+        :param jit: If the cell is for the JIT, otherwise it is for the reference implementation.
+        :param source_directory: The benchmark that is run.
+        :param front_end_args: The arguments for the front-end, None for the reference implementation.
+        :param back_end_args: The arguments for the back-end, None for the reference implementation.
+        :param recompilation: The number of the compilation.
+        :param position: The position of the cell among all cells of the suite, in the order in which their results are
+        placed in the csv files.
+        """
+        self.jit = jit
+        self.source_directory = source_directory
+        self.front_end_args = front_end_args
+        self.back_end_args = back_end_args
+        self.recompilation = recompilation
+        self.position = position
+
+
+class RunOptions:
+    """
+    Options for how the harness executes the benchmarks, which do not influence what is being measured.
+    """
+    def __init__(
+            self,
+            workers: int = 1,
+            counters: bool = False,
+            adaptive: bool = False,
+            statistic: str = "mean",
+            precision: float = 0.02,
+            min_samples: int = 5,
+            max_samples: typing.Optional[int] = None,
+            cache: bool = False,
+            cache_size: int = 1024,
+            sample_compile: bool = False,
+            binary_telemetry: bool = False,
+            pipeline: typing.Optional[int] = None,
+            build_cores: typing.Optional[typing.List[int]] = None,
+            measure_cores: typing.Optional[typing.List[int]] = None,
+            resume: bool = False,
+            shard: typing.Optional[typing.Tuple[int, int]] = None,
+            shard_costs: typing.Optional[str] = None,
+            incremental: bool = False,
+            budget: typing.Optional[float] = None,
+            noise_control: bool = False,
+            warmup: int = 0,
+            seed: int = 0,
+            back_end_args: typing.Optional[typing.List["Args"]] = None,
+            benchmarks: typing.Optional[typing.List[str]] = None,
+            in_process: typing.Optional[int] = None,
+            object_cache: bool = False,
+            object_cache_size: int = 512,
+            threads: typing.Optional[typing.List[int]] = None
+    ):
+        """
+        The constructor for the options.
+        :param workers: The number of workers that execute cells in parallel, each pinned to its own set of cores.
+        :param counters: If hardware performance counters should be collected for each run.
+        :param adaptive: If samples should only be taken until the confidence interval is narrow enough, instead of a
+        fixed number of samples.
+        :param statistic: The statistic for which the confidence interval is computed, see stopping.get_statistics.
+        :param precision: The relative width of the confidence interval below which no more samples are taken.
+        :param min_samples: The minimum number of samples when sampling adaptively, and the number of compilations of
+        each configuration that are never dropped because of the time budget.
+        :param max_samples: The maximum number of samples when sampling adaptively, or None for the fixed number of
+        samples.
+        :param cache: If compiled benchmarks should be taken from the cache when the compilation has not changed.
+        :param cache_size: The maximum size of the cache in megabytes.
+        :param sample_compile: If the compiler should still be timed when the compiled benchmark is taken from the
+        cache.
+        :param binary_telemetry: If the JIT should write its log data in the binary format to a separate file
+        descriptor, instead of printing it between the output of the benchmark.
+        :param pipeline: The maximum number of compiled benchmarks that wait to be run when compiling and running are
+        pipelined, or None if they are not pipelined.
+        :param build_cores: The cores to compile on when pipelining, or None for the default.
+        :param measure_cores: The cores to run the benchmarks on when pipelining, or None for the default.
+        :param resume: If the most recent run of the harness with the same arguments should be continued, where the
+        cells that were completed are taken from the journal instead of being run again.
+        :param shard: The index of the shard to run and the number of shards, or None to run every cell.
+        :param shard_costs: A results database with earlier results, which are used to balance the shards on the
+        expected wall clock time, or None to balance them on the number of cells.
+        :param incremental: If the stored results of cells should be reused when nothing that influences them has
+        changed since they were measured, instead of running the cells again.
+        :param budget: The time in minutes in which the run of the harness should be finished, where the later
+        compilations of each configuration are dropped when needed, or None if there is no time budget.
+        :param noise_control: If the environment should be checked and normalized before measuring, and the
+        configurations of each benchmark should be run in a randomly interleaved order, see environment.prepare.
+        :param warmup: The number of runs of a compiled benchmark before the measured runs, which are not measured.
+        :param seed: The seed of the random interleaving of the configurations.
+        :param back_end_args: The arguments for the back-end that replace the standard arguments of the back-end, or
+        None for the standard arguments.
+        :param benchmarks: The patterns of the names of the benchmarks to run, as suite/benchmark, or None to run every
+        benchmark.
+        :param in_process: The number of times the JIT calls the entry point of a benchmark within a single run, with
+        the duration of each iteration logged, or None to call it once.
+        :param object_cache: If each configuration of the back-end should be run with a cold and a warm persistent
+        cache of the objects compiled by the JIT.
+        :param object_cache_size: The maximum size of the object cache in megabytes.
+        :param threads: The numbers of threads the JIT compiles and optimizes with, for each of which a configuration of
+        the back-end is added besides compiling in place, or None to only compile in place.
+        """
+        self.workers = workers
+        self.counters = counters
+        self.adaptive = adaptive
+        self.statistic = statistic
+        self.precision = precision
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.cache = cache
+        self.cache_size = cache_size
+        self.sample_compile = sample_compile
+        self.binary_telemetry = binary_telemetry
+        self.pipeline = pipeline
+        self.build_cores = build_cores
+        self.measure_cores = measure_cores
+        self.resume = resume
+        self.shard = shard
+        self.shard_costs = shard_costs
+        self.incremental = incremental
+        self.budget = budget
+        self.noise_control = noise_control
+        self.warmup = warmup
+        self.seed = seed
+        self.back_end_args = back_end_args
+        self.benchmarks = benchmarks
+        self.in_process = in_process
+        self.object_cache = object_cache
+        self.object_cache_size = object_cache_size
+        self.threads = threads
+
+
+class Plan:
+    """
+    The expected cost of the cells of a suite, which is used to report the progress of a run, and to drop the later
+    compilations that have not been started when the time budget would otherwise be exceeded.
+    """
+    def __init__(
+            self,
+            costs: typing.List[float],
+            recompilations: typing.List[int],
+            workers: int,
+            deadline: typing.Optional[float],
+            keep: int
+    ):
+        """
+        The constructor for the plan.
+        :param costs: The expected cost of each cell.
+        :param recompilations: The number of the compilation of each cell.
+        :param workers: The number of workers that execute cells in parallel.
+        :param deadline: The time, as given by time.monotonic, at which the run should be finished, or None if there is
+        no time budget.
+        :param keep: The number of compilations of each configuration that are never dropped.
+        """
+        self.costs = costs
+        self.recompilations = recompilations
+        self.workers = workers
+        self.deadline = deadline
+        self.keep = keep
+        self.start = time.monotonic()
+        self.count = len(costs)
+        self.finished = 0
+        self.dropped = 0
+        self.done = 0.0
+        self.remaining = sum(costs)
+        self.waiting: typing.Dict[int, float] = {}
+        for cost, recompilation in zip(costs, recompilations):
+            self.waiting[recompilation] = self.waiting.get(recompilation, 0.0) + cost
+
+    def get_rate(self) -> float:
+        """
+        The number of seconds it takes to complete a unit of expected cost, which is measured from the cells that are
+        finished, or derived from the number of workers when none are finished yet.
+        :return: The number of seconds per unit of expected cost.
+        """
+        if self.done > 0:
+            return (time.monotonic() - self.start) / self.done
+        return 1 / (1000 * self.workers)
+
+    def get_limit(self) -> int:
+        """
+        Get the highest number of a compilation that can still be started before the deadline, where the cells that
+        have not been started are completed in the order of the number of their compilation.
+        :return: The highest number of a compilation that can be started, which is at least the number of the last
+        compilation that is never dropped.
+        """
+        available = self.deadline - time.monotonic()
+        rate = self.get_rate()
+        needed = 0.0
+        limit = self.keep - 1
+        for recompilation in sorted(self.waiting):
+            needed += self.waiting[recompilation] * rate
+            if needed > available:
+                break
+            limit = max(limit, recompilation)
+        return limit
+
+    def skip(self, index: int) -> bool:
+        """
+        Decide if a cell should be dropped because it would exceed the time budget, which is called when the cell would
+        be started.
+        :param index: The index of the cell.
+        :return: True if the cell should not be run.
+        """
+        recompilation = self.recompilations[index]
+        dropped = self.deadline is not None and recompilation >= self.keep and recompilation > self.get_limit()
+        self.waiting[recompilation] -= self.costs[index]
+        if dropped:
+            self.dropped += 1
+            self.remaining -= self.costs[index]
+        return dropped
+
+    def cancel(self, index: int) -> None:
+        """
+        Remove a cell that will not be started because enough samples of its row were taken.
+        :param index: The index of the cell.
+        """
+        self.waiting[self.recompilations[index]] -= self.costs[index]
+        self.remaining -= self.costs[index]
+        self.count -= 1
+
+    def finish(self, index: int) -> None:
+        """
+        Mark a cell as finished and report the progress of the run.
+        :param index: The index of the cell.
+        """
+        self.finished += 1
+        self.done += self.costs[index]
+        self.remaining -= self.costs[index]
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        left = datetime.timedelta(seconds=round(max(self.remaining, 0.0) * self.get_rate()))
+        dropped = f", dropped {self.dropped}" if self.dropped != 0 else ""
+        print(f"finished {self.finished} of {self.count - self.dropped} cells{dropped}, "
+              f"{self.finished / elapsed * 60:.1f} cells per minute, about {left} remaining")
+
+
+class RunResult:
+    """
+    The result of a single run of a benchmark, as parts of the rows of the csv files and as the measurement itself.
+    """
+    def __init__(
+            self,
+            time_data: str,
+            other_data: str,
+            counter_data: str,
+            wall_ms: float,
+            measurement: typing.Optional["Measurement"] = None,
+            counter_values: typing.Optional[typing.List[str]] = None,
+            extra: str = ""
+    ):
+        """
+        The constructor for the result.
+        :param time_data: The part of the row for the time data.
+        :param other_data: The part of the row for the other data.
+        :param counter_data: The part of the row for the hardware performance counters, empty if they are not collected.
+        :param wall_ms: The wall clock time of the run in milliseconds, which is used as the sample of the run.
+        :param measurement: The measurement of the run, which is stored in the results database.
+        :param counter_values: The value of each hardware performance counter, or None if they are not collected.
+        :param extra: The additional data from an external source, like the time it took to compile.
+        """
+        self.time_data = time_data
+        self.other_data = other_data
+        self.counter_data = counter_data
+        self.wall_ms = wall_ms
+        self.measurement = measurement
+        self.counter_values = counter_values
+        self.extra = extra
+
+
+class Measurement(subprocess.CompletedProcess):
+    """
+    The result of a process that was run, with the resources it used alongside the output.
+    """
+    def __init__(
+            self,
+            args: typing.List[str],
+            returncode: int,
+            stdout: bytes,
+            stderr: bytes,
+            wall_ns: int,
+            user_ns: int,
+            sys_ns: int,
+            max_rss: int,
+            minor_faults: int,
+            major_faults: int,
+            voluntary_switches: int,
+            involuntary_switches: int,
+            telemetry: typing.Optional[LogStream] = None
+    ):
+        """
+        The constructor for the measurement.
+        :param args: The command that was run.
+        :param returncode: The exit code of the process, or the negative signal number if it was killed by a signal.
+        :param stdout: The standard output of the process.
+        :param stderr: The standard error of the process.
+        :param wall_ns: The wall clock time in nanoseconds.
+        :param user_ns: The time spent in user mode in nanoseconds.
+        :param sys_ns: The time spent in kernel mode in nanoseconds.
+        :param max_rss: The maximum resident set size in kilobytes.
+        :param minor_faults: The number of page faults that did not require any I/O.
+        :param major_faults: The number of page faults that required I/O.
+        :param voluntary_switches: The number of context switches because the process waited on a resource.
+        :param involuntary_switches: The number of context switches because the time slice of the process ran out.
+        :param telemetry: The data logged by the process if its output was parsed while it was running, in which case
+        the standard output itself is not kept.
+        """
+        super().__init__(args, returncode, stdout, stderr)
+        self.wall_ns = wall_ns
+        self.user_ns = user_ns
+        self.sys_ns = sys_ns
+        self.max_rss = max_rss
+        self.minor_faults = minor_faults
+        self.major_faults = major_faults
+        self.voluntary_switches = voluntary_switches
+        self.involuntary_switches = involuntary_switches
+        self.telemetry = telemetry
+
+    def wall_ms(self) -> float:
+        """
+        The wall clock time in milliseconds.
+        :return: The wall clock time in milliseconds.
+        """
+        return self.wall_ns / 1_000_000
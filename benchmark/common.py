@@ -3,14 +3,27 @@ This module contains functions that are shared between multiple modules no matte
 """
 
 import os
+import hashlib
+import shutil
 import subprocess
 import typing
 import argparse
-import locale
+import fnmatch
+import itertools
+import json
 
+from . import cache
 from . import default
+from . import environment
 from . import files
 from . import classes
+from . import counters
+from . import parallel
+from . import planner
+from . import results
+from . import shard
+from . import stopping
+from . import timing
 
 
 def get_repeats():
@@ -37,74 +50,69 @@ def get_recompilations_single():
     return 500
 
 
-def add_quote(string: str) -> str:
+def format_measurement(measurement: classes.Measurement) -> str:
     """
-    Add a quote around a string if it is not present.
-    :param string:
-    :return: The quoted string.
+    Format the resources used by a command as columns for the csv file with the time data. This is the wall clock time in
+    milliseconds, the exit code, the user and system time in nanoseconds, the maximum resident set size in kilobytes,
+    the number of minor and major page faults, and the number of voluntary and involuntary context switches.
+    :param measurement: The measurement of the command.
+    :return: The columns for the csv file.
     """
-    if string[0] != "\"" and string[-1] != "\"":
-        string = f"\"{string}\""
-    return string
-
-
-def get_time(err: bytes) -> float:
-    """
-    Get the wall clock time in milliseconds from the time command.
-    :param err: The string retrieved from standard error.
-    :return: The wall clock time in milliseconds from the time command.
-    """
-    lines = err.decode().splitlines()
-    locale.setlocale(locale.LC_ALL, "")
-    for line in lines:
-        parts = line.split(" ")
-        for part in parts:
-            if part.startswith("real"):
-                time = part.removeprefix("real")
-                time = time.strip()
-                first_split = time.split("m")
-                minutes = locale.atof(first_split[0])
-                return minutes * 60 + locale.atof(first_split[1].removesuffix("s")) * 1000
-    return -1
+    values = [
+        measurement.wall_ms(),
+        measurement.returncode,
+        measurement.user_ns,
+        measurement.sys_ns,
+        measurement.max_rss,
+        measurement.minor_faults,
+        measurement.major_faults,
+        measurement.voluntary_switches,
+        measurement.involuntary_switches
+    ]
+    return ",".join(map(lambda x: f"\"{x}\"", values))
 
 
 def run_command(
         name: str,
-        time_data_file: str,
         command: typing.List[str],
         first: bool,
-        last: bool,
         other_data_extraction: typing.Callable[[str, subprocess.CompletedProcess[bytes]], typing.List[str]],
-        other_data_file: str,
         extra_other: str,
-        extra_base: str
-) -> None:
-    """
-    Run a command and generate some csv files with the data. For the result of the time command will be added to a new
-    line no matter what.
+        extra_base: str,
+        collect_counters: bool = False,
+        telemetry_fd: typing.Optional[int] = None,
+        extra: str = ""
+) -> classes.RunResult:
+    """
+    Run a command and generate the parts of the rows of the csv files with the data. The command is started directly
+    without a shell, for the resources it used see format_measurement. The standard output is parsed while the command
+    is running and not kept, see classes.LogStream. A row of the csv files starts at the part with the name of the row,
+    see results.export_csv.
     :param name: A nice name for the current run, which will we placed in the first column of the row, if first is True.
-    :param time_data_file: The name of the file where the result of the time command should be put.
-    :param command: The command to run.
+    :param command: The command to run, each argument is passed as is.
     :param first: If this is the first command to be run for the current command.
-    :param last: If this is the last command to be run for the current command.
     :param other_data_extraction: A callback to extract any other information from the command.
-    :param other_data_file: The name of the file where the extra data should be put.
     :param extra_other: Any extra information to place in the csv file for the other data.
     :param extra_base: Any extra information to place in the csv file for the time data.
-    """
-    full_command = " ".join(["time"] + command)
-    full_command = f"/bin/bash -c '{full_command}'"
-    process = subprocess.run(
-        [full_command],
-        capture_output=True,
-        shell=True
-    )
-    time = get_time(process.stderr)
-    return_code = process.returncode
-    line = ((f"\"{name}\"" if first else "") + (f",{extra_base}," if extra_base != "" and extra_base is not None else ",")
-            + f"\"{time}\",\"{return_code}\"" + ("\n" if last else ""))
-    with open(time_data_file, "a") as f:
-        f.write(line)
+    :param collect_counters: If the command should be run again under perf stat to collect hardware performance
+    counters, the counters are placed in a csv file with the same structure as for the time data. This run is not timed,
+    and its log data is not used.
+    :param telemetry_fd: The file descriptor in the command on which it writes binary log data, or None if the log data
+    is part of the standard output.
+    :param extra: The additional data from an external source, as it is stored in the results database.
+    :return: The parts of the rows for the command.
+    """
+    base = (f"\"{name}\"" if first else "") + (f",{extra_base}," if extra_base != "" and extra_base is not None else ",")
+    counter_line = ""
+    counter_values = None
+    process = timing.spawn(command, classes.LogStream(), telemetry_fd)
+    if collect_counters:
+        # The counters come from a separate run that is not timed, so that perf itself is not part of the time data.
+        output_file = counters.create_output_file()
+        timing.spawn(counters.wrap(command, output_file), classes.LogStream(), telemetry_fd)
+        counter_values = counters.parse(output_file)
+        counter_line = base + ",".join(map(lambda x: f"\"{x}\"", counter_values))
+    line = base + format_measurement(process)
     other_data = other_data_extraction(name, process)
     other_data = list(map(lambda x: "\"" + x + "\"", other_data))
     if extra_other:
@@ -112,9 +120,8 @@ def run_command(
     if first:
         other_data = ([f"\"{name}\""] +
                       other_data)
-    other_data_row = ("," if not first and len(other_data) != 0 else "") + ",".join(other_data) + ("\n" if last else "")
-    with open(other_data_file, "a") as f:
-        f.write(other_data_row)
+    other_data_row = ("," if not first and len(other_data) != 0 else "") + ",".join(other_data)
+    return classes.RunResult(line, other_data_row, counter_line, process.wall_ms(), process, counter_values, extra)
 
 
 def back_end_parsing_map() -> dict:
@@ -123,7 +130,7 @@ def back_end_parsing_map() -> dict:
     :return: The map itself.
     """
     mapping = {
-        "recomp": default.default_back_end_data_extraction(5)
+        "recomp": default.default_back_end_data_extraction(6)
     }
     return mapping
 
@@ -179,6 +186,89 @@ def back_end_args(back_end: str) -> typing.List[classes.Args]:
         return []
 
 
+def object_cache_args(args: typing.List[classes.Args], size: int) -> typing.List[classes.Args]:
+    """
+    Split each configuration of the back-end into one with a cold and one with a warm persistent object cache. Both
+    use the same cache, but on a cold cache the JIT only writes the objects it compiles, so that every module is still
+    compiled, while on a warm cache the objects written by earlier runs are loaded instead.
+    :param args: The arguments for the back-end.
+    :param size: The maximum size of the object cache in megabytes.
+    :return: The arguments for the back-end with a cold and a warm object cache.
+    """
+    cache_args = f"-cache={files.get_object_cache_directory()} -cache-size={size * 1024 * 1024}"
+    return [x for b in args for x in [
+        classes.Args(f"{b.name}-cold", f"{b.args} {cache_args} -cache-cold".strip()),
+        classes.Args(f"{b.name}-warm", f"{b.args} {cache_args}".strip())
+    ]]
+
+
+def thread_args(args: typing.List[classes.Args], threads: typing.List[int]) -> typing.List[classes.Args]:
+    """
+    Add a configuration of the back-end for each number of threads the JIT compiles and optimizes with, besides the
+    configuration that compiles in place on the thread of the program.
+    :param args: The arguments for the back-end.
+    :param threads: The numbers of threads.
+    :return: The arguments for the back-end, followed by those with each number of threads.
+    """
+    return args + [classes.Args(f"{b.name}-j{count}", f"{b.args} -threads={count}".strip())
+                   for b in args for count in threads]
+
+
+def parse_thread_counts(threads: str, cores: int) -> typing.List[int]:
+    """
+    Parse the numbers of threads of the JIT, given as a comma separated list. A number of threads that is larger than
+    the number of cores of a worker is skipped, since the threads would only take turns on the same cores.
+    :param threads: The numbers of threads to parse.
+    :param cores: The number of cores of a worker.
+    :return: The numbers of threads, without duplicates and in increasing order.
+    """
+    parts = threads.split(",")
+    if not all(x.strip().isdigit() and int(x) > 0 for x in parts):
+        print("The numbers of threads should be given as a comma separated list of positive numbers, for example 1,2,4.")
+        exit(-1)
+    counts = sorted(set(map(int, parts)))
+    for count in counts:
+        if count > cores:
+            print(f"Skipped {count} threads, since a worker only has {cores} cores.")
+    return [count for count in counts if count <= cores]
+
+
+def load_args_file(args_file: str) -> typing.List[classes.Args]:
+    """
+    Load arguments for the back-end from a file, as written by the autotuner. The file contains a JSON list with an
+    object for each set of arguments, with the name and the arguments themselves.
+    :param args_file: The file to load.
+    :return: The arguments for the back-end.
+    """
+    if not os.path.isfile(args_file):
+        print(f"The arguments file {args_file} does not exist.")
+        exit(-1)
+    with open(args_file, "r") as f:
+        try:
+            entries = json.load(f)
+        except json.JSONDecodeError:
+            entries = None
+    if not isinstance(entries, list) or not all(map(lambda x: isinstance(x, dict) and "name" in x and "args" in x, entries)):
+        print(f"The arguments file {args_file} should contain a list of objects with a name and args.")
+        exit(-1)
+    return list(map(lambda x: classes.Args(x["name"], x["args"]), entries))
+
+
+def select_sources(prefix: str, sources: typing.List[str], patterns: typing.Optional[typing.List[str]]) -> typing.List[str]:
+    """
+    Select the benchmarks of a suite that match any of the patterns, where the name of a benchmark is the name of the
+    suite followed by the benchmark, like the name of a row in the csv files.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param sources: The benchmarks of the suite.
+    :param patterns: The patterns, as for fnmatch, or None to select every benchmark.
+    :return: The selected benchmarks.
+    """
+    if patterns is None:
+        return sources
+    suite = prefix.rstrip("/")
+    return list(filter(lambda x: any(map(lambda y: fnmatch.fnmatchcase(f"{suite}/{x}", y), patterns)), sources))
+
+
 def valid_back_end(back_end: str) -> bool:
     """
     Check if the back-end is valid, which means that there is a parsing function and arguments defined for it.
@@ -202,6 +292,228 @@ def jit_other_data_extraction(
     return lambda a, b: front_end(a, b) + default.default_whole_data_extraction(a, b) + back_end(a,b)
 
 
+def get_groups(
+        sources: typing.List[str],
+        component_data: classes.ComponentData,
+        single: bool,
+        recompilations: int
+) -> typing.List[typing.List[classes.Cell]]:
+    """
+    Get all cells that should be run, grouped by the rows of the csv files they belong to, in the order in which their
+    results are placed in the csv files. When a single iteration happens within a compilation, a row contains each
+    compilation of a configuration, otherwise each compilation has its own row.
+    :param sources: A list of benchmarks to run.
+    :param component_data: The data for the reference implementation and JIT compiler
+    :param single: If a single iteration should happen within a compilation.
+    :param recompilations: The maximum number of times each benchmark is compiled.
+    :return: The cells to run for each row.
+    """
+    configurations = []
+    if component_data.for_reference():
+        for source_directory in sorted(sources):
+            configurations.append((False, source_directory, None, None))
+    if component_data.for_jit():
+        for source_directory in sorted(sources):
+            for f in component_data.front_end_args:
+                for b in component_data.back_end_args:
+                    configurations.append((True, source_directory, f, b))
+    groups = []
+    for i, (jit, source_directory, f, b) in enumerate(configurations):
+        cells = [classes.Cell(jit, source_directory, f, b, j, i * recompilations + j) for j in range(recompilations)]
+        if single:
+            groups.append(cells)
+        else:
+            groups += list(map(lambda x: [x], cells))
+    return groups
+
+
+def get_row_name(prefix: str, cell: classes.Cell) -> typing.Tuple[str, str]:
+    """
+    Get the name of the row for a cell, and the extra information placed in the csv file for the time data.
+    :param prefix: Any prefix that should be included in the name of the run in the csv file.
+    :param cell: The cell.
+    :return: The name and extra information.
+    """
+    current_prefix = (prefix if prefix.endswith("/") else prefix + "/") + cell.source_directory
+    if not cell.jit:
+        return current_prefix, ""
+    f = cell.front_end_args
+    b = cell.back_end_args
+    return current_prefix + " " + b.name, f"\"front-end {f.name}:{f.args}\",\"back-end {b.name}:{b.args}\""
+
+
+def build_cell(
+        path: str,
+        prestep: typing.Callable[[str, str, bool, int, bool], None],
+        recompilations: int,
+        cell: classes.Cell
+) -> None:
+    """
+    Compile a benchmark for a single cell.
+    :param path: The path to the benchmark folder.
+    :param prestep: A step to execute before the benchmark is run.
+    :param recompilations: The maximum number of times each benchmark is compiled.
+    :param cell: The cell to compile.
+    """
+    j = cell.recompilation
+    print(f"started run {j + 1} of {cell.source_directory}")
+    prestep(path, cell.source_directory, cell.jit, j, j == (recompilations - 1))
+
+
+def measure_cell(
+        path: str,
+        prefix: str,
+        arguments: typing.Callable[[str], typing.List[str]],
+        component_data: classes.ComponentData,
+        extra: typing.Callable[[str, bool, int], str],
+        single: bool,
+        iterations: int,
+        options: classes.RunOptions,
+        cell: classes.Cell
+) -> typing.List[classes.RunResult]:
+    """
+    Run a compiled benchmark for a single cell, after the warm-up runs which are not measured. When sampling adaptively
+    with multiple iterations within a compilation, the benchmark is only run until the confidence interval is narrow
+    enough.
+    :param path: The path to the benchmark folder.
+    :param prefix: Any prefix that should be included in the name of the run in the csv file.
+    :param arguments: A callback to get additional arguments for the benchmark.
+    :param component_data: The data for the reference implementation and JIT compiler
+    :param extra: A callback to get any additional data from an external source.
+    :param single: If a single iteration should happen within a compilation.
+    :param iterations: The maximum number of times the benchmark is run within a compilation.
+    :param options: The options for how the benchmarks are executed.
+    :param cell: The cell to run.
+    :return: The results of each run.
+    """
+    source_directory = cell.source_directory
+    j = cell.recompilation
+    name, extra_base = get_row_name(prefix, cell)
+    results = []
+    if not cell.jit:
+        full_reference_directory = os.path.join(files.get_reference_directory(path), files.get_build_name(source_directory))
+        command = component_data.reference_command(full_reference_directory) + arguments(full_reference_directory)
+        data_extraction = component_data.reference_data_extraction
+        telemetry_fd = None
+    else:
+        f = cell.front_end_args
+        b = cell.back_end_args
+        full_jit_directory = os.path.join(files.get_jit_directory(path), files.get_build_name(source_directory))
+        jit_args = list(filter(lambda arg: arg != "", [source_directory] + arguments(full_jit_directory)))
+        jit_files = component_data.jit_files(full_jit_directory)
+        telemetry_fd = default.get_telemetry_fd() if options.binary_telemetry else None
+        command = ([component_data.jit, "-i", ",".join(jit_files), "-a", " ".join(jit_args)] +
+                   (["-b", b.args] if b.args != "" else []) +
+                   (["-r", f.args] if f.args != "" else []) +
+                   (["-t", str(telemetry_fd)] if telemetry_fd is not None else []))
+        data_extraction = jit_other_data_extraction(component_data.front_end_extraction, component_data.back_end_extraction)
+    for i in range(options.warmup):
+        print(f"started warm-up run {i + 1}")
+        timing.spawn(command, classes.LogStream(), telemetry_fd)
+    for i in range(iterations):
+        print(f"started iteration {i + 1}")
+        extra_data = extra(source_directory, cell.jit, j)
+        results.append(run_command(
+            name,
+            command,
+            (j == 0) if single else (i == 0),
+            data_extraction,
+            f"{extra_base},\"{extra_data}\"" if cell.jit else extra_data,
+            extra_base,
+            options.counters,
+            telemetry_fd,
+            extra_data
+        ))
+        print(f"finished iteration {i + 1}")
+        if options.adaptive and not single and stopping.should_stop(
+                list(map(lambda x: x.wall_ms, results)),
+                options.statistic,
+                options.precision,
+                options.min_samples,
+                iterations
+        ):
+            break
+    print(f"finished run {j + 1} of {source_directory}")
+    return results
+
+
+def run_cell(
+        path: str,
+        prefix: str,
+        prestep: typing.Callable[[str, str, bool, int, bool], None],
+        arguments: typing.Callable[[str], typing.List[str]],
+        component_data: classes.ComponentData,
+        extra: typing.Callable[[str, bool, int], str],
+        single: bool,
+        recompilations: int,
+        iterations: int,
+        options: classes.RunOptions,
+        cell: classes.Cell
+) -> typing.List[classes.RunResult]:
+    """
+    Compile a benchmark and run it for a single cell, see build_cell and measure_cell.
+    :param path: The path to the benchmark folder.
+    :param prefix: Any prefix that should be included in the name of the run in the csv file.
+    :param prestep: A step to execute before the benchmark is run.
+    :param arguments: A callback to get additional arguments for the benchmark.
+    :param component_data: The data for the reference implementation and JIT compiler
+    :param extra: A callback to get any additional data from an external source.
+    :param single: If a single iteration should happen within a compilation.
+    :param recompilations: The maximum number of times each benchmark is compiled.
+    :param iterations: The maximum number of times the benchmark is run within a compilation.
+    :param options: The options for how the benchmarks are executed.
+    :param cell: The cell to run.
+    :return: The results of each run.
+    """
+    build_cell(path, prestep, recompilations, cell)
+    return measure_cell(path, prefix, arguments, component_data, extra, single, iterations, options, cell)
+
+
+def get_fingerprints(
+        path: str,
+        cells: typing.List[classes.Cell],
+        arguments: typing.Callable[[str], typing.List[str]],
+        component_data: classes.ComponentData,
+        fingerprint: typing.Optional[typing.Callable[[str, str, bool], str]],
+        single: bool,
+        iterations: int,
+        options: classes.RunOptions
+) -> typing.Dict[int, str]:
+    """
+    Get the fingerprint of each cell, which changes when anything changes that influences the results of the cell. This
+    is the compilation of the benchmark, the arguments of the benchmark, the number of runs, if hardware performance
+    counters are collected, and for the JIT also the contents of the JIT binary and the front-end and back-end arguments.
+    :param path: The path to the benchmark folder.
+    :param cells: The cells.
+    :param arguments: A callback to get additional arguments for the benchmark.
+    :param component_data: The data for the reference implementation and JIT compiler
+    :param fingerprint: A callback to get the fingerprint of the compilation of a benchmark, with the path to the
+    benchmark folder, the benchmark, and if it is for the JIT, or None if it is not known.
+    :param single: If a single iteration should happen within a compilation.
+    :param iterations: The maximum number of times the benchmark is run within a compilation.
+    :param options: The options for how the benchmarks are executed.
+    :return: The fingerprint of each cell keyed on its position, or nothing if the fingerprints are not known.
+    """
+    if fingerprint is None:
+        return {}
+    jit_fingerprint = ""
+    if component_data.for_jit():
+        jit_binary = shutil.which(component_data.jit) or component_data.jit
+        jit_fingerprint = cache.hash_files([jit_binary]) if os.path.isfile(jit_binary) else ""
+    builds = {}
+    result = {}
+    for cell in cells:
+        if (cell.source_directory, cell.jit) not in builds:
+            builds[(cell.source_directory, cell.jit)] = fingerprint(path, cell.source_directory, cell.jit)
+        directory = files.get_jit_directory(path) if cell.jit else files.get_reference_directory(path)
+        parts = [builds[(cell.source_directory, cell.jit)], str(single), str(iterations), str(options.counters)]
+        parts += arguments(os.path.join(directory, files.get_build_name(cell.source_directory)))
+        if cell.jit:
+            parts += [jit_fingerprint, cell.front_end_args.args, cell.back_end_args.args]
+        result[cell.position] = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+    return result
+
+
 def run(
         path: str,
         prefix: str,
@@ -210,10 +522,25 @@ def run(
         arguments: typing.Callable[[str], typing.List[str]],
         component_data: classes.ComponentData,
         extra: typing.Callable[[str, bool, int], str],
-        single: bool
+        single: bool,
+        options: classes.RunOptions,
+        fingerprint: typing.Optional[typing.Callable[[str, str, bool], str]] = None
 ) -> None:
     """
-    Run the benchmarks in the JIT, reference implementation, or both.
+    Run the benchmarks in the JIT, reference implementation, or both. Each compilation of a benchmark for a
+    configuration is a cell, which can be run in parallel when multiple workers are given in the options, or where the
+    compilation of later cells overlaps with the runs of earlier cells when pipelining. The results are only stored in
+    the results database while running, and the csv files are exported from it once all cells are finished, in the
+    same order as when the cells are run one after the other, see results.export_csv. When sampling adaptively, samples
+    are only taken until the confidence interval of a row is narrow enough, which are the iterations within a
+    compilation, or the compilations if a single iteration happens within a compilation. Each cell is stored in the
+    results database as soon as it is finished, and when resuming the cells that were finished are taken from its
+    journal, so that the csv files are the same as for a run that was not interrupted. When running incrementally, the
+    cells for which there are results of an earlier run with the same fingerprint are not run again either. The expected
+    cost of each cell is taken from earlier results, so that the most expensive rows are started first when running in
+    parallel, the progress is reported with an estimate of the remaining time, and later compilations are dropped when
+    they would exceed the time budget. When controlling the noise, the environment is prepared before measuring, and
+    the cells of the configurations of each benchmark are run in a randomly interleaved order.
     :param path: The path to the benchmark folder.
     :param prefix: Any prefix that should be included in the name of the run in the csv file.
     :param prestep: A step to execute before the benchmark is run.
@@ -222,78 +549,138 @@ def run(
     :param component_data: The data for the reference implementation and JIT compiler
     :param extra: A callback to get any additional data from an external source.
     :param single: If a single iteration should happen within a compilation.
+    :param options: The options for how the benchmarks are executed.
+    :param fingerprint: A callback to get the fingerprint of the compilation of a benchmark, or None if it is not
+    known, in which case the results are never reused, see get_fingerprints.
     """
     benchmark_reference = files.get_time_data_reference_file(path)
     other_reference = files.get_other_data_reference_file(path)
     benchmark_jit = files.get_time_data_jit_file(path)
     other_jit = files.get_other_data_jit_file(path)
-    files.remove_files([benchmark_reference, other_reference, benchmark_jit, other_jit])
+    counter_reference = files.get_counter_data_reference_file(path)
+    counter_jit = files.get_counter_data_jit_file(path)
+    sample_reference = files.get_sample_data_reference_file(path)
+    sample_jit = files.get_sample_data_jit_file(path)
+    files.remove_files([
+        benchmark_reference, other_reference, benchmark_jit, other_jit,
+        counter_reference, counter_jit, sample_reference, sample_jit
+    ])
     recompilations = get_recompilations_single() if single else get_recompilations_multiple()
     iterations = 1 if single else get_repeats()
+    if options.adaptive and options.max_samples is not None:
+        if single:
+            recompilations = options.max_samples
+        else:
+            iterations = options.max_samples
     if component_data.for_reference():
-        files.recreate_file([benchmark_reference, other_reference])
-        for source_directory in sorted(sources):
-            print(f"started running {source_directory}")
-            full_reference_directory = os.path.join(files.get_reference_directory(path), source_directory.replace("/", "_"))
-            reference = component_data.reference_command(full_reference_directory)
-            reference_args = arguments(full_reference_directory)
-            for j in range(recompilations):
-                print(f"started run {j + 1}")
-                prestep(path, source_directory, False, j, j == (recompilations - 1))
-                for i in range(iterations):
-                    print(f"started iteration {i + 1}")
-                    current_prefix = (prefix if prefix.endswith("/") else prefix + "/") + source_directory
-                    extra_data = extra(source_directory, False, j)
-                    run_command(
-                        current_prefix,
-                        benchmark_reference,
-                        reference + reference_args,
-                        (j == 0) if single else (i == 0),
-                        (j == (recompilations - 1)) if single else (i == (iterations - 1)),
-                        component_data.reference_data_extraction,
-                        other_reference,
-                        extra_data,
-                        ""
-                    )
-                    print(f"finished iteration {i + 1}")
-                print(f"finished run {j + 1}")
-            print(f"finished running {source_directory}")
+        files.recreate_file([benchmark_reference, other_reference] +
+                            ([counter_reference] if options.counters else []) +
+                            ([sample_reference] if options.adaptive else []))
     if component_data.for_jit():
-        files.recreate_file([benchmark_jit, other_jit])
-        for source_directory in sorted(sources):
-            print(f"started running {source_directory}")
-            full_jit_directory = os.path.join(files.get_jit_directory(path), source_directory.replace("/", "_"))
-            jit_args = list(filter(lambda arg: arg != "", [source_directory] + arguments(full_jit_directory)))
-            for f in component_data.front_end_args:
-                print(f"started running front-end args {f.name}")
-                for b in component_data.back_end_args:
-                    print(f"started running back-end args {b.name}")
-                    current_prefix = (prefix if prefix.endswith("/") else prefix + "/") + source_directory
-                    for j in range(recompilations):
-                        print(f"started run {j + 1}")
-                        prestep(path, source_directory, True, j, j == (recompilations - 1))
-                        for i in range(iterations):
-                            print(f"started iteration {i + 1}")
-                            jit_files = component_data.jit_files(full_jit_directory)
-                            extra_data = extra(source_directory, True, j)
-                            run_command(
-                                current_prefix + " " + b.name,
-                                benchmark_jit,
-                                [component_data.jit, "-i", "\"" + ",".join(jit_files) + "\"", "-a", "\"" + " ".join(jit_args) + "\""] +
-                                (["-b", f"\"{b.args}\""] if b.args != "" else []) +
-                                (["-r", f"\"{b.args}\""] if f.args != "" else []),
-                                (j == 0) if single else (i == 0),
-                                (j == (recompilations - 1)) if single else (i == (iterations - 1)),
-                                jit_other_data_extraction(component_data.front_end_extraction, component_data.back_end_extraction),
-                                other_jit,
-                                f"\"front-end {f.name}:{f.args}\",\"back-end {b.name}:{b.args}\",\"{extra_data}\"",
-                                f"\"front-end {f.name}:{f.args}\",\"back-end {b.name}:{b.args}\""
-                            )
-                            print(f"finished iteration {i + 1}")
-                        print(f"finished run {j + 1}")
-                    print(f"finished running back-end args {b.name}")
-                print(f"finished running front-end args {f.name}")
-            print(f"finished running {source_directory}")
+        files.recreate_file([benchmark_jit, other_jit] +
+                            ([counter_jit] if options.counters else []) +
+                            ([sample_jit] if options.adaptive else []))
+    groups = get_groups(select_sources(prefix, sources, options.benchmarks), component_data, single, recompilations)
+    if options.shard is not None:
+        groups = shard.select_groups(groups, prefix, options, options.adaptive and single, iterations)
+    cells = [cell for group in groups for cell in group]
+    if options.resume:
+        results.resume()
+        journal = results.load_journal(prefix)
+    else:
+        results.get_run()
+        journal = {}
+    fingerprints = get_fingerprints(path, cells, arguments, component_data, fingerprint, single, iterations, options)
+    reusable = results.load_reusable(prefix, cells, fingerprints) if options.incremental else {}
+
+    def replay(index: int) -> typing.Optional[typing.List[classes.RunResult]]:
+        """
+        Get the results of the cell with the given index without running it, when it is completed in the journal, or
+        when the results of an earlier run can be reused, in which case they are copied to the current run.
+        :param index: The index of the cell.
+        :return: The results of each run within the cell, or None if the cell should be run.
+        """
+        if results.get_cell_key(cells[index]) in journal:
+            return journal[results.get_cell_key(cells[index])]
+        if cells[index].position in reusable:
+            cell_results, result_ids = reusable[cells[index].position]
+            results.copy_results(result_ids)
+            return cell_results
+        return None
+
+    def execute(index: int) -> typing.List[classes.RunResult]:
+        """
+        Run the cell with the given index, unless it does not need to be run, and store its results.
+        :param index: The index of the cell.
+        :return: The results of each run within the cell.
+        """
+        cell_results = replay(index)
+        if cell_results is not None:
+            return cell_results
+        cell_results = run_cell(path, prefix, prestep, arguments, component_data, extra, single, recompilations,
+                                iterations, options, cells[index])
+        results.store_cell(prefix, cells[index], cell_results, fingerprints.get(cells[index].position, ""))
+        return cell_results
+
+    def build(index: int) -> None:
+        """
+        Compile the cell with the given index, unless it does not need to be run.
+        :param index: The index of the cell.
+        """
+        if results.get_cell_key(cells[index]) not in journal and cells[index].position not in reusable:
+            build_cell(path, prestep, recompilations, cells[index])
+
+    def measure(index: int) -> typing.List[classes.RunResult]:
+        """
+        Run the compiled cell with the given index, unless it does not need to be run, and store its results.
+        :param index: The index of the cell.
+        :return: The results of each run within the cell.
+        """
+        cell_results = replay(index)
+        if cell_results is not None:
+            return cell_results
+        cell_results = measure_cell(path, prefix, arguments, component_data, extra, single, iterations, options,
+                                    cells[index])
+        results.store_cell(prefix, cells[index], cell_results, fingerprints.get(cells[index].position, ""))
+        return cell_results
+
+    def stop(results: typing.List[typing.List[classes.RunResult]]) -> bool:
+        """
+        Decide if no more cells of a row should be run, which is only the case when a single iteration happens within
+        a compilation and enough samples have been taken.
+        :param results: The results of the cells of the row that were run.
+        :return: True if no more cells of the row should be run.
+        """
+        return options.adaptive and single and stopping.should_stop(
+            list(map(lambda x: x.wall_ms, itertools.chain.from_iterable(results))),
+            options.statistic,
+            options.precision,
+            options.min_samples,
+            recompilations
+        )
+
+    indices = []
+    start = 0
+    for group in groups:
+        indices.append(list(range(start, start + len(group))))
+        start += len(group)
+    replayed = set(i for i, cell in enumerate(cells)
+                   if results.get_cell_key(cell) in journal or cell.position in reusable)
+    plan = planner.create_plan(prefix, cells, iterations, replayed, options)
+    cell_order = environment.get_interleaving(cells, options.seed) if options.noise_control else None
+    environment.prepare(options)
+    if options.pipeline is not None:
+        build_cores, measure_cores = parallel.get_pipeline_cores(options.build_cores, options.measure_cores)
+        all_results = parallel.run_pipeline(indices, build, measure, stop, build_cores, measure_cores, options.pipeline,
+                                            plan, cell_order)
+    else:
+        initial = options.min_samples if options.adaptive and single else recompilations
+        all_results = parallel.run_groups(indices, execute, stop, options.workers, initial, plan,
+                                          planner.get_order(indices, plan.costs), cell_order)
+    for _ in all_results:
+        continue
+    results.export_csv(results.get_connection(), results.get_run(), path, prefix,
+                       options.statistic if options.adaptive else None)
 
 
 def valid_front_end(front_end: str) -> bool:
@@ -323,6 +710,7 @@ def parse_jit_args() -> typing.Any:
                         help="If some external reference implementation will be ran for their performance.")
     parser.add_argument("-s", action="store_true",
                         help="If a single run should be done per compilation")
+    add_run_options(parser)
     args = parser.parse_args()
     print(args.b)
     if args.j is not None and not valid_back_end(args.b):
@@ -334,6 +722,69 @@ def parse_jit_args() -> typing.Any:
     return args
 
 
+def add_run_options(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the arguments for the options of how the benchmarks are executed, which are shared between each run script.
+    :param parser: The parser to add the arguments to.
+    """
+    parser.add_argument("-p", type=int, default=1,
+                        help="The number of workers that run benchmarks in parallel, each pinned to its own cores.")
+    parser.add_argument("--perf", action="store_true",
+                        help="If hardware performance counters should be collected with perf stat for each run.")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="If samples should only be taken until the confidence interval is narrow enough.")
+    parser.add_argument("--statistic", choices=stopping.get_statistics(), default="mean",
+                        help="The statistic for which the confidence interval is computed when sampling adaptively.")
+    parser.add_argument("--precision", type=float, default=0.02,
+                        help="The relative width of the confidence interval at which no more samples are taken.")
+    parser.add_argument("--min-samples", type=int, default=5,
+                        help="The minimum number of samples when sampling adaptively.")
+    parser.add_argument("--max-samples", type=int,
+                        help="The maximum number of samples when sampling adaptively, the default is the fixed number.")
+    parser.add_argument("--binary-telemetry", action="store_true",
+                        help="If the JIT should write its log data in a binary format to a separate file descriptor.")
+    parser.add_argument("--pipeline", type=int,
+                        help="Compile benchmarks on the build cores while earlier ones run on the measure cores, with at most this many compiled benchmarks waiting.")
+    parser.add_argument("--build-cores",
+                        help="The cores to compile on when pipelining, for example 0-3,8.")
+    parser.add_argument("--measure-cores",
+                        help="The cores to run the benchmarks on when pipelining, the default is the isolated cores.")
+    parser.add_argument("--cache", action="store_true",
+                        help="If compiled benchmarks should be reused when the sources, compiler and flags are unchanged.")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="The maximum size of the cache with compiled benchmarks in megabytes.")
+    parser.add_argument("--sample-compile", action="store_true",
+                        help="If the compiler should still be timed when a compiled benchmark is taken from the cache.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the most recent run with the same arguments, without running the completed benchmarks again.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the stored results of benchmarks for which the sources, compiler, JIT binary, and arguments are unchanged.")
+    parser.add_argument("--shard",
+                        help="Only run part i of N of the benchmarks, given as i/N, see benchmark.shard to merge the results.")
+    parser.add_argument("--shard-costs",
+                        help="A results database with earlier results, used to balance the shards on the expected time.")
+    parser.add_argument("--budget", type=float,
+                        help="The time in minutes to finish in, dropping compilations beyond --min-samples when they would not fit.")
+    parser.add_argument("--noise-control", action="store_true",
+                        help="Check the CPU governor, turbo and SMT, disable ASLR, pin to the isolated cores, and interleave the configurations randomly.")
+    parser.add_argument("--warmup", type=int,
+                        help="The number of unmeasured runs before the measured runs of a compilation, the default is 1 with --noise-control or --object-cache and 0 otherwise.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="The seed of the random interleaving of the configurations with --noise-control.")
+    parser.add_argument("--args-file",
+                        help="A JSON file with the arguments for the back-end to use instead of the standard ones, as written by benchmark.autotune.")
+    parser.add_argument("--benchmarks", nargs="+",
+                        help="Only run the benchmarks that match any of these patterns, given as suite/benchmark, for example llvm/CHStone/*.")
+    parser.add_argument("--in-process", type=int,
+                        help="Let the JIT call the entry point of each benchmark this many times within a run, logging each iteration, see benchmark.warmup.")
+    parser.add_argument("--object-cache", action="store_true",
+                        help="Run each configuration of the back-end with a cold and a warm persistent cache of the objects compiled by the JIT.")
+    parser.add_argument("--object-cache-size", type=int, default=512,
+                        help="The maximum size of the cache with objects compiled by the JIT in megabytes.")
+    parser.add_argument("--threads",
+                        help="Also run each configuration of the back-end with the JIT compiling on each of these numbers of threads, for example 1,2,4.")
+
+
 def full_parse_jit_args() -> typing.Any:
     """
     Parse command line arguments for the top-level run script.
@@ -352,6 +803,7 @@ def full_parse_jit_args() -> typing.Any:
                         help="If some external reference implementation will be ran for their performance.")
     parser.add_argument("-s", action="store_true",
                         help="If a single run should be done per compilation")
+    add_run_options(parser)
     args = parser.parse_args()
     if not valid_front_end(args.f):
         print("Invalid frontend given.")
@@ -365,16 +817,78 @@ def full_parse_jit_args() -> typing.Any:
     return args
 
 
-def args_to_run_array(args: typing.Any) -> typing.List[str]:
+def args_to_options(args: typing.Any) -> classes.RunOptions:
     """
-    Convert the arguments object for parse_jit_args() to an array of strings to pass to the run command.
-    :param args: The argument to convert.
-    :return: An array of strings to pass to the run command
+    Convert the run arguments to the options of how the benchmarks are executed.
+    :param args: The arguments to convert.
+    :return: The options for how the benchmarks are executed.
     """
-    return ((["-j", args.j] if args.j is not None else []) +
-            (["-b", args.b] if args.b != "" and args.b is not None else []) +
-            (["-e"] if args.e else []) +
-            (["-s"] if args.s else []))
+    if args.p < 1:
+        print("At least one worker is needed.")
+        exit(-1)
+    if args.perf and not counters.available():
+        print("perf is needed to collect hardware performance counters.")
+        exit(-1)
+    if args.adaptive and (args.min_samples < 2 or (args.max_samples is not None and args.max_samples < args.min_samples)):
+        print("At least two samples are needed, and the maximum can not be less than the minimum.")
+        exit(-1)
+    if args.pipeline is not None and (args.pipeline < 1 or args.p != 1):
+        print("Pipelining needs at least one compiled benchmark to wait, and can not be combined with multiple workers.")
+        exit(-1)
+    if args.cache and args.cache_size < 0:
+        print("The size of the cache can not be negative.")
+        exit(-1)
+    if args.budget is not None and (args.budget <= 0 or args.min_samples < 1):
+        print("The time budget should be positive, and at least one compilation should be kept.")
+        exit(-1)
+    if args.warmup is not None and args.warmup < 0:
+        print("The number of warm-up runs can not be negative.")
+        exit(-1)
+    if args.in_process is not None and args.in_process < 1:
+        print("The entry point should be called at least once within a run.")
+        exit(-1)
+    if args.object_cache and args.object_cache_size < 1:
+        print("The size of the object cache should be at least one megabyte.")
+        exit(-1)
+    build_cores = parallel.parse_core_list(args.build_cores) if args.build_cores is not None else None
+    measure_cores = parallel.parse_core_list(args.measure_cores) if args.measure_cores is not None else None
+    threads = None
+    if args.threads is not None:
+        if args.pipeline is not None:
+            cores = parallel.get_pipeline_cores(build_cores, measure_cores)[1]
+        else:
+            cores = parallel.get_core_sets(args.p)[0]
+        threads = parse_thread_counts(args.threads, len(cores))
+    return classes.RunOptions(
+        args.p,
+        args.perf,
+        args.adaptive,
+        args.statistic,
+        args.precision,
+        args.min_samples,
+        args.max_samples,
+        args.cache,
+        args.cache_size,
+        args.sample_compile,
+        args.binary_telemetry,
+        args.pipeline,
+        build_cores,
+        measure_cores,
+        args.resume,
+        shard.parse_shard(args.shard) if args.shard is not None else None,
+        args.shard_costs,
+        args.incremental,
+        args.budget,
+        args.noise_control,
+        args.warmup if args.warmup is not None else (1 if args.noise_control or args.object_cache else 0),
+        args.seed,
+        load_args_file(args.args_file) if args.args_file is not None else None,
+        args.benchmarks,
+        args.in_process,
+        args.object_cache,
+        args.object_cache_size,
+        threads
+    )
 
 
 def args_to_component(args: typing.Any) -> classes.Component:
@@ -0,0 +1,66 @@
+"""
+This module contains the logic to collect hardware performance counters for a command with perf stat.
+"""
+
+import os
+import shutil
+import tempfile
+import typing
+
+
+def get_events() -> typing.List[str]:
+    """
+    Get the hardware events that are counted, in the order in which they are placed in the csv file.
+    :return: The names of the events as perf knows them.
+    """
+    return ["cycles", "instructions", "branch-misses", "cache-misses", "iTLB-load-misses"]
+
+
+def available() -> bool:
+    """
+    Check if perf can be found to collect the counters.
+    :return: True if perf is available, otherwise False.
+    """
+    return shutil.which("perf") is not None
+
+
+def create_output_file() -> str:
+    """
+    Create a temporary file where perf can write the counters to, so that they are not mixed with the standard error of
+    the command.
+    :return: The path to the file.
+    """
+    handle, path = tempfile.mkstemp(prefix="perf_", suffix=".csv")
+    os.close(handle)
+    return path
+
+
+def wrap(command: typing.List[str], output_file: str) -> typing.List[str]:
+    """
+    Wrap a command so that it is run under perf stat.
+    :param command: The command to run.
+    :param output_file: The file where perf should write the counters to.
+    :return: The command that runs the original command under perf stat.
+    """
+    return ["perf", "stat", "-x", ",", "-e", ",".join(get_events()), "-o", output_file, "--"] + command
+
+
+def parse(output_file: str) -> typing.List[str]:
+    """
+    Parse the counters written by perf stat in the csv format, and remove the file afterward. Events that could not be
+    counted get the value -1.
+    :param output_file: The file perf wrote the counters to.
+    :return: The value of each event in the order given by get_events.
+    """
+    values = {}
+    with open(output_file, "r") as f:
+        for line in f.readlines():
+            if line.startswith("#") or line.strip() == "":
+                continue
+            components = line.strip().split(",")
+            if len(components) < 3:
+                continue
+            event = components[2].split(":")[0]
+            values[event] = components[0] if components[0].isnumeric() else "-1"
+    os.remove(output_file)
+    return list(map(lambda x: values.get(x, "-1"), get_events()))
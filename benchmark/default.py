@@ -2,13 +2,20 @@
 This module contains different default callbacks that are shared between multiple modules no matter the front-end.
 """
 
+import struct
 import subprocess
 import typing
-from itertools import groupby
 
 from . import classes
 
 
+TELEMETRY_HEADER = struct.Struct("=QBBHI")
+"""
+The header of a binary log record, with the time, type, part, length of the tag, and length of the data, followed by
+the tag and the data, see print_log_data in util/Util.h.
+"""
+
+
 def default_additional_steps(full_source: str, full_reference_target: str, full_jit_target: str,
                              component: classes.Component) -> None:
     """
@@ -40,56 +47,100 @@ def none_data_extraction(name: str, result: subprocess.CompletedProcess[bytes])
     return []
 
 
-def base_data_extraction(name: str, result: subprocess.CompletedProcess[bytes], part: classes.LogPart, expected_columns: int) -> typing.List[str]:
+def format_aggregate(aggregate: classes.TagAggregate) -> str:
     """
-    The default data extraction from the JIT, "[DATA,time,type,part,tag] data", with data being the data to process. The
-    rest is described in classes.Data.
-    :param result: The result from the subprocess finished.
-    :param name: The name of the benchmark that is ran.
+    Format the data logged by the JIT for a single tag. For the list type the values are sorted on time, and for the
+    average type the average is given.
+    :param aggregate: The aggregated data of the tag.
+    :return: The formatted data.
+    """
+    if aggregate.type == classes.LogType.List:
+        entries = sorted(aggregate.entries, key=lambda x: x[0])
+        return ",".join(map(lambda x: str(x[0]) + "\\" + x[1], entries))
+    return str(aggregate.total / aggregate.count)
+
+
+def format_log_data(telemetry: classes.LogStream, part: classes.LogPart, expected_columns: int) -> typing.List[str]:
+    """
+    Format the data logged by the JIT for a part, with a column for each tag sorted by the tag, see format_aggregate.
+    :param telemetry: The parsed output of the JIT.
     :param part: If it is for the front-end or back-end.
     :param expected_columns: How many columns there should be, will only be used if padding is needed.
     :return: The results for each tag.
     """
-    lines = result.stdout.splitlines()
-    data: typing.List[classes.Data] = []
-    for line in lines:
-        line = line.decode()
-        if line.startswith("[DATA,"):
-            parts = line.split(None, 1)
-            data.append(classes.Data(parts[0], parts[1]))
-
-    data = list(filter(lambda x: x.part == part, data))
-    data.sort(key=lambda x: x.tag)
-    mapped = {}
-
-    for k, g in groupby(data, lambda x: x.tag):
-        group = []
-        for e in g:
-            group.append(e)
-        type = group[0].type
-        if any(x.type != type for x in group):
-            print("Invalid type for log data.")
-            exit(-1)
-        group.sort(key=lambda x: x.time)
-        if type == classes.LogType.List:
-            mapped[k] = ",".join(list(map(lambda x: str(x.time) + "\\" + x.data, group)))
-        elif type == classes.LogType.Average:
-            if any(not x.isnumeric() for x in group):
-                print("Got non numeric value for average log type.")
-                exit(-1)
-            numbers = list(map(lambda x: int(x.data), group))
-            mapped[k] = str(sum(numbers) / len(numbers))
-
     result = []
-
-    for k in sorted(mapped.keys()):
-        result.append(f"{k}: {mapped[k]}")
+    for (p, tag), aggregate in sorted(telemetry.aggregates.items(), key=lambda x: x[0][1]):
+        if p == part:
+            result.append(f"{tag}: {format_aggregate(aggregate)}")
 
     while len(result) < expected_columns:
         result.append("")
     return result
 
 
+def get_telemetry_fd() -> int:
+    """
+    Get the file descriptor on which the JIT writes the binary log data.
+    :return: The file descriptor in the JIT.
+    """
+    return 3
+
+
+def binary_log_reader(telemetry: classes.LogStream) -> typing.Callable[[bytes], None]:
+    """
+    Create a callback that decodes the binary log data of the JIT, which is given in chunks while the JIT is running.
+    :param telemetry: The parser to add the decoded records to.
+    :return: A callback that gets the next chunk of the binary log data.
+    """
+    log_types = [classes.LogType.List, classes.LogType.Average]
+    log_parts = [classes.LogPart.FrontEnd, classes.LogPart.BackEnd, classes.LogPart.Whole]
+    pending = bytearray()
+
+    def __temp__(chunk: bytes) -> None:
+        """
+        Decode the records that are complete, and keep the rest until the next chunk.
+        :param chunk: The next chunk of the binary log data.
+        """
+        pending.extend(chunk)
+        offset = 0
+        while len(pending) - offset >= TELEMETRY_HEADER.size:
+            time, type, part, tag_length, data_length = TELEMETRY_HEADER.unpack_from(pending, offset)
+            start = offset + TELEMETRY_HEADER.size
+            end = start + tag_length + data_length
+            if end > len(pending):
+                break
+            telemetry.add(
+                time,
+                log_types[type],
+                log_parts[part],
+                pending[start:start + tag_length].decode(),
+                pending[start + tag_length:end].decode()
+            )
+            offset = end
+        del pending[:offset]
+    return __temp__
+
+
+def base_data_extraction(name: str, result: subprocess.CompletedProcess[bytes], part: classes.LogPart, expected_columns: int) -> typing.List[str]:
+    """
+    The default data extraction from the JIT, "[DATA,time,type,part,tag] data", with data being the data to process. The
+    rest is described in classes.Data. If the output was already parsed while the JIT was running that is used,
+    otherwise the standard output is parsed.
+    :param result: The result from the subprocess finished.
+    :param name: The name of the benchmark that is ran.
+    :param part: If it is for the front-end or back-end.
+    :param expected_columns: How many columns there should be, will only be used if padding is needed.
+    :return: The results for each tag.
+    """
+    if isinstance(result, classes.Measurement) and result.telemetry is not None:
+        telemetry = result.telemetry
+    else:
+        telemetry = classes.LogStream()
+        telemetry.feed(result.stdout)
+        telemetry.close()
+    return format_log_data(telemetry, part, expected_columns)
+
+
 def default_back_end_data_extraction(expected_columns: int) -> typing.Callable[[str, subprocess.CompletedProcess[bytes]], typing.List[str]]:
     """
     The default data extraction from the JIT back-end.
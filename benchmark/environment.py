@@ -0,0 +1,226 @@
+"""
+This module contains the control of the measurement environment. The state of the machine that influences the noise
+of the measurements, like the CPU frequency governor, turbo boost, and simultaneous multithreading, is recorded as a
+fingerprint which is stored with every result, and can be checked before a run. Address space layout randomization can
+be disabled for the measured processes, and the cells of a benchmark can be run in a randomly interleaved order.
+"""
+
+import ctypes
+import os
+import platform
+import random
+import typing
+
+from . import classes
+from . import parallel
+
+
+ADDR_NO_RANDOMIZE = 0x0040000
+"""
+The flag of the personality of a process which disables address space layout randomization for the programs it
+executes, see personality(2).
+"""
+
+fingerprints: typing.Dict[typing.Tuple[int, typing.Tuple[int, ...], typing.Optional[int]], str] = {}
+"""
+The fingerprint of the environment for each process, set of cores it may run on, and personality.
+"""
+
+checked = False
+"""
+If the environment is already checked by the current process, so that the warnings are only given once.
+"""
+
+
+def read_file(path: str) -> typing.Optional[str]:
+    """
+    Read a small file, like the files in sysfs and procfs.
+    :param path: The path to the file.
+    :return: The contents of the file without surrounding whitespace, or None if it can not be read.
+    """
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def get_governor(cores: typing.List[int]) -> str:
+    """
+    Get the CPU frequency governor of a set of cores.
+    :param cores: The cores.
+    :return: The governors of the cores separated by +, or unknown if they can not be read.
+    """
+    governors = set()
+    for core in cores:
+        governor = read_file(f"/sys/devices/system/cpu/cpu{core}/cpufreq/scaling_governor")
+        governors.add(governor if governor is not None else "unknown")
+    return "+".join(sorted(governors)) if len(governors) != 0 else "unknown"
+
+
+def get_turbo() -> str:
+    """
+    Get if turbo boost is enabled, either from the intel_pstate driver or from the generic boost setting.
+    :return: on, off, or unknown if it can not be read.
+    """
+    no_turbo = read_file("/sys/devices/system/cpu/intel_pstate/no_turbo")
+    if no_turbo is not None:
+        return "off" if no_turbo == "1" else "on"
+    boost = read_file("/sys/devices/system/cpu/cpufreq/boost")
+    if boost is not None:
+        return "on" if boost == "1" else "off"
+    return "unknown"
+
+
+def get_smt() -> str:
+    """
+    Get the state of simultaneous multithreading.
+    :return: The state as given by the kernel, such as on, off, or notsupported, or unknown if it can not be read.
+    """
+    control = read_file("/sys/devices/system/cpu/smt/control")
+    return control if control is not None else "unknown"
+
+
+def get_cpu() -> str:
+    """
+    Get the model of the CPU.
+    :return: The model name, or the machine type if it can not be read.
+    """
+    cpuinfo = read_file("/proc/cpuinfo")
+    if cpuinfo is not None:
+        for line in cpuinfo.split("\n"):
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+    return platform.machine()
+
+
+def get_personality() -> typing.Optional[int]:
+    """
+    Get the personality of the current process, which is inherited by the processes it starts.
+    :return: The personality, or None if it can not be read.
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    libc.personality.argtypes = [ctypes.c_ulong]
+    result = libc.personality(0xffffffff)
+    return None if result == -1 else result
+
+
+def disable_aslr() -> bool:
+    """
+    Disable address space layout randomization for the programs executed by the current process and its children, by
+    setting ADDR_NO_RANDOMIZE in its personality.
+    :return: True if it is disabled.
+    """
+    current = get_personality()
+    if current is None:
+        return False
+    if current & ADDR_NO_RANDOMIZE:
+        return True
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.personality.argtypes = [ctypes.c_ulong]
+    return libc.personality(current | ADDR_NO_RANDOMIZE) != -1 and get_personality() & ADDR_NO_RANDOMIZE != 0
+
+
+def get_aslr() -> str:
+    """
+    Get if address space layout randomization is used for the programs executed by the current process.
+    :return: on, off, or unknown if it can not be read.
+    """
+    personality = get_personality()
+    if personality is not None and personality & ADDR_NO_RANDOMIZE:
+        return "off"
+    randomize = read_file("/proc/sys/kernel/randomize_va_space")
+    if randomize is None:
+        return "unknown"
+    return "off" if randomize == "0" else "on"
+
+
+def get_environment() -> typing.Dict[str, str]:
+    """
+    Get the state of the environment of the current process that influences the measurements.
+    :return: The state, keyed on its name.
+    """
+    cores = sorted(os.sched_getaffinity(0))
+    return {
+        "cpu": get_cpu(),
+        "kernel": platform.release(),
+        "governor": get_governor(cores),
+        "turbo": get_turbo(),
+        "smt": get_smt(),
+        "aslr": get_aslr(),
+        "cores": ",".join(map(str, cores))
+    }
+
+
+def get_fingerprint() -> str:
+    """
+    Get the fingerprint of the environment of the current process, which is stored with every result. It is computed
+    once for each process, set of cores, and personality, since the workers are pinned to different cores and address
+    space layout randomization can be disabled later.
+    :return: The state of the environment as name=value pairs separated by semicolons.
+    """
+    key = (os.getpid(), tuple(sorted(os.sched_getaffinity(0))), get_personality())
+    if key not in fingerprints:
+        fingerprints[key] = ";".join(map(lambda x: f"{x[0]}={x[1]}", get_environment().items()))
+    return fingerprints[key]
+
+
+def check() -> None:
+    """
+    Check the environment for a state that makes the measurements noisy, and warn about each one that is found.
+    """
+    global checked
+    if checked:
+        return
+    checked = True
+    environment = get_environment()
+    if environment["governor"] != "performance":
+        print(f"The CPU frequency governor is {environment['governor']} instead of performance.")
+    if environment["turbo"] != "off":
+        print(f"Turbo boost is {environment['turbo']} instead of off.")
+    if environment["smt"] not in ["off", "forceoff", "notsupported"]:
+        print(f"Simultaneous multithreading is {environment['smt']} instead of off.")
+    if len(parallel.get_isolated_cores()) == 0:
+        print("There are no isolated cores, the benchmarks share their cores with other processes.")
+
+
+def prepare(options: classes.RunOptions) -> None:
+    """
+    Prepare the environment of the current process for a run when controlling the noise. The environment is checked,
+    address space layout randomization is disabled for the measured processes, and when the cells are run one after
+    the other the current process is pinned to the isolated cores. The workers and pipelining pin themselves already.
+    :param options: The options for how the benchmarks are executed.
+    """
+    if not options.noise_control:
+        return
+    check()
+    if not disable_aslr():
+        print("Could not disable address space layout randomization.")
+    if options.workers == 1 and options.pipeline is None:
+        os.sched_setaffinity(0, parallel.get_core_sets(1)[0])
+
+
+def get_interleaving(cells: typing.List[classes.Cell], seed: int) -> typing.List[int]:
+    """
+    Get an order in which to run the cells one after the other, where the compilations of the reference implementation
+    and the configurations of the JIT are interleaved within each benchmark. The n-th compilation of each configuration
+    of a benchmark is run before any (n + 1)-th compilation, in a random order, so that a drift of the machine over time
+    is spread over the configurations. The benchmarks are run in the order of their first cell.
+    :param cells: The cells, in the order in which their results are placed in the csv files.
+    :param seed: The seed of the random order, so that the order can be repeated.
+    :return: The indices of the cells in the order in which they should be run.
+    """
+    generator = random.Random(seed)
+    benchmarks: typing.Dict[str, typing.Dict[int, typing.List[int]]] = {}
+    for index, cell in enumerate(cells):
+        benchmarks.setdefault(cell.source_directory, {}).setdefault(cell.recompilation, []).append(index)
+    order = []
+    for rounds in benchmarks.values():
+        for recompilation in sorted(rounds):
+            indices = rounds[recompilation]
+            generator.shuffle(indices)
+            order += indices
+    return order
@@ -5,13 +5,17 @@ This module contains functions to handle files that is needed no matter the fron
 import os
 import typing
 import shutil
-import time
-import subprocess
 from datetime import datetime
 
 from . import classes
 
 
+build_slot: typing.Optional[int] = None
+"""
+The slot of the current worker, which is used to give each worker its own directories to build in.
+"""
+
+
 def add_run_file(path: str) -> str:
     """
     Add the name of the run script to the path.
@@ -57,6 +61,42 @@ def get_other_data_jit_file(path: str) -> str:
     return os.path.join(path, "other_data_jit.csv")
 
 
+def get_counter_data_reference_file(path: str) -> str:
+    """
+    Add the name of the hardware counter data csv for the reference implementation to the path.
+    :param path: The path that is the basis for the compile script.
+    :return: The path to the csv file.
+    """
+    return os.path.join(path, "counter_data_reference.csv")
+
+
+def get_counter_data_jit_file(path: str) -> str:
+    """
+    Add the name of the hardware counter data csv for the JIT to the path.
+    :param path: The path that is the basis for the compile script.
+    :return: The path to the csv file.
+    """
+    return os.path.join(path, "counter_data_jit.csv")
+
+
+def get_sample_data_reference_file(path: str) -> str:
+    """
+    Add the name of the csv with the number of samples taken for the reference implementation to the path.
+    :param path: The path that is the basis for the compile script.
+    :return: The path to the csv file.
+    """
+    return os.path.join(path, "sample_data_reference.csv")
+
+
+def get_sample_data_jit_file(path: str) -> str:
+    """
+    Add the name of the csv with the number of samples taken for the JIT to the path.
+    :param path: The path that is the basis for the compile script.
+    :return: The path to the csv file.
+    """
+    return os.path.join(path, "sample_data_jit.csv")
+
+
 def get_source_directory(path: str) -> str:
     """
     Add the name of the source directory to the path.
@@ -84,6 +124,31 @@ def get_jit_directory(path: str) -> str:
     return os.path.join(path, "jit")
 
 
+def get_results_file() -> str:
+    """
+    Get the database in which the results of all benchmarks are stored, which is placed in the final data directory.
+    :return: The path to the database.
+    """
+    return os.path.join(get_data_directory(os.path.dirname(os.path.abspath(__file__))), "results.sqlite")
+
+
+def get_cache_directory() -> str:
+    """
+    Get the directory of the cache with compiled benchmarks, which is shared between all benchmarks.
+    :return: The path to the cache directory.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def get_object_cache_directory() -> str:
+    """
+    Get the directory of the persistent cache with the objects compiled by the JIT, which is shared between all
+    benchmarks.
+    :return: The path to the object cache directory.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "object_cache")
+
+
 def get_data_directory(path: str) -> str:
     """
     Add the name of the final data directory to the path.
@@ -93,6 +158,27 @@ def get_data_directory(path: str) -> str:
     return os.path.join(path, "data")
 
 
+def set_build_slot(slot: typing.Optional[int]) -> None:
+    """
+    Set the slot of the current worker, so that builds of different workers do not overwrite each other.
+    :param slot: The slot of the worker, or None if there is only a single worker.
+    """
+    global build_slot
+    build_slot = slot
+
+
+def get_build_name(benchmark: str) -> str:
+    """
+    Get the name of the directory in which a benchmark is built, which is unique for each worker.
+    :param benchmark: The name of the benchmark.
+    :return: The name of the directory in which the benchmark is built.
+    """
+    name = benchmark.replace("/", "_")
+    if build_slot is not None:
+        name += f".{build_slot}"
+    return name
+
+
 def recreate_file(paths: typing.List[str]) -> None:
     """
     Delete and create the given file.
@@ -188,7 +274,11 @@ def remove_data_files(directory: str) -> None:
         get_time_data_reference_file(directory),
         get_time_data_jit_file(directory),
         get_other_data_reference_file(directory),
-        get_other_data_jit_file(directory)
+        get_other_data_jit_file(directory),
+        get_counter_data_reference_file(directory),
+        get_counter_data_jit_file(directory),
+        get_sample_data_reference_file(directory),
+        get_sample_data_jit_file(directory)
     ])
 
 
@@ -198,9 +288,11 @@ def append_file(source: str, target: str) -> None:
     :param source: The source file of the data.
     :param target: The file to which to add the data.
     """
-    while not os.path.exists(source):
-        time.sleep(1)
-    subprocess.run(["cat " + source + " >> " + target], shell=True, check=True)
+    if not os.path.exists(source):
+        print(f"The data file {source} was not created.")
+        exit(-1)
+    with open(source, "rb") as source_file, open(target, "ab") as target_file:
+        shutil.copyfileobj(source_file, target_file)
 
 
 def persist_data_files(path: str, frontend: str, back_end: str) -> None:
@@ -219,7 +311,7 @@ def persist_data_files(path: str, frontend: str, back_end: str) -> None:
         "." + back_end if back_end is not None else "") + "." + basename
     target = os.path.join(data_directory, basename)
 
-    subprocess.run(["cat " + path + " >> " + target], shell=True, check=True)
+    append_file(path, target)
     remove_if_exists(path)
 
 
@@ -274,6 +366,10 @@ def copy_data_files(
         base_other_reference = get_other_data_reference_file(target)
         copy_data(other_reference, base_other_reference, frontend, back_end, persist)
 
+        for get_file in [get_counter_data_reference_file, get_sample_data_reference_file]:
+            if os.path.exists(get_file(source)):
+                copy_data(get_file(source), get_file(target), frontend, back_end, persist)
+
     if component == classes.Component.JIT or component == classes.Component.BOTH:
         benchmark_jit = get_time_data_jit_file(source)
         base_benchmark_jit = get_time_data_jit_file(target)
@@ -283,6 +379,10 @@ def copy_data_files(
         base_other_jit = get_other_data_jit_file(target)
         copy_data(other_jit, base_other_jit, frontend, back_end, persist)
 
+        for get_file in [get_counter_data_jit_file, get_sample_data_jit_file]:
+            if os.path.exists(get_file(source)):
+                copy_data(get_file(source), get_file(target), frontend, back_end, persist)
+
 
 def copy_file(full_source: str, directory: str, file: str) -> None:
     """
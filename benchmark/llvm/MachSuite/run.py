@@ -75,7 +75,8 @@ def main(args: typing.Any):
         common.back_end_parsing(args.b),
         common.args_to_component(args),
         args.b,
-        args.s
+        args.s,
+        common.args_to_options(args)
     )
 
 
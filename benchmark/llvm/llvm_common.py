@@ -5,13 +5,16 @@ This module contains functions shared between multiple LLVM benchmarks.
 import os
 import subprocess
 import shutil
+import tempfile
 import typing
 import argparse
 
+from .. import cache
 from .. import common
 from .. import classes
 from .. import default
 from .. import files
+from .. import timing
 
 
 def compiler() -> str:
@@ -39,77 +42,127 @@ def filter_wrapper(filter_source_files: typing.Callable[[str], bool]) -> typing.
     return lambda name: (name.endswith(".c") or name.endswith(".h")) and filter_source_files(name)
 
 
+def sample_compile(command: typing.List[str]) -> float:
+    """
+    Time the compiler for a benchmark in a temporary directory, without using what is compiled.
+    :param command: The compile command.
+    :return: The time in milliseconds it took to compile.
+    """
+    directory = os.getcwd()
+    temporary = tempfile.mkdtemp(prefix="sample_compile_")
+    os.chdir(temporary)
+    time = timing.spawn(command).wall_ms()
+    os.chdir(directory)
+    shutil.rmtree(temporary)
+    return time
+
+
+def get_compile_command(
+        includes: typing.List[str],
+        include_sources: typing.List[str],
+        filter_source_files: typing.Callable[[str], bool],
+        benchmark_root: str,
+        benchmark: str,
+        jit: bool
+) -> typing.Tuple[typing.List[str], typing.List[str]]:
+    """
+    Get the command to compile a benchmark, and the files that can influence the compilation.
+    :param includes: The folders to include.
+    :param include_sources: The source files in the folders to include.
+    :param filter_source_files: A callback to filter source files of a benchmark.
+    :param benchmark_root: The root directory of the benchmark.
+    :param benchmark: The benchmark to compile.
+    :param jit: If it is for a JIT.
+    :return: The compile command, and the source files of the benchmark together with the included source files.
+    """
+    source_directory = files.get_source_directory(benchmark_root)
+    source_files = files.get_all_source_files([os.path.join(source_directory, benchmark)], filter_wrapper(filter_source_files))
+    if jit:
+        command = [compiler(), "-S", "-emit-llvm", "-O", "-Xclang", "-disable-llvm-passes"] + list(map(lambda x: "-I" + x, includes)) + source_files + include_sources
+    else:
+        command = [compiler(), "-O3", "-lm"] + list(map(lambda x: "-I" + x, includes)) + source_files + include_sources
+    return command, source_files + include_sources
+
+
+def fingerprint(
+        includes: typing.List[str],
+        filter_source_files: typing.Callable[[str], bool]
+) -> typing.Callable[[str, str, bool], str]:
+    """
+    Create a callback to get the fingerprint of the compilation of a benchmark, which changes when the compiler version,
+    the compile command, or the contents of the source and included files change, see cache.compute_key.
+    :param includes: The folders to include.
+    :param filter_source_files: A callback to filter source files of a benchmark.
+    :return: A callback to get the fingerprint of the compilation of a benchmark.
+    """
+    include_sources = files.get_all_source_files(includes, filter_wrapper(filter_source_files))
+
+    def __temp__(benchmark_root: str, benchmark: str, jit: bool) -> str:
+        """
+        Get the fingerprint of the compilation of a benchmark.
+        :param benchmark_root: The root directory of the benchmark.
+        :param benchmark: The benchmark.
+        :param jit: If it is for a JIT.
+        :return: The fingerprint.
+        """
+        return cache.compute_key(*get_compile_command(includes, include_sources, filter_source_files, benchmark_root, benchmark, jit))
+    return __temp__
+
+
 def compile(
         includes: typing.List[str],
         filter_source_files: typing.Callable[[str], bool],
-        additional_steps: typing.Callable[[str, str, str, classes.Component], None]
+        additional_steps: typing.Callable[[str, str, str, classes.Component], None],
+        options: classes.RunOptions
 ) -> typing.Callable[[str, str, bool, int], None]:
     """
     Create a callback to compile a benchmark.
     :param includes: The folders to include.
     :param filter_source_files: A callback to filter source files of a benchmark.
     :param additional_steps: A callback for any additional steps to take.
+    :param options: The options for how the benchmarks are executed.
     :return: A callback to compile a benchmark.
     """
     include_sources = files.get_all_source_files(includes, filter_wrapper(filter_source_files))
 
     def __temp__(benchmark_root: str, benchmark: str, jit: bool, i: int, last: bool):
         """
-        Compile a benchmark.
+        Compile a benchmark. If the cache is used and the same compilation was done before, the compiled benchmark is
+        taken from the cache, and the compile time is only recorded when the compiler is sampled.
         :param benchmark_root: The root directory of the benchmark.
         :param benchmark: The benchmark to run.
         :param jit: If it is for a JIT.
         :param i: The run number.
+        :param last: If it is the last run.
         """
         print(f"started compiling {benchmark} for run {i + 1}")
         source_directory = files.get_source_directory(benchmark_root)
-        source_files = files.get_all_source_files([os.path.join(source_directory, benchmark)], filter_wrapper(filter_source_files))
-        reference_directory = files.get_reference_directory(benchmark_root)
-        full_reference_target = os.path.join(reference_directory, benchmark.replace("/", "_"))
-        jit_directory = files.get_jit_directory(benchmark_root)
-        full_jit_target = os.path.join(jit_directory, benchmark.replace("/", "_"))
+        command, all_source_files = get_compile_command(includes, include_sources, filter_source_files, benchmark_root, benchmark, jit)
+        full_reference_target = os.path.join(files.get_reference_directory(benchmark_root), files.get_build_name(benchmark))
+        full_jit_target = os.path.join(files.get_jit_directory(benchmark_root), files.get_build_name(benchmark))
         if jit:
-            if os.path.exists(full_jit_target):
-                shutil.rmtree(full_jit_target)
-            os.makedirs(full_jit_target)
-            os.chdir(full_jit_target)
-            full_command = " ".join(["time", compiler(), "-S", "-emit-llvm", "-O", "-Xclang", "-disable-llvm-passes"] + list(map(lambda x: "-I" + x, includes)) + source_files + include_sources)
-            full_command = f"/bin/bash -c \"{full_command}\""
-            result = subprocess.run(
-                [full_command],
-                capture_output=True,
-                shell=True
-            )
-            while len(os.listdir(full_jit_target)) == 0:
-                pass
-            time = common.get_time(result.stderr)
-            with open(add_jit_time_compile_file(benchmark_root), "a+") as f:
-                if i == 0:
-                    f.write(benchmark)
-                f.write(f",{time}")
-                if last:
-                    f.write("\n")
+            target = full_jit_target
+            compile_file = add_jit_time_compile_file(benchmark_root)
+        else:
+            target = full_reference_target
+            compile_file = add_reference_time_compile_file(benchmark_root)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.makedirs(target)
+        os.chdir(target)
+
+        key = cache.compute_key(command, all_source_files) if options.cache else None
+        if key is not None and cache.lookup(key, target) is not None:
+            if options.sample_compile:
+                write_compile_data(compile_file, benchmark, i, sample_compile(command))
         else:
-            if os.path.exists(full_reference_target):
-                shutil.rmtree(full_reference_target)
-            os.makedirs(full_reference_target)
-            os.chdir(full_reference_target)
-            full_command = " ".join(["time", compiler(), "-O3", "-lm"] + list(map(lambda x: "-I" + x, includes)) + source_files + include_sources)
-            full_command = f"/bin/bash -c \"{full_command}\""
-            result = subprocess.run(
-                [full_command],
-                capture_output=True,
-                shell=True
-            )
-            while len(os.listdir(full_reference_target)) == 0:
-                pass
-            time = common.get_time(result.stderr)
-            with open(add_reference_time_compile_file(benchmark_root), "a+") as f:
-                if i == 0:
-                    f.write(benchmark)
-                f.write(f",{time}")
-                if last:
-                    f.write("\n")
+            result = timing.spawn(command)
+            if result.returncode != 0:
+                print(f"Could not compile {benchmark}:\n{result.stderr.decode()}")
+            time = result.wall_ms()
+            write_compile_data(compile_file, benchmark, i, time)
+            if key is not None and result.returncode == 0:
+                cache.store(key, target, time, options.cache_size * 1024 * 1024)
 
         additional_steps(os.path.join(source_directory, benchmark), full_reference_target, full_jit_target, classes.Component.JIT if jit else classes.Component.REFERENCE)
         print(f"finished compiling {benchmark} for run {i + 1}")
@@ -161,6 +214,19 @@ def parse_compile_args() -> typing.Any:
     return args
 
 
+def write_compile_data(path: str, name: str, i: int, time: float) -> None:
+    """
+    Write the time taken to compile a benchmark to the file with the temporary results, each compilation is written to
+    its own line so that workers running in parallel do not interfere with each other.
+    :param path: The path to the file with the temporary results.
+    :param name: The name of the benchmark.
+    :param i: The run number.
+    :param time: The time it took to compile.
+    """
+    with open(path, "a+") as f:
+        f.write(f"{files.get_build_name(name)},{i},{time}\n")
+
+
 def read_compile_data(path: str) -> typing.Callable[[str, bool, int], str]:
     """
     Create a callback that reads the time taken to compile a benchmark.
@@ -173,19 +239,22 @@ def read_compile_data(path: str) -> typing.Callable[[str, bool, int], str]:
         :param name: The name of the benchmark.
         :param jit: If it is for a JIT.
         :param i: The run number.
-        :return: The time it took to compile, with "PreCompile: " as a prefix
+        :return: The time it took to compile, with "PreCompile: " as a prefix, which is -1 if it was not measured.
         """
         if jit:
             full_path = add_jit_time_compile_file(path)
         else:
             full_path = add_reference_time_compile_file(path)
+        if not os.path.exists(full_path):
+            return "PreCompile: -1"
+        build_name = files.get_build_name(name)
         with open(full_path, "r+") as f:
             lines = f.readlines()
             lines.reverse()
             for line in lines:
-                components = line.split(",", 1)
-                if name.startswith(components[0]):
-                    return "PreCompile: " + components[1].split(",")[i].strip()
+                components = line.strip().split(",")
+                if components[0] == build_name and components[1] == str(i):
+                    return "PreCompile: " + components[2]
         return "PreCompile: -1"
     return __temp__
 
@@ -202,7 +271,8 @@ def run(
         back_end_extraction: typing.Callable[[str, subprocess.CompletedProcess[bytes]], typing.List[str]],
         component: classes.Component,
         back_end: str,
-        single
+        single: bool,
+        options: classes.RunOptions
 ) -> None:
     """
     Run the benchmark in a specific folder.
@@ -218,21 +288,26 @@ def run(
     :param component: If it is for the JIT, reference implementation, or both.
     :param back_end: The name of the back-end being used.
     :param single: If a single iteration should happen within a compilation.
+    :param options: The options for how the benchmarks are executed.
     """
+    back_end_args = options.back_end_args if options.back_end_args is not None else common.back_end_args(back_end)
+    if options.threads is not None:
+        back_end_args = common.thread_args(back_end_args, options.threads)
     temp_jit = add_jit_time_compile_file(path)
     temp_reference = add_reference_time_compile_file(path)
     files.remove_files([temp_jit, temp_reference])
     common.run(
         path,
         prefix,
-        compile(includes, filter_source_files, additional_steps),
+        compile(includes, filter_source_files, additional_steps, options),
         sources,
         arguments,
         classes.ComponentData(
             component,
-            [classes.Args("None", "")],
-            common.back_end_args(back_end),
-            default.default_front_end_data_extraction(1),
+            [classes.Args("None", "") if options.in_process is None else
+             classes.Args(f"x{options.in_process}", f"-iterations={options.in_process}")],
+            common.object_cache_args(back_end_args, options.object_cache_size) if options.object_cache else back_end_args,
+            default.default_front_end_data_extraction(2),
             back_end_extraction,
             default.none_data_extraction,
             jit,
@@ -240,7 +315,9 @@ def run(
             get_llvm_files
         ),
         read_compile_data(path),
-        single
+        single,
+        options,
+        fingerprint(includes, filter_source_files)
     )
 
 
@@ -3,12 +3,12 @@ This module is the main entry point to run benchmarks for LLVM.
 """
 
 import os
-import subprocess
 import typing
 
 from . import llvm_common
 from .. import common
 from .. import files
+from .. import orchestration
 
 
 def main(args: typing.Any):
@@ -30,9 +30,7 @@ def main(args: typing.Any):
         if not os.path.isfile(run_file):
             print("finished " + directory)
             continue
-        os.chdir(os.path.join(os.path.dirname(base_directory), "../"))
-        run_module = os.path.relpath(run_file).replace("/", ".")[:-3]
-        subprocess.run(["python3", "-m", run_module] + common.args_to_run_array(args), check=True)
+        orchestration.run_suite(run_file, args)
         files.simple_copy_data_files(directory, base_directory, component)
 
         print("finished " + directory)
@@ -0,0 +1,164 @@
+"""
+This module contains the event-driven core to run child processes and benchmark suites. Child processes are waited on
+through the event loop, by reading their output when it is available and waiting for their exit with a pidfd, so that
+many of them can be driven at the same time without polling.
+"""
+
+import asyncio
+import importlib
+import os
+import time
+import typing
+
+from . import classes
+from . import default
+
+
+def to_ns(seconds: float) -> int:
+    """
+    Convert a time in seconds as given by the resource usage to nanoseconds.
+    :param seconds: The time in seconds.
+    :return: The time in nanoseconds.
+    """
+    return int(round(seconds * 1_000_000_000))
+
+
+def wait_blocking(pid: int) -> typing.Tuple[int, typing.Any]:
+    """
+    Wait for a process to exit by blocking the current thread.
+    :param pid: The process to wait for.
+    :return: The status of the process and the resources it used.
+    """
+    _, status, usage = os.wait4(pid, 0)
+    return status, usage
+
+
+async def wait_process(pid: int) -> typing.Tuple[int, typing.Any]:
+    """
+    Wait for a process to exit, using a pidfd which becomes readable when the process exits. If pidfds are not
+    supported, the waiting is done in a separate thread instead.
+    :param pid: The process to wait for.
+    :return: The status of the process and the resources it used.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return await loop.run_in_executor(None, wait_blocking, pid)
+    exited = loop.create_future()
+    loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+    return wait_blocking(pid)
+
+
+async def read_pipe(pipe: int, consume: typing.Optional[typing.Callable[[bytes], None]] = None) -> bytes:
+    """
+    Read from a pipe until it is closed by the writing side, and close it afterward.
+    :param pipe: The reading side of the pipe.
+    :param consume: A callback which gets each chunk as soon as it is read, in which case the data is not kept.
+    :return: All data read from the pipe, or nothing if the chunks are consumed.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = []
+    closed = loop.create_future()
+
+    def __temp__():
+        """
+        Read the data that is available on the pipe.
+        """
+        data = os.read(pipe, 65536)
+        if data and consume is not None:
+            consume(data)
+        elif data:
+            chunks.append(data)
+        else:
+            loop.remove_reader(pipe)
+            os.close(pipe)
+            closed.set_result(b"".join(chunks))
+    loop.add_reader(pipe, __temp__)
+    return await closed
+
+
+async def spawn(
+        command: typing.List[str],
+        telemetry: typing.Optional[classes.LogStream] = None,
+        telemetry_fd: typing.Optional[int] = None
+) -> classes.Measurement:
+    """
+    Run a command directly with posix_spawn, and measure the resources it used with wait4.
+    :param command: The command to run, the first element is searched for in the PATH.
+    :param telemetry: A parser that gets the standard output while the command is running, in which case the standard
+    output itself is not kept.
+    :param telemetry_fd: The file descriptor in the command on which it writes binary log data for the parser, see
+    default.binary_log_reader, or None if there is no binary log data.
+    :return: The measurement of the command.
+    """
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    file_actions = [
+        (os.POSIX_SPAWN_DUP2, stdout_write, 1),
+        (os.POSIX_SPAWN_DUP2, stderr_write, 2)
+    ]
+    pipes = [stdout_read, stdout_write, stderr_read, stderr_write]
+    if telemetry is not None and telemetry_fd is not None:
+        telemetry_read, telemetry_write = os.pipe()
+        file_actions.append((os.POSIX_SPAWN_DUP2, telemetry_write, telemetry_fd))
+        pipes += [telemetry_read, telemetry_write]
+    start = time.perf_counter_ns()
+    try:
+        pid = os.posix_spawnp(command[0], command, os.environ, file_actions=file_actions)
+    except OSError as e:
+        for pipe in pipes:
+            os.close(pipe)
+        print(f"Could not run {command[0]}: {e}")
+        return classes.Measurement(command, 127, b"", str(e).encode(), -1, -1, -1, -1, -1, -1, -1, -1, telemetry)
+    for pipe in pipes[1::2]:
+        os.close(pipe)
+    readers = [
+        read_pipe(stdout_read, telemetry.feed if telemetry is not None else None),
+        read_pipe(stderr_read)
+    ]
+    if len(pipes) > 4:
+        readers.append(read_pipe(pipes[4], default.binary_log_reader(telemetry)))
+    stdout, stderr, *_, (status, usage) = await asyncio.gather(*readers, wait_process(pid))
+    end = time.perf_counter_ns()
+    if telemetry is not None:
+        telemetry.close()
+    return classes.Measurement(
+        command,
+        os.waitstatus_to_exitcode(status),
+        stdout,
+        stderr,
+        end - start,
+        to_ns(usage.ru_utime),
+        to_ns(usage.ru_stime),
+        usage.ru_maxrss,
+        usage.ru_minflt,
+        usage.ru_majflt,
+        usage.ru_nvcsw,
+        usage.ru_nivcsw,
+        telemetry
+    )
+
+
+def get_run_module(run_file: str) -> str:
+    """
+    Get the name of the module of a run script, relative to the directory that contains the benchmark package.
+    :param run_file: The path to the run script.
+    :return: The name of the module.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return ".".join(os.path.relpath(os.path.abspath(run_file)[:-3], root).split(os.sep))
+
+
+def run_suite(run_file: str, args: typing.Any) -> None:
+    """
+    Run the benchmarks of a run script within the current process, instead of starting a new interpreter.
+    :param run_file: The path to the run script.
+    :param args: The arguments to pass to the main function of the run script.
+    """
+    importlib.import_module(get_run_module(run_file)).main(args)
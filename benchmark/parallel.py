@@ -0,0 +1,367 @@
+"""
+This module contains the logic to execute independent cells of a benchmark run in a pool of workers, where each worker
+is pinned to its own set of cores so that the timings of different workers stay comparable, or to pipeline the
+compilation of cells with the measurement of earlier cells on disjoint sets of cores.
+"""
+
+import collections
+import multiprocessing
+import os
+import queue
+import typing
+
+from . import classes
+from . import files
+
+
+execute_cell: typing.Optional[typing.Callable[[int], typing.Any]] = None
+"""
+The callback that executes a cell, it is set before the workers are forked so that it does not need to be pickled.
+"""
+
+
+def parse_core_list(cores: str) -> typing.List[int]:
+    """
+    Parse a list of cores in the format used by the kernel, for example "0-3,8,10-11".
+    :param cores: The list of cores to parse.
+    :return: The cores in the list.
+    """
+    result = []
+    for part in cores.strip().split(","):
+        if part == "":
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            result += list(range(int(start), int(end) + 1))
+        else:
+            result.append(int(part))
+    return result
+
+
+def get_isolated_cores() -> typing.List[int]:
+    """
+    Get the cores that are isolated from the scheduler of the kernel, with the isolcpus boot parameter.
+    :return: The isolated cores, or an empty list if there are none.
+    """
+    path = "/sys/devices/system/cpu/isolated"
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r") as f:
+        return parse_core_list(f.read())
+
+
+def get_core_sets(workers: int) -> typing.List[typing.List[int]]:
+    """
+    Divide the available cores into disjoint sets of equal size, one for each worker. The isolated cores are preferred
+    if there are enough for each worker, otherwise the cores the current process may run on are used.
+    :param workers: The number of workers.
+    :return: The cores for each worker.
+    """
+    cores = get_isolated_cores()
+    if len(cores) < workers:
+        cores = sorted(os.sched_getaffinity(0))
+    if len(cores) < workers:
+        print(f"Can not pin {workers} workers to {len(cores)} cores.")
+        exit(-1)
+    size = len(cores) // workers
+    return [cores[i * size:(i + 1) * size] for i in range(workers)]
+
+
+def get_pipeline_cores(
+        build_cores: typing.Optional[typing.List[int]],
+        measure_cores: typing.Optional[typing.List[int]]
+) -> typing.Tuple[typing.List[int], typing.List[int]]:
+    """
+    Get the disjoint sets of cores to compile and to measure on when pipelining. The measure cores default to the
+    isolated cores, or otherwise the upper half of the cores the current process may run on, and the build cores default
+    to the cores the current process may run on which are not used for measuring.
+    :param build_cores: The cores to compile on, or None for the default.
+    :param measure_cores: The cores to measure on, or None for the default.
+    :return: The build cores and the measure cores.
+    """
+    available = sorted(os.sched_getaffinity(0))
+    if measure_cores is None:
+        measure_cores = get_isolated_cores()
+        if len(measure_cores) == 0:
+            measure_cores = available[len(available) // 2:]
+    if build_cores is None:
+        build_cores = [core for core in available if core not in measure_cores]
+    if len(build_cores) == 0 or len(measure_cores) == 0:
+        print("At least one core is needed to compile on and one to measure on.")
+        exit(-1)
+    if len(set(build_cores) & set(measure_cores)) != 0:
+        print("The cores to compile on and the cores to measure on can not overlap.")
+        exit(-1)
+    return build_cores, measure_cores
+
+
+def initialize_worker(slots: typing.Any, core_sets: typing.List[typing.List[int]]) -> None:
+    """
+    Initialize a worker by claiming a slot, pinning it to the cores of the slot, and giving it its own build
+    directories.
+    :param slots: The queue with the slots that are not yet claimed.
+    :param core_sets: The cores for each slot.
+    """
+    slot = slots.get()
+    os.sched_setaffinity(0, core_sets[slot])
+    files.set_build_slot(slot)
+
+
+def initialize_builder(build_cores: typing.List[int]) -> None:
+    """
+    Initialize a worker that compiles benchmarks when pipelining by pinning it to the build cores.
+    :param build_cores: The cores to compile on.
+    """
+    os.sched_setaffinity(0, build_cores)
+
+
+def build_in_worker(index: int, slot: int) -> None:
+    """
+    Compile a cell within a worker, in the build directories of the given slot.
+    :param index: The index of the cell to compile.
+    :param slot: The slot of the build directories.
+    """
+    files.set_build_slot(slot)
+    execute_cell(index)
+
+
+def run_in_worker(index: int) -> typing.Any:
+    """
+    Execute a cell within a worker.
+    :param index: The index of the cell to execute.
+    :return: The result of the cell.
+    """
+    return execute_cell(index)
+
+
+def get_group_of(groups: typing.List[typing.List[int]]) -> typing.Dict[int, int]:
+    """
+    Get the group of each cell.
+    :param groups: The indices of the cells of each group.
+    :return: The index of the group, keyed on the index of the cell.
+    """
+    return {index: g for g, group in enumerate(groups) for index in group}
+
+
+def run_serial(
+        groups: typing.List[typing.List[int]],
+        execute: typing.Callable[[int], typing.Any],
+        stop: typing.Callable[[typing.List[typing.Any]], bool],
+        plan: typing.Optional[classes.Plan] = None,
+        cell_order: typing.Optional[typing.List[int]] = None
+) -> typing.Iterator[typing.List[typing.Any]]:
+    """
+    Execute groups of cells one after the other in the current process. The cells are run in the given order, where
+    the cells of a group should keep their order, so that the cells of different groups can be interleaved. A group is
+    given back as soon as all its cells are finished, and all groups before it are given back.
+    :param groups: The indices of the cells of each group.
+    :param execute: A callback to execute the cell with the given index.
+    :param stop: A callback that gets the results of a group so far, and indicates if no more cells should be run.
+    :param plan: The plan that is told about the progress of the cells, and which decides if a cell is dropped, or None
+    to run every cell.
+    :param cell_order: The indices of the cells in the order in which they are run, or None to run the groups one after
+    the other.
+    :return: The results of the cells for each group, without the cells that were dropped.
+    """
+    if cell_order is None:
+        cell_order = [index for group in groups for index in group]
+    group_of = get_group_of(groups)
+    results: typing.List[typing.List[typing.Any]] = [[] for _ in groups]
+    remaining = [len(group) for group in groups]
+    stopped = [False] * len(groups)
+    next_group = 0
+    for index in cell_order:
+        g = group_of[index]
+        remaining[g] -= 1
+        if stopped[g]:
+            if plan is not None:
+                plan.cancel(index)
+        elif plan is None or not plan.skip(index):
+            results[g].append(execute(index))
+            if plan is not None:
+                plan.finish(index)
+            stopped[g] = stop(results[g])
+        while next_group < len(groups) and remaining[next_group] == 0:
+            yield results[next_group]
+            results[next_group] = []
+            next_group += 1
+
+
+def run_groups(
+        groups: typing.List[typing.List[int]],
+        execute: typing.Callable[[int], typing.Any],
+        stop: typing.Callable[[typing.List[typing.Any]], bool],
+        workers: int,
+        initial: int,
+        plan: typing.Optional[classes.Plan] = None,
+        order: typing.Optional[typing.List[int]] = None,
+        cell_order: typing.Optional[typing.List[int]] = None
+) -> typing.Iterator[typing.List[typing.Any]]:
+    """
+    Execute groups of cells, where the cells within a group are run in order until the stop callback indicates that no
+    more cells of the group are needed. With a single worker everything is run one after the other, see run_serial,
+    otherwise in a pool of workers where the groups are started in the given order, and cells of later groups fill up
+    the workers that are not needed by earlier groups. The results are given back per group in the same order as the
+    groups.
+    :param groups: The indices of the cells of each group.
+    :param execute: A callback to execute the cell with the given index.
+    :param stop: A callback that gets the results of a group so far, and indicates if no more cells should be run.
+    :param workers: The number of workers.
+    :param initial: How many cells of a group may run at the same time before the stop callback has seen their results,
+    after that a new cell is only started when all earlier cells of the group are finished.
+    :param plan: The plan that is told about the progress of the cells, and which decides if a cell is dropped, or None
+    to run every cell.
+    :param order: The indices of the groups in the order in which they are started in the pool, or None for the order
+    of the groups.
+    :param cell_order: The indices of the cells in the order in which they are run with a single worker, see
+    run_serial.
+    :return: The results of the cells for each group, without the cells that were dropped.
+    """
+    if workers == 1:
+        yield from run_serial(groups, execute, stop, plan, cell_order)
+        return
+
+    global execute_cell
+    execute_cell = execute
+    context = multiprocessing.get_context("fork")
+    core_sets = get_core_sets(workers)
+    slots = context.Queue()
+    for slot in range(workers):
+        slots.put(slot)
+    if order is None:
+        order = list(range(len(groups)))
+    completed = queue.Queue()
+    submitted = [0] * len(groups)
+    results: typing.List[typing.Dict[int, typing.Any]] = [{} for _ in groups]
+    finished = [0] * len(groups)
+    stopped = [False] * len(groups)
+    running = 0
+    next_group = 0
+    next_start = 0
+
+    def record(g: int, position: int, result: typing.Any) -> None:
+        """
+        Record the result of a cell, where None is recorded for a cell that was dropped, and check if the group can
+        stop.
+        :param g: The index of the group.
+        :param position: The position of the cell in the group.
+        :param result: The result of the cell.
+        """
+        results[g][position] = result
+        while finished[g] in results[g]:
+            finished[g] += 1
+        if not stopped[g] and stop([results[g][i] for i in range(finished[g]) if results[g][i] is not None]):
+            stopped[g] = True
+            if plan is not None:
+                for cancelled in groups[g][submitted[g]:]:
+                    plan.cancel(cancelled)
+
+    with context.Pool(workers, initialize_worker, (slots, core_sets)) as pool:
+        while next_group < len(groups):
+            for i in range(next_start, len(order)):
+                g = order[i]
+                while (running < workers and not stopped[g] and submitted[g] < len(groups[g])
+                       and submitted[g] < max(initial, finished[g] + 1)):
+                    position = submitted[g]
+                    submitted[g] += 1
+                    if plan is not None and plan.skip(groups[g][position]):
+                        record(g, position, None)
+                        continue
+                    pool.apply_async(
+                        run_in_worker,
+                        (groups[g][position],),
+                        callback=lambda r, g=g, position=position: completed.put((g, position, r, None)),
+                        error_callback=lambda e, g=g, position=position: completed.put((g, position, None, e))
+                    )
+                    running += 1
+                if i == next_start and (stopped[g] or submitted[g] == len(groups[g])):
+                    next_start += 1
+                if running >= workers:
+                    break
+            if running > 0:
+                g, position, result, error = completed.get()
+                running -= 1
+                if error is not None:
+                    raise error
+                if plan is not None:
+                    plan.finish(groups[g][position])
+                record(g, position, result)
+            while (next_group < len(groups) and finished[next_group] == submitted[next_group]
+                   and (stopped[next_group] or submitted[next_group] == len(groups[next_group]))):
+                yield [results[next_group][i] for i in range(finished[next_group]) if results[next_group][i] is not None]
+                results[next_group] = {}
+                next_group += 1
+
+
+def run_pipeline(
+        groups: typing.List[typing.List[int]],
+        build: typing.Callable[[int], None],
+        measure: typing.Callable[[int], typing.Any],
+        stop: typing.Callable[[typing.List[typing.Any]], bool],
+        build_cores: typing.List[int],
+        measure_cores: typing.List[int],
+        depth: int,
+        plan: typing.Optional[classes.Plan] = None,
+        cell_order: typing.Optional[typing.List[int]] = None
+) -> typing.Iterator[typing.List[typing.Any]]:
+    """
+    Execute groups of cells where compiling and measuring overlap. The cells are compiled ahead in a pool of workers
+    pinned to the build cores, while the cells are measured one after the other in the current process pinned to the
+    measure cores, so that a measurement never shares its cores with a compilation. Each compiled cell waiting to be
+    measured occupies a slot with its own build directories, and at most depth cells can wait, which bounds how far the
+    compilation runs ahead. Cells of a group after the stop callback indicates that no more are needed are compiled but
+    not measured, and so are the cells that the plan drops. The cells are compiled and measured in the given order, see
+    run_serial, and the results are given back per group in the same order as the groups.
+    :param groups: The indices of the cells of each group.
+    :param build: A callback to compile the cell with the given index.
+    :param measure: A callback to measure the cell with the given index, after it is compiled.
+    :param stop: A callback that gets the results of a group so far, and indicates if no more cells should be run.
+    :param build_cores: The cores to compile on.
+    :param measure_cores: The cores to measure on.
+    :param depth: The maximum number of compiled cells that wait to be measured.
+    :param plan: The plan that is told about the progress of the cells, and which decides if a cell is dropped, or None
+    to measure every cell.
+    :param cell_order: The indices of the cells in the order in which they are compiled and measured, or None to run
+    the groups one after the other.
+    :return: The results of the cells for each group, without the cells that were dropped.
+    """
+    global execute_cell
+    execute_cell = build
+    context = multiprocessing.get_context("fork")
+    order = cell_order if cell_order is not None else [index for group in groups for index in group]
+    group_of = get_group_of(groups)
+    results: typing.List[typing.List[typing.Any]] = [[] for _ in groups]
+    remaining = [len(group) for group in groups]
+    stopped = [False] * len(groups)
+    next_group = 0
+    free = collections.deque(range(depth + 1))
+    builds: typing.Dict[int, typing.Tuple[int, typing.Any]] = {}
+    submitted = 0
+    original_cores = os.sched_getaffinity(0)
+    with context.Pool(min(depth, len(build_cores)), initialize_builder, (build_cores,)) as pool:
+        os.sched_setaffinity(0, measure_cores)
+        for index in order:
+            while len(free) != 0 and submitted < len(order):
+                slot = free.popleft()
+                builds[order[submitted]] = (slot, pool.apply_async(build_in_worker, (order[submitted], slot)))
+                submitted += 1
+            slot, pending = builds.pop(index)
+            pending.get()
+            g = group_of[index]
+            remaining[g] -= 1
+            if stopped[g]:
+                if plan is not None:
+                    plan.cancel(index)
+            elif plan is None or not plan.skip(index):
+                files.set_build_slot(slot)
+                results[g].append(measure(index))
+                if plan is not None:
+                    plan.finish(index)
+                stopped[g] = stop(results[g])
+            free.append(slot)
+            while next_group < len(groups) and remaining[next_group] == 0:
+                yield results[next_group]
+                results[next_group] = []
+                next_group += 1
+    files.set_build_slot(None)
+    os.sched_setaffinity(0, original_cores)
@@ -0,0 +1,100 @@
+"""
+This module contains the planning of the cells of a suite from the results of earlier runs. The expected cost of each
+cell is used to start the most expensive rows first when running in parallel, to report the progress of a run with an
+estimate of the remaining time, and to drop later compilations when a time budget would otherwise be exceeded.
+"""
+
+import sqlite3
+import time
+import typing
+
+from . import classes
+from . import results
+
+
+deadline: typing.Optional[float] = None
+"""
+The time, as given by time.monotonic, at which the run of the harness should be finished, which is set when the first
+suite is planned with a time budget, so that the budget is shared by all suites that are run by the same process.
+"""
+
+
+def get_costs(c: sqlite3.Connection, prefix: str) -> typing.Dict[typing.Tuple, float]:
+    """
+    Get the expected wall clock time of a single run for each configuration of each benchmark of a suite, from the
+    results of earlier runs.
+    :param c: The connection to the results database with the earlier results.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :return: The average wall clock time in milliseconds, keyed on the benchmark, component, and names of the front-end
+    and back-end arguments.
+    """
+    rows = c.execute(
+        "SELECT benchmark, component, front_end, back_end, AVG(wall_ns) / 1000000.0 FROM results WHERE suite = ? "
+        "GROUP BY benchmark, component, front_end, back_end ORDER BY benchmark, component, front_end, back_end",
+        (prefix.rstrip("/"),)
+    ).fetchall()
+    return {tuple(row[:4]): row[4] for row in rows}
+
+
+def get_default_cost(costs: typing.Dict[typing.Tuple, float]) -> float:
+    """
+    Get the expected wall clock time of a single run of a configuration that has no earlier results.
+    :param costs: The expected wall clock time of a single run, see get_costs.
+    :return: The average of the known configurations, or 1 if there are none.
+    """
+    return sum(costs.values()) / len(costs) if len(costs) != 0 else 1.0
+
+
+def get_cost(costs: typing.Dict[typing.Tuple, float], default: float, cell: classes.Cell, iterations: int) -> float:
+    """
+    Get the expected cost of a cell, which is the expected wall clock time of all runs within the cell.
+    :param costs: The expected wall clock time of a single run, see get_costs.
+    :param default: The expected wall clock time of a single run when it is unknown.
+    :param cell: The cell.
+    :param iterations: The number of runs within the cell.
+    :return: The expected cost.
+    """
+    benchmark, component, front_end, _, back_end, _, _ = results.get_cell_key(cell)
+    return costs.get((benchmark, component, front_end, back_end), default) * iterations
+
+
+def get_order(groups: typing.List[typing.List[int]], costs: typing.List[float]) -> typing.List[int]:
+    """
+    Get the order in which the groups of cells are started, which is the longest processing time first, so that an
+    expensive group is not started last while the other workers are idle. Ties keep the original order of the groups.
+    :param groups: The indices of the cells of each group.
+    :param costs: The expected cost of each cell.
+    :return: The indices of the groups in the order in which they are started.
+    """
+    return sorted(range(len(groups)), key=lambda x: (-sum(map(lambda y: costs[y], groups[x])), x))
+
+
+def create_plan(
+        prefix: str,
+        cells: typing.List[classes.Cell],
+        iterations: int,
+        replayed: typing.Set[int],
+        options: classes.RunOptions
+) -> classes.Plan:
+    """
+    Create the plan of the cells of a suite, with the expected cost of each cell from the results database.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param cells: The cells of the suite.
+    :param iterations: The number of runs within a cell.
+    :param replayed: The indices of the cells whose results are taken from the journal or an earlier run, which cost
+    nothing.
+    :param options: The options for how the benchmarks are executed, with the number of workers and the time budget.
+    :return: The plan.
+    """
+    global deadline
+    costs = get_costs(results.get_connection(), prefix)
+    default = get_default_cost(costs)
+    if options.budget is not None and deadline is None:
+        deadline = time.monotonic() + options.budget * 60
+    return classes.Plan(
+        [0.0 if i in replayed else get_cost(costs, default, cell, iterations) for i, cell in enumerate(cells)],
+        [cell.recompilation for cell in cells],
+        options.workers,
+        deadline,
+        options.min_samples
+    )
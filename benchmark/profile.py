@@ -0,0 +1,190 @@
+"""
+This module contains the profile of the compilation overhead of the JIT for each function, from the events the JIT
+logs when compiling a module, under the Compile tag, and when running the optimization pipeline of the first tier and of
+the reoptimization on a module, under the Opt and ReOpt tags. The events of all runs of a configuration are aggregated
+into a table per benchmark, and can be written as folded stacks to draw a flame graph of the overhead.
+"""
+
+import argparse
+import os
+import sys
+import typing
+
+from . import analyze
+from . import classes
+from . import files
+from . import results
+
+
+EVENT_TAGS = ["Compile", "Opt", "ReOpt"]
+"""
+The tags of the events of the compilation of a module, in the order of the columns of the profile.
+"""
+
+EVENT_NAMES = {"Compile": "compile", "Opt": "optimize", "ReOpt": "reoptimize"}
+"""
+The name of the phase of each tag, as used in the folded stacks.
+"""
+
+
+def parse_events(value: str) -> typing.List[typing.Tuple[int, str]]:
+    """
+    Parse the stored value of a tag of the list type, see default.format_aggregate.
+    :param value: The stored value.
+    :return: The time and data of each event.
+    """
+    events = []
+    for entry in value.split(","):
+        time, separator, data = entry.partition("\\")
+        if separator == "" or not time.isdigit():
+            continue
+        events.append((int(time), data))
+    return events
+
+
+def get_function_times(tags: typing.Dict[str, str]) -> typing.Dict[str, typing.List[float]]:
+    """
+    Get the time spent on each function by a single run of the JIT. A compiled module is attributed to the first
+    function it defines, as logged by the Compile event, and the optimization of a module is attributed to the same
+    function through the identifier of the module, or to the identifier itself when the module is never compiled.
+    :param tags: The stored value of each of the tags of the run.
+    :return: The time in milliseconds spent compiling, optimizing, and reoptimizing, and the number of compilations,
+    keyed on the function.
+    """
+    functions: typing.Dict[str, str] = {}
+    compiles = []
+    for _, data in parse_events(tags.get("Compile", "")):
+        parts = data.rsplit(" ", 2)
+        if len(parts) == 3:
+            functions[parts[0]] = parts[1]
+            compiles.append((parts[1], parts[2]))
+    times: typing.Dict[str, typing.List[float]] = {}
+
+    def __temp__(function: str, column: int, elapsed: str):
+        try:
+            value = float(elapsed)
+        except ValueError:
+            return
+        entry = times.setdefault(function, [0.0, 0.0, 0.0, 0])
+        entry[column] += value
+        entry[3] += column == 0
+
+    for function, elapsed in compiles:
+        __temp__(function, 0, elapsed)
+    for column, tag in enumerate(EVENT_TAGS[1:], 1):
+        for _, data in parse_events(tags.get(tag, "")):
+            parts = data.rsplit(" ", 1)
+            if len(parts) == 2:
+                __temp__(functions.get(parts[0], f"[{parts[0]}]"), column, parts[1])
+    return times
+
+
+def get_profile(database_file: typing.Optional[str], run: typing.Optional[int]) -> typing.List[typing.List[typing.Any]]:
+    """
+    Get the profile of the compilation overhead of the JIT for each function, for each configuration of each benchmark
+    of a run of the harness, aggregated over all runs of the configuration.
+    :param database_file: The results database, or None for the database in the data directory.
+    :param run: The id of the run of the harness, or None for the most recent run.
+    :return: The suite, benchmark, configuration, function, the mean time in milliseconds spent compiling, optimizing,
+    and reoptimizing the function per run, the mean number of compilations per run, and the share of the total
+    overhead of the configuration of the benchmark, sorted on the overhead within each benchmark.
+    """
+    c = results.connect(database_file)
+    if run is None:
+        run = results.get_latest_run(c)
+    counts = c.execute(
+        "SELECT suite, benchmark, front_end, back_end, COUNT(*) FROM results WHERE run_id = ? AND component = 'jit' "
+        "GROUP BY suite, benchmark, front_end, back_end",
+        (run,)
+    ).fetchall()
+    rows = c.execute(
+        f"SELECT r.id, r.suite, r.benchmark, r.front_end, r.back_end, t.tag, t.value FROM telemetry t "
+        f"JOIN results r ON r.id = t.result_id WHERE r.run_id = ? AND r.component = 'jit' AND t.part = ? "
+        f"AND t.tag IN ({', '.join('?' * len(EVENT_TAGS))}) ORDER BY r.id",
+        (run, classes.LogPart.BackEnd.name, *EVENT_TAGS)
+    ).fetchall()
+    c.close()
+    if len(rows) == 0:
+        print("There are no compilation events for the run, the JIT should be built with logging.")
+        exit(-1)
+
+    runs: typing.Dict[int, typing.Tuple[typing.Tuple[str, str, str], typing.Dict[str, str]]] = {}
+    for result_id, suite, benchmark, front_end, back_end, tag, value in rows:
+        key = (suite, benchmark, analyze.get_config_name(front_end, back_end))
+        runs.setdefault(result_id, (key, {}))[1][tag] = value
+    totals: typing.Dict[typing.Tuple[str, str, str], typing.Dict[str, typing.List[float]]] = {}
+    for key, tags in runs.values():
+        functions = totals.setdefault(key, {})
+        for function, times in get_function_times(tags).items():
+            total = functions.setdefault(function, [0.0, 0.0, 0.0, 0])
+            for i in range(4):
+                total[i] += times[i]
+
+    run_counts = {(suite, benchmark, analyze.get_config_name(front_end, back_end)): count
+                  for suite, benchmark, front_end, back_end, count in counts}
+    profile = []
+    for key in sorted(totals):
+        count = run_counts[key]
+        overhead = sum(map(lambda x: sum(x[:3]), totals[key].values()))
+        for function, total in sorted(totals[key].items(), key=lambda x: (-sum(x[1][:3]), x[0])):
+            profile.append(list(key) + [function] + [x / count for x in total] +
+                           [sum(total[:3]) / overhead if overhead > 0 else 0.0])
+    return profile
+
+
+def write_folded(output: typing.TextIO, profile: typing.List[typing.List[typing.Any]]) -> None:
+    """
+    Write a profile as folded stacks, with a line for each phase of each function of each configuration of each
+    benchmark with the mean time in microseconds per run, which can be drawn as a flame graph by flamegraph.pl, inferno,
+    or speedscope.
+    :param output: Where to write the folded stacks to.
+    :param profile: The profile, see get_profile.
+    """
+    for suite, benchmark, config, function, *times in profile:
+        for tag, value in zip(EVENT_TAGS, times):
+            microseconds = round(value * 1000)
+            if microseconds > 0:
+                frames = [suite, benchmark, config, function, EVENT_NAMES[tag]]
+                output.write(";".join(map(lambda x: x.replace(";", ":").replace(" ", "_"), frames)) + f" {microseconds}\n")
+
+
+def main():
+    """
+    The main function to profile the compilation overhead of the JIT.
+    """
+    parser = argparse.ArgumentParser(
+        prog="profile",
+        description="Profile the time the JIT spends compiling and optimizing each function of the benchmarks."
+    )
+    parser.add_argument("-d", default=files.get_results_file(),
+                        help="The results database, the default is the database in the data directory.")
+    parser.add_argument("--run", type=int, help="The run in the database to profile, the default is the most recent run.")
+    parser.add_argument("--top", type=int, default=5,
+                        help="The number of functions with the most overhead to show for each benchmark.")
+    parser.add_argument("-o", help="The csv file to write the profile of all functions to.")
+    parser.add_argument("--folded", help="The file to write the profile to as folded stacks, for a flame graph.")
+    args = parser.parse_args()
+    if not os.path.isfile(args.d):
+        print(f"The database {args.d} does not exist.")
+        exit(-1)
+    profile = get_profile(args.d, args.run)
+
+    shown: typing.Dict[typing.Tuple[str, str, str], int] = {}
+    rows = []
+    for row in profile:
+        key = tuple(row[:3])
+        shown[key] = shown.get(key, 0) + 1
+        if shown[key] <= args.top:
+            rows.append(row)
+    header = ["suite", "benchmark", "config", "function", "compile ms", "optimize ms", "reoptimize ms", "count", "share"]
+    analyze.write_rows(sys.stdout, header, rows)
+    if args.o is not None:
+        with open(args.o, "w", newline="") as f:
+            analyze.write_rows(f, header, profile)
+    if args.folded is not None:
+        with open(args.folded, "w") as f:
+            write_folded(f, profile)
+
+
+if __name__ == '__main__':
+    main()
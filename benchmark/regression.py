@@ -0,0 +1,194 @@
+"""
+This module contains the detection of performance regressions between two snapshots of the data directory, for example
+before and after a change to the JIT. The runs of each configuration of each benchmark are compared with a Mann-Whitney U
+test, with a correction for the number of comparisons, and the significant changes of the median wall clock time that
+are larger than a threshold are reported.
+"""
+
+import argparse
+import glob
+import math
+import os
+import sys
+import typing
+
+import numpy as np
+
+from . import analyze
+from . import files
+
+
+def get_snapshot_files(snapshot: str) -> typing.List[str]:
+    """
+    Get the time data files of a snapshot, which is either a time data file, or the start of the timestamp that
+    files.persist_data_files places in front of the files in the data directory, such as 2024.01.31 or 2024.01.31.12.00.
+    :param snapshot: The snapshot.
+    :return: The time data files of the snapshot.
+    """
+    if os.path.isfile(snapshot):
+        return [snapshot]
+    data_directory = files.get_data_directory(os.path.dirname(__file__))
+    result = sorted(glob.glob(os.path.join(data_directory, glob.escape(snapshot) + "*time_data_*.csv")))
+    if len(result) == 0:
+        print(f"There are no time data files for the snapshot {snapshot}.")
+        exit(-1)
+    return result
+
+
+def load_snapshot(snapshots: typing.List[str]) -> typing.Dict[str, np.ndarray]:
+    """
+    Load the runs of a snapshot.
+    :param snapshots: The parts of the snapshot, see get_snapshot_files.
+    :return: The runs, see analyze.load_time_data.
+    """
+    return analyze.load_time_data([f for snapshot in snapshots for f in get_snapshot_files(snapshot)])
+
+
+def mann_whitney(cell_of: np.ndarray, side: np.ndarray, values: np.ndarray, cells: int) -> np.ndarray:
+    """
+    Compute the two-sided p-value of the Mann-Whitney U test for each cell, using the normal approximation with a
+    correction for ties and for continuity.
+    :param cell_of: The cell of each value.
+    :param side: For each value, 0 if it is from the first sample and 1 if it is from the second sample.
+    :param values: The values.
+    :param cells: The number of cells.
+    :return: The p-value of each cell, which is 1 if either sample is empty or all values are equal.
+    """
+    order = np.lexsort((values, cell_of))
+    cell_of, side, values = cell_of[order], side[order], values[order]
+    sizes = np.bincount(cell_of, minlength=cells)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    positions = np.arange(len(values)) - starts[cell_of] + 1
+    new_tie = np.concatenate(([True], (cell_of[1:] != cell_of[:-1]) | (values[1:] != values[:-1])))
+    tie_starts = np.flatnonzero(new_tie)
+    tie_sizes = np.diff(np.append(tie_starts, len(values)))
+    ranks = np.repeat(positions[tie_starts] + (tie_sizes - 1) / 2, tie_sizes)
+    ties = np.bincount(cell_of[tie_starts], weights=tie_sizes ** 3 - tie_sizes, minlength=cells)
+
+    first = side == 0
+    n1 = np.bincount(cell_of, weights=first, minlength=cells)
+    n2 = sizes - n1
+    n = n1 + n2
+    u = np.bincount(cell_of, weights=ranks * first, minlength=cells) - n1 * (n1 + 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+        z = (np.abs(u - n1 * n2 / 2) - 0.5) / np.sqrt(variance)
+    valid = (n1 > 0) & (n2 > 0) & (variance > 0)
+    p = np.ones(cells)
+    p[valid] = np.vectorize(math.erfc)(np.maximum(z[valid], 0) / math.sqrt(2))
+    return p
+
+
+def correct(p: np.ndarray, method: str) -> np.ndarray:
+    """
+    Correct p-values for multiple comparisons.
+    :param p: The p-values.
+    :param method: Either holm for the Holm-Bonferroni method, which controls the family-wise error rate, or bh for the
+    Benjamini-Hochberg method, which controls the false discovery rate.
+    :return: The corrected p-values.
+    """
+    m = len(p)
+    order = np.argsort(p)
+    if method == "holm":
+        adjusted = np.maximum.accumulate(np.minimum(1, (m - np.arange(m)) * p[order]))
+    else:
+        adjusted = np.minimum.accumulate((m / np.arange(1, m + 1) * p[order])[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(1, adjusted)
+    return result
+
+
+def group_medians(cell_of: np.ndarray, side: np.ndarray, values: np.ndarray, cells: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the median of both samples of each cell.
+    :param cell_of: The cell of each value.
+    :param side: For each value, 0 if it is from the first sample and 1 if it is from the second sample.
+    :param values: The values.
+    :param cells: The number of cells.
+    :return: The medians of the first and second sample, which are nan if a sample is empty.
+    """
+    keys = cell_of * 2 + side
+    values = values[np.lexsort((values, keys))]
+    sizes = np.bincount(keys, minlength=cells * 2)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    medians = np.full(cells * 2, np.nan)
+    present = sizes > 0
+    low = values[(starts + (sizes - 1) // 2)[present]]
+    high = values[(starts + sizes // 2)[present]]
+    medians[present] = (low + high) / 2
+    return medians[0::2], medians[1::2]
+
+
+def compare(before: typing.Dict[str, np.ndarray], after: typing.Dict[str, np.ndarray], method: str) -> typing.List[typing.List[typing.Any]]:
+    """
+    Compare the runs of the cells that are in both snapshots, where a cell is a configuration of a benchmark. Failed
+    runs are ignored.
+    :param before: The runs of the first snapshot.
+    :param after: The runs of the second snapshot.
+    :param method: The correction for multiple comparisons, see correct.
+    :return: For each cell, the suite, benchmark, configuration, the median wall clock time before and after, the
+    relative change of the median, the p-value, and the corrected p-value.
+    """
+    runs = {k: np.concatenate((before[k], after[k])) for k in before}
+    side = np.concatenate((np.zeros(len(before["wall_ms"]), dtype=np.int64), np.ones(len(after["wall_ms"]), dtype=np.int64)))
+    valid = runs["returncode"] == 0
+    runs = {k: v[valid] for k, v in runs.items()}
+    side = side[valid]
+    (suites, benchmarks, configs), order, starts, sizes = analyze.group([runs["suite"], runs["benchmark"], runs["config"]])
+    cell_of = np.repeat(np.arange(len(sizes)), sizes)
+    side = side[order]
+    values = runs["wall_ms"][order]
+
+    p = mann_whitney(cell_of, side, values, len(sizes))
+    median_before, median_after = group_medians(cell_of, side, values, len(sizes))
+    matched = ~np.isnan(median_before) & ~np.isnan(median_after)
+    p = p[matched]
+    adjusted = correct(p, method)
+    change = median_after[matched] / median_before[matched] - 1
+    return list(map(list, zip(
+        suites[matched], benchmarks[matched], configs[matched], median_before[matched], median_after[matched], change,
+        p, adjusted
+    )))
+
+
+def main():
+    """
+    The main function to compare two snapshots. The exit code is 1 if there is a significant regression, so that it can
+    be used to fail a job.
+    """
+    parser = argparse.ArgumentParser(
+        prog="regression",
+        description="Compare the wall clock time of the benchmarks between two snapshots of the data directory."
+    )
+    parser.add_argument("before", nargs="+",
+                        help="The first snapshot, either time data files or the start of the timestamp of the files in the data directory.")
+    parser.add_argument("--after", nargs="+", required=True, help="The second snapshot, in the same form as the first.")
+    parser.add_argument("--alpha", type=float, default=0.05, help="The significance level after the correction.")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="The smallest relative change of the median wall clock time that is reported.")
+    parser.add_argument("--correction", choices=["holm", "bh"], default="holm",
+                        help="Correct for multiple comparisons with Holm-Bonferroni or Benjamini-Hochberg.")
+    parser.add_argument("-o", help="A csv file to write the comparison of all cells to.")
+    args = parser.parse_args()
+    rows = compare(load_snapshot(args.before), load_snapshot(args.after), args.correction)
+    if len(rows) == 0:
+        print("There are no benchmarks in both snapshots.")
+        exit(-1)
+    header = ["suite", "benchmark", "config", "before ms", "after ms", "change", "p", "corrected p"]
+    if args.o is not None:
+        with open(args.o, "w", newline="") as f:
+            analyze.write_rows(f, header, rows)
+
+    regressions = [row for row in rows if row[7] < args.alpha and row[5] > args.threshold]
+    improvements = [row for row in rows if row[7] < args.alpha and row[5] < -args.threshold]
+    for title, selected in [("Regressions", regressions), ("Improvements", improvements)]:
+        print(f"{title}: {len(selected)}")
+        for row in sorted(selected, key=lambda x: -abs(x[5])):
+            print(f"  {row[0]}/{row[1]} {row[2]}: {row[3]:.3f} ms -> {row[4]:.3f} ms ({row[5]:+.1%}, p = {row[7]:.2g})")
+    print(f"Compared {len(rows)} configurations of benchmarks.")
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
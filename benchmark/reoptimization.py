@@ -0,0 +1,172 @@
+"""
+This module contains the analysis of the reoptimizations of the JIT, from the event the ReOptimizeLayer logs under the
+ReOptimize tag for each reoptimization, with the function, the version it is reoptimized to, the time it was requested,
+the time until the redirect, and if it succeeded. For each run this gives the time until the program runs its final
+optimized code, and the reoptimizations that are requested after most of the run has already passed, which can hardly
+pay for themselves.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import typing
+
+from . import analyze
+from . import classes
+from . import files
+from . import profile
+from . import results
+
+
+def get_reoptimizations(tags: typing.Dict[str, str]) -> typing.List[typing.Tuple[str, int, int, float, bool]]:
+    """
+    Get the reoptimizations of a single run of the JIT.
+    :param tags: The stored value of the ReOptimize tag of the back-end and the Start tag of the whole JIT.
+    :return: The function, version, time it was requested in microseconds since the epoch, time until the redirect in
+    milliseconds, and if it succeeded, of each reoptimization.
+    """
+    reoptimizations = []
+    for _, data in profile.parse_events(tags.get("ReOptimize", "")):
+        parts = data.rsplit(" ", 4)
+        if len(parts) != 5 or not parts[1].isdigit() or not parts[2].isdigit():
+            continue
+        try:
+            latency = float(parts[3])
+        except ValueError:
+            continue
+        reoptimizations.append((parts[0], int(parts[1]), int(parts[2]), latency, parts[4] == "1"))
+    return reoptimizations
+
+
+def get_run_metrics(tags: typing.Dict[str, str], wall_ns: int, late: float) -> typing.Optional[typing.List[typing.Any]]:
+    """
+    Get the metrics of the reoptimizations of a single run of the JIT, relative to the start of the JIT.
+    :param tags: The stored value of the ReOptimize tag of the back-end and the Start tag of the whole JIT.
+    :param wall_ns: The wall clock time of the run in nanoseconds.
+    :param late: The fraction of the run after which a requested reoptimization counts as late.
+    :return: The number of successful and failed reoptimizations, the time in milliseconds until the last successful
+    reoptimization is redirected, or None if there is none, the total time of the reoptimizations in milliseconds, and
+    the number of late reoptimizations with their total time in milliseconds, or None if the start of the JIT is not
+    logged.
+    """
+    start = None
+    for _, data in profile.parse_events(tags.get("Start", "")):
+        if data.isdigit():
+            start = int(data)
+    if start is None:
+        return None
+    reoptimizations = get_reoptimizations(tags)
+    succeeded = [x for x in reoptimizations if x[4]]
+    optimized = max(map(lambda x: (x[2] - start) / 1000 + x[3], succeeded), default=None)
+    wasted = [x for x in reoptimizations if (x[2] - start) * 1000 > late * wall_ns]
+    return [
+        len(succeeded),
+        len(reoptimizations) - len(succeeded),
+        optimized,
+        sum(map(lambda x: x[3], reoptimizations)),
+        len(wasted),
+        sum(map(lambda x: x[3], wasted))
+    ]
+
+
+def get_metrics(
+        database_file: typing.Optional[str],
+        run: typing.Optional[int],
+        late: float
+) -> typing.List[typing.List[typing.Any]]:
+    """
+    Get the metrics of the reoptimizations of each run of the JIT of a run of the harness.
+    :param database_file: The results database, or None for the database in the data directory.
+    :param run: The id of the run of the harness, or None for the most recent run.
+    :param late: The fraction of a run after which a requested reoptimization counts as late.
+    :return: The id, suite, benchmark, configuration, and wall clock time in milliseconds of each run, followed by its
+    metrics, see get_run_metrics.
+    """
+    c = results.connect(database_file)
+    if run is None:
+        run = results.get_latest_run(c)
+    rows = c.execute(
+        "SELECT r.id, r.suite, r.benchmark, r.front_end, r.back_end, r.wall_ns, t.tag, t.value FROM results r "
+        "JOIN telemetry t ON t.result_id = r.id WHERE r.run_id = ? AND r.component = 'jit' "
+        "AND ((t.part = ? AND t.tag = 'ReOptimize') OR (t.part = ? AND t.tag = 'Start')) ORDER BY r.id",
+        (run, classes.LogPart.BackEnd.name, classes.LogPart.Whole.name)
+    ).fetchall()
+    c.close()
+    runs: typing.Dict[int, typing.Tuple[typing.List[typing.Any], typing.Dict[str, str]]] = {}
+    for result_id, suite, benchmark, front_end, back_end, wall_ns, tag, value in rows:
+        key = [result_id, suite, benchmark, analyze.get_config_name(front_end, back_end), wall_ns]
+        runs.setdefault(result_id, (key, {}))[1][tag] = value
+    metrics = []
+    for key, tags in runs.values():
+        run_metrics = get_run_metrics(tags, key[4], late)
+        if run_metrics is not None:
+            metrics.append(key[:4] + [key[4] / 1_000_000] + run_metrics)
+    return metrics
+
+
+def summarize(metrics: typing.List[typing.List[typing.Any]]) -> typing.List[typing.List[typing.Any]]:
+    """
+    Summarize the metrics of the runs for each configuration of each benchmark.
+    :param metrics: The metrics of each run, see get_metrics.
+    :return: The suite, benchmark, configuration, number of runs, mean number of successful and failed reoptimizations
+    per run, median time until the optimized code in milliseconds and as a fraction of the wall clock time, and the
+    mean number of late reoptimizations and their mean total time in milliseconds per run.
+    """
+    configurations: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.List[typing.Any]]] = {}
+    for row in metrics:
+        configurations.setdefault(tuple(row[1:4]), []).append(row)
+    summary = []
+    for key, rows in sorted(configurations.items()):
+        optimized = [(row[7], row[4]) for row in rows if row[7] is not None]
+        summary.append(list(key) + [
+            len(rows),
+            statistics.mean(map(lambda x: x[5], rows)),
+            statistics.mean(map(lambda x: x[6], rows)),
+            statistics.median(map(lambda x: x[0], optimized)) if len(optimized) != 0 else "",
+            statistics.median(map(lambda x: x[0] / x[1], optimized)) if len(optimized) != 0 else "",
+            statistics.mean(map(lambda x: x[9], rows)),
+            statistics.mean(map(lambda x: x[10], rows))
+        ])
+    return summary
+
+
+def main():
+    """
+    The main function to analyze the reoptimizations of the JIT.
+    """
+    parser = argparse.ArgumentParser(
+        prog="reoptimization",
+        description="Measure the time until the JIT runs optimized code, and the reoptimizations that come too late."
+    )
+    parser.add_argument("-d", default=files.get_results_file(),
+                        help="The results database, the default is the database in the data directory.")
+    parser.add_argument("--run", type=int, help="The run in the database to analyze, the default is the most recent run.")
+    parser.add_argument("--late", type=float, default=0.5,
+                        help="The fraction of a run after which a requested reoptimization counts as late.")
+    parser.add_argument("-o", help="The csv file to write the metrics of each run to.")
+    args = parser.parse_args()
+    if not os.path.isfile(args.d):
+        print(f"The database {args.d} does not exist.")
+        exit(-1)
+    if not 0 < args.late <= 1:
+        print("The fraction after which a reoptimization is late should be in (0, 1].")
+        exit(-1)
+    metrics = get_metrics(args.d, args.run, args.late)
+    if len(metrics) == 0:
+        print("There are no runs with logged reoptimizations, the JIT should be built with logging.")
+        exit(-1)
+    analyze.write_rows(sys.stdout, [
+        "suite", "benchmark", "config", "runs", "reoptimizations", "failed", "time to optimized ms",
+        "time to optimized share", "late reoptimizations", "late reoptimization ms"
+    ], summarize(metrics))
+    if args.o is not None:
+        with open(args.o, "w", newline="") as f:
+            analyze.write_rows(f, [
+                "id", "suite", "benchmark", "config", "wall ms", "reoptimizations", "failed", "time to optimized ms",
+                "reoptimization ms", "late reoptimizations", "late reoptimization ms"
+            ], metrics)
+
+
+if __name__ == '__main__':
+    main()
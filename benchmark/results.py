@@ -0,0 +1,499 @@
+"""
+This module contains the database in which the results of the benchmarks are stored, with a row for each individual
+run, and the logged data and hardware performance counters of a run in separate tables. The database is the only place
+the results are written to while the benchmarks run, the csv files are exported from it. The parts of the rows of the
+csv files are kept in a journal, from which the csv files are assembled, and so that an interrupted run of the harness
+can be resumed.
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import shlex
+import socket
+import sqlite3
+import sys
+import typing
+
+from . import classes
+from . import counters
+from . import default
+from . import environment
+from . import files
+from . import stopping
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    arguments TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    suite TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    component TEXT NOT NULL,
+    front_end TEXT NOT NULL,
+    front_end_args TEXT NOT NULL,
+    back_end TEXT NOT NULL,
+    back_end_args TEXT NOT NULL,
+    recompilation INTEGER NOT NULL,
+    iteration INTEGER NOT NULL,
+    extra TEXT NOT NULL,
+    wall_ns INTEGER NOT NULL,
+    returncode INTEGER NOT NULL,
+    user_ns INTEGER NOT NULL,
+    sys_ns INTEGER NOT NULL,
+    max_rss INTEGER NOT NULL,
+    minor_faults INTEGER NOT NULL,
+    major_faults INTEGER NOT NULL,
+    voluntary_switches INTEGER NOT NULL,
+    involuntary_switches INTEGER NOT NULL,
+    machine TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL DEFAULT 0,
+    fingerprint TEXT NOT NULL DEFAULT '',
+    environment TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS telemetry (
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    part TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (result_id, part, tag)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS journal (
+    result_id INTEGER PRIMARY KEY REFERENCES results(id),
+    time_data TEXT NOT NULL,
+    other_data TEXT NOT NULL,
+    counter_data TEXT NOT NULL,
+    wall_ms REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    result_id INTEGER NOT NULL REFERENCES results(id),
+    event TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (result_id, event)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_configuration ON results (suite, benchmark, component, front_end, back_end);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id, suite, benchmark);
+CREATE INDEX IF NOT EXISTS telemetry_tag ON telemetry (part, tag);
+"""
+"""
+The schema of the database.
+"""
+
+
+RESULT_COLUMNS = [
+    "suite", "benchmark", "component", "front_end", "front_end_args", "back_end", "back_end_args", "recompilation",
+    "iteration", "extra", "wall_ns", "returncode", "user_ns", "sys_ns", "max_rss", "minor_faults", "major_faults",
+    "voluntary_switches", "involuntary_switches", "machine", "position", "fingerprint", "environment"
+]
+"""
+The columns of the results table which are given for each run.
+"""
+
+
+ADDED_COLUMNS = [
+    ("results", "machine", "TEXT NOT NULL DEFAULT ''"),
+    ("results", "position", "INTEGER NOT NULL DEFAULT 0"),
+    ("results", "fingerprint", "TEXT NOT NULL DEFAULT ''"),
+    ("results", "environment", "TEXT NOT NULL DEFAULT ''")
+]
+"""
+The columns that were added to the schema later, which are added to databases that were created before.
+"""
+
+
+connection: typing.Optional[sqlite3.Connection] = None
+"""
+The connection to the database, which is opened when it is first needed.
+"""
+
+connection_pid: typing.Optional[int] = None
+"""
+The process that opened the connection, since a connection can not be used by the workers created with fork.
+"""
+
+run_id: typing.Optional[int] = None
+"""
+The id of the current run of the harness, which is created when the first results are stored.
+"""
+
+
+def connect(database_file: typing.Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open a database and create the schema if it does not exist yet.
+    :param database_file: The path to the database, or None for the default database, see files.get_results_file.
+    :return: The connection to the database.
+    """
+    if database_file is None:
+        database_file = files.get_results_file()
+    os.makedirs(os.path.dirname(database_file), exist_ok=True)
+    result = sqlite3.connect(database_file, timeout=60)
+    result.execute("PRAGMA journal_mode=WAL")
+    result.execute("PRAGMA synchronous=NORMAL")
+    result.execute("PRAGMA foreign_keys=ON")
+    result.executescript(SCHEMA)
+    for table, column, definition in ADDED_COLUMNS:
+        if column not in map(lambda x: x[1], result.execute(f"PRAGMA table_info({table})")):
+            result.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return result
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get the connection to the default database, opening it if needed or if it was opened by another process.
+    :return: The connection to the database.
+    """
+    global connection
+    global connection_pid
+    if connection is None or connection_pid != os.getpid():
+        connection = connect()
+        connection_pid = os.getpid()
+    return connection
+
+
+def get_arguments() -> str:
+    """
+    Get the arguments of the current run of the harness as they are stored in the database, which identify the runs
+    that can be resumed and the shards that can be merged. The script itself and --resume are left out, and paths
+    within the repository are made relative to it, so that the same run started from another checkout or working
+    directory has the same arguments. The arguments are quoted, so that they can be split again with shlex.
+    :return: The arguments.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def __temp__(argument: str) -> str:
+        key, separator, value = argument.partition("=") if argument.startswith("-") else ("", "", argument)
+        if value == "" or not (os.path.isabs(value) or os.path.exists(value)):
+            return argument
+        path = os.path.abspath(value)
+        if os.path.commonpath([root, path]) != root:
+            return argument
+        return key + separator + os.path.relpath(path, root)
+
+    return shlex.join(map(__temp__, filter(lambda x: x != "--resume", sys.argv[1:])))
+
+
+def get_run() -> int:
+    """
+    Get the id of the current run of the harness, creating it if needed.
+    :return: The id of the run.
+    """
+    global run_id
+    if run_id is None:
+        with get_connection() as c:
+            run_id = c.execute(
+                "INSERT INTO runs (started, arguments) VALUES (?, ?)",
+                (datetime.datetime.now().isoformat(timespec="seconds"), get_arguments())
+            ).lastrowid
+    return run_id
+
+
+def resume() -> int:
+    """
+    Continue the most recent run of the harness with the same arguments as the current one, or start a new run if
+    there is none.
+    :return: The id of the run.
+    """
+    global run_id
+    if run_id is None:
+        row = get_connection().execute("SELECT MAX(id) FROM runs WHERE arguments = ?", (get_arguments(),)).fetchone()
+        if row[0] is None:
+            print("There is no run with the same arguments to resume, starting a new run.")
+        run_id = row[0]
+    return get_run()
+
+
+def get_cell_key(cell: classes.Cell) -> typing.Tuple:
+    """
+    Get the columns of the results table that identify a cell within a suite.
+    :param cell: The cell.
+    :return: The benchmark, component, front-end and back-end arguments, and compilation of the cell.
+    """
+    f = cell.front_end_args
+    b = cell.back_end_args
+    return (
+        cell.source_directory,
+        "jit" if cell.jit else "reference",
+        f.name if f is not None else "",
+        f.args if f is not None else "",
+        b.name if b is not None else "",
+        b.args if b is not None else "",
+        cell.recompilation
+    )
+
+
+def get_result_row(prefix: str, cell: classes.Cell, iteration: int, result: classes.RunResult, fingerprint: str) -> typing.Tuple:
+    """
+    Get the values of the columns of the results table for a run, see RESULT_COLUMNS.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param cell: The cell of the run.
+    :param iteration: The number of the run within the compilation.
+    :param result: The result of the run.
+    :param fingerprint: The fingerprint of everything that influences the results of the cell.
+    :return: The values of the columns.
+    """
+    m = result.measurement
+    benchmark, component, front_end, front_end_args, back_end, back_end_args, recompilation = get_cell_key(cell)
+    return (
+        prefix.rstrip("/"),
+        benchmark,
+        component,
+        front_end,
+        front_end_args,
+        back_end,
+        back_end_args,
+        recompilation,
+        iteration,
+        result.extra,
+        m.wall_ns,
+        m.returncode,
+        m.user_ns,
+        m.sys_ns,
+        m.max_rss,
+        m.minor_faults,
+        m.major_faults,
+        m.voluntary_switches,
+        m.involuntary_switches,
+        socket.gethostname(),
+        cell.position,
+        fingerprint,
+        environment.get_fingerprint()
+    )
+
+
+def store_cell(prefix: str, cell: classes.Cell, results: typing.List[classes.RunResult], fingerprint: str = "") -> None:
+    """
+    Store the results of the runs of a cell in a single transaction, together with the parts of the rows of the csv
+    files in the journal, so that a cell is either completely stored or not at all. This is done as soon as the cell is
+    finished, by the process that ran it.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param cell: The cell that was run.
+    :param results: The results of the runs of the cell.
+    :param fingerprint: The fingerprint of everything that influences the results of the cell, or nothing if it is not
+    known, in which case the results are never reused.
+    """
+    current_run = get_run()
+    insert = (f"INSERT INTO results (run_id, {', '.join(RESULT_COLUMNS)}) "
+              f"VALUES ({', '.join(['?'] * (len(RESULT_COLUMNS) + 1))})")
+    journal_rows = []
+    telemetry_rows = []
+    counter_rows = []
+    with get_connection() as c:
+        for i, result in enumerate(results):
+            if result.measurement is None:
+                continue
+            result_id = c.execute(insert, (current_run,) + get_result_row(prefix, cell, i, result, fingerprint)).lastrowid
+            journal_rows.append((result_id, result.time_data, result.other_data, result.counter_data, result.wall_ms))
+            if result.measurement.telemetry is not None:
+                for (part, tag), aggregate in result.measurement.telemetry.aggregates.items():
+                    telemetry_rows.append((result_id, part.name, tag, default.format_aggregate(aggregate)))
+            if result.counter_values is not None:
+                for event, value in zip(counters.get_events(), result.counter_values):
+                    counter_rows.append((result_id, event, int(value)))
+        c.executemany("INSERT INTO journal (result_id, time_data, other_data, counter_data, wall_ms) VALUES (?, ?, ?, ?, ?)", journal_rows)
+        c.executemany("INSERT INTO telemetry (result_id, part, tag, value) VALUES (?, ?, ?, ?)", telemetry_rows)
+        c.executemany("INSERT INTO counters (result_id, event, value) VALUES (?, ?, ?)", counter_rows)
+
+
+def load_journal(prefix: str) -> typing.Dict[typing.Tuple, typing.List[classes.RunResult]]:
+    """
+    Load the cells of a suite that were completed in the current run of the harness from the journal.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :return: The results of the runs of each completed cell, keyed on get_cell_key. The results are already stored, so
+    they have no measurement.
+    """
+    journal = {}
+    rows = get_connection().execute(
+        "SELECT r.benchmark, r.component, r.front_end, r.front_end_args, r.back_end, r.back_end_args, r.recompilation, "
+        "r.extra, j.time_data, j.other_data, j.counter_data, j.wall_ms FROM results r JOIN journal j ON j.result_id = r.id "
+        "WHERE r.run_id = ? AND r.suite = ? ORDER BY r.id",
+        (get_run(), prefix.rstrip("/"))
+    )
+    for row in rows:
+        journal.setdefault(tuple(row[:7]), []).append(classes.RunResult(row[8], row[9], row[10], row[11], extra=row[7]))
+    return journal
+
+
+def load_reusable(prefix: str, cells: typing.List[classes.Cell], fingerprints: typing.Dict[int, str]) -> typing.Dict[int, typing.Tuple[typing.List[classes.RunResult], typing.List[int]]]:
+    """
+    Find the cells of a suite for which there are stored results of an earlier run of the harness with the same
+    fingerprint, so that they can be reused instead of running the cells again.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param cells: The cells of the suite.
+    :param fingerprints: The fingerprint of each cell, keyed on the position of the cell.
+    :return: For each cell that can be reused, keyed on its position, the results of its runs from the most recent run
+    with the same fingerprint, and the ids of those results.
+    """
+    reusable = {}
+    c = get_connection()
+    condition = ("suite = ? AND benchmark = ? AND component = ? AND front_end = ? AND front_end_args = ? AND back_end = ? "
+                 "AND back_end_args = ? AND recompilation = ?")
+    for cell in cells:
+        fingerprint = fingerprints.get(cell.position, "")
+        if fingerprint == "":
+            continue
+        key = (prefix.rstrip("/"),) + get_cell_key(cell)
+        rows = c.execute(
+            f"SELECT r.id, r.extra, j.time_data, j.other_data, j.counter_data, j.wall_ms FROM results r "
+            f"JOIN journal j ON j.result_id = r.id WHERE {condition} AND r.run_id = ("
+            f"SELECT MAX(run_id) FROM results WHERE {condition} AND fingerprint = ? AND run_id != ?) ORDER BY r.id",
+            key + key + (fingerprint, get_run())
+        ).fetchall()
+        if len(rows) != 0:
+            reusable[cell.position] = (
+                list(map(lambda x: classes.RunResult(x[2], x[3], x[4], x[5], extra=x[1]), rows)),
+                list(map(lambda x: x[0], rows))
+            )
+    return reusable
+
+
+def copy_results(result_ids: typing.List[int]) -> None:
+    """
+    Copy stored results of an earlier run of the harness to the current run, including their journal, logged data, and
+    hardware performance counters, in a single transaction.
+    :param result_ids: The ids of the results to copy.
+    """
+    current_run = get_run()
+    columns = ", ".join(RESULT_COLUMNS)
+    with get_connection() as c:
+        for result_id in result_ids:
+            new_id = c.execute(f"INSERT INTO results (run_id, {columns}) SELECT ?, {columns} FROM results WHERE id = ?",
+                               (current_run, result_id)).lastrowid
+            for table, table_columns in [
+                ("journal", "time_data, other_data, counter_data, wall_ms"),
+                ("telemetry", "part, tag, value"),
+                ("counters", "event, value")
+            ]:
+                c.execute(f"INSERT INTO {table} (result_id, {table_columns}) SELECT ?, {table_columns} FROM {table} "
+                          f"WHERE result_id = ?", (new_id, result_id))
+
+
+def get_latest_run(c: sqlite3.Connection) -> typing.Optional[int]:
+    """
+    Get the id of the most recent run in a database.
+    :param c: The connection to the database.
+    :return: The id of the run, or None if there are no runs.
+    """
+    row = c.execute("SELECT MAX(id) FROM runs").fetchone()
+    return row[0] if row is not None else None
+
+
+def export_tables(c: sqlite3.Connection, run: int, directory: str) -> None:
+    """
+    Export the results of a run as csv files, with a line for each run in results.csv, and a line for each logged tag
+    or hardware performance counter of a run in telemetry.csv and counters.csv.
+    :param c: The connection to the database.
+    :param run: The id of the run to export.
+    :param directory: The directory to place the csv files in.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "results.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id"] + RESULT_COLUMNS)
+        writer.writerows(c.execute(f"SELECT id, {', '.join(RESULT_COLUMNS)} FROM results WHERE run_id = ? ORDER BY id", (run,)))
+    for table, columns in [("telemetry", ["part", "tag", "value"]), ("counters", ["event", "value"])]:
+        with open(os.path.join(directory, f"{table}.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["result_id"] + columns)
+            writer.writerows(c.execute(
+                f"SELECT t.result_id, {', '.join(map(lambda x: 't.' + x, columns))} FROM {table} t "
+                f"JOIN results r ON r.id = t.result_id WHERE r.run_id = ? ORDER BY t.result_id",
+                (run,)
+            ))
+
+
+def get_sample_line(row: typing.List[typing.Tuple[str, str, str, float]], component: str, statistic: str) -> str:
+    """
+    Get the line of the csv file with the number of samples of a row, with the relative width of the confidence
+    interval that was reached.
+    :param row: The parts of the row from the journal, see export_csv.
+    :param component: The component of the row, for the JIT the front-end and back-end arguments follow the name.
+    :param statistic: The statistic for which the confidence interval is computed, see stopping.get_statistics.
+    :return: The line.
+    """
+    names = next(csv.reader([row[0][0]]))[:3 if component == "jit" else 1]
+    samples = list(map(lambda x: x[3], row))
+    width = stopping.relative_width(samples, statistic)
+    return ",".join(map(lambda x: f"\"{x}\"", names + [len(samples), statistic, width])) + "\n"
+
+
+def export_csv(
+        c: sqlite3.Connection,
+        run: int,
+        directory: str,
+        suite: typing.Optional[str] = None,
+        statistic: typing.Optional[str] = None
+) -> None:
+    """
+    Export the results of a run as the csv files with the time data, other data, and hardware performance counters of
+    the reference implementation and the JIT, which are assembled from the parts of the rows in the journal. The rows
+    are in the same order as when the run was done on a single machine without being interrupted, where the suites are
+    run in the order of their names and the cells of a suite in the order of their positions, and a row starts at each
+    part that starts with the name of the row. The files of a component without results are not written.
+    :param c: The connection to the database.
+    :param run: The id of the run to export.
+    :param directory: The directory to place the csv files in.
+    :param suite: The prefix used in the name of the rows of the csv files of the suite to export, or None for all
+    suites.
+    :param statistic: The statistic for which the number of samples of each row is exported when the run sampled
+    adaptively, see stopping.get_statistics, or None if it did not.
+    """
+    os.makedirs(directory, exist_ok=True)
+    condition = "r.run_id = ? AND r.component = ?" + (" AND r.suite = ?" if suite is not None else "")
+    for component, get_files in [
+        ("reference", [files.get_time_data_reference_file, files.get_other_data_reference_file, files.get_counter_data_reference_file]),
+        ("jit", [files.get_time_data_jit_file, files.get_other_data_jit_file, files.get_counter_data_jit_file])
+    ]:
+        parts = c.execute(
+            f"SELECT j.time_data, j.other_data, j.counter_data, j.wall_ms FROM results r JOIN journal j "
+            f"ON j.result_id = r.id WHERE {condition} ORDER BY r.suite, r.position, r.iteration",
+            (run, component) + ((suite.rstrip("/"),) if suite is not None else ())
+        ).fetchall()
+        if len(parts) == 0:
+            continue
+        rows = []
+        for part in parts:
+            if len(rows) == 0 or part[0].startswith("\""):
+                rows.append([])
+            rows[-1].append(part)
+        counter_data = any(map(lambda x: x[2] != "", parts))
+        for column, get_file in enumerate(get_files if counter_data else get_files[:2]):
+            with open(get_file(directory), "w") as f:
+                f.write("".join(map(lambda row: "".join(map(lambda x: x[column], row)) + "\n", rows)))
+        if statistic is not None:
+            get_file = files.get_sample_data_jit_file if component == "jit" else files.get_sample_data_reference_file
+            with open(get_file(directory), "w") as f:
+                f.write("".join(map(lambda row: get_sample_line(row, component, statistic), rows)))
+
+
+def main():
+    """
+    The main function to export the results of a run from the database.
+    """
+    parser = argparse.ArgumentParser(
+        prog="results",
+        description="Export the results of a run of the benchmarks from the database as csv files, both the csv files of "
+                    "the harness and a csv file for each table."
+    )
+    parser.add_argument("-d", help="The database to export from, the default is the database in the data directory.")
+    parser.add_argument("-r", type=int, help="The id of the run to export, the default is the most recent run.")
+    parser.add_argument("-o", required=True, help="The directory to place the csv files in.")
+    parser.add_argument("-s", choices=stopping.get_statistics(),
+                        help="The statistic of the run when it sampled adaptively, to also export the number of samples of each row.")
+    args = parser.parse_args()
+    c = connect(args.d)
+    run = args.r if args.r is not None else get_latest_run(c)
+    if run is None:
+        print("There are no runs in the database.")
+        exit(-1)
+    export_csv(c, run, args.o, statistic=args.s)
+    export_tables(c, run, args.o)
+
+
+if __name__ == '__main__':
+    main()
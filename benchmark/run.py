@@ -3,11 +3,11 @@ This module is the main entry point to run some benchmark.
 """
 
 import os
-import subprocess
 import typing
 
 from . import common
 from . import files
+from . import orchestration
 
 
 def main(args: typing.Any):
@@ -27,9 +27,7 @@ def main(args: typing.Any):
         if not os.path.isfile(run_file):
             print("finished " + directory)
             continue
-        os.chdir(os.path.dirname(base_directory))
-        run_module = os.path.relpath(run_file).replace("/", ".")[:-3]
-        subprocess.run(["python3", "-m", run_module] + common.args_to_run_array(args), check=True)
+        orchestration.run_suite(run_file, args)
         files.copy_data_files(directory, base_directory, component, args.f, args.b)
         print("finished " + directory)
 
@@ -0,0 +1,239 @@
+"""
+This module contains the sharding of the benchmarks over multiple machines, where each machine runs a deterministic part
+of the cells of each suite with --shard i/N, and the merging of the results of the shards into a single dataset, which
+is the same as when everything is run on a single machine.
+"""
+
+import argparse
+import heapq
+import os
+import shlex
+import sqlite3
+import typing
+
+from . import classes
+from . import files
+from . import planner
+from . import results
+
+
+def parse_shard(shard: str) -> typing.Tuple[int, int]:
+    """
+    Parse a shard given as i/N, where i is the index of the shard starting at 0, and N is the number of shards.
+    :param shard: The shard to parse.
+    :return: The index and number of shards.
+    """
+    parts = shard.split("/")
+    if len(parts) != 2 or not parts[0].isdigit() or not parts[1].isdigit() or int(parts[0]) >= int(parts[1]):
+        print("The shard should be given as i/N, with 0 <= i < N.")
+        exit(-1)
+    return int(parts[0]), int(parts[1])
+
+
+def split_arguments(arguments: str) -> typing.Tuple[str, typing.Optional[typing.Tuple[int, int]]]:
+    """
+    Split the arguments of a run of the harness, as stored in the results database, in the arguments without the shard
+    and the shard itself.
+    :param arguments: The arguments.
+    :return: The arguments without the shard, and the index and number of shards, or None if the run was not sharded.
+    """
+    try:
+        parts = shlex.split(arguments)
+    except ValueError:
+        return arguments, None
+    shard = None
+    base = []
+    i = 0
+    while i < len(parts):
+        if parts[i] == "--shard" and i + 1 < len(parts):
+            shard = parse_shard(parts[i + 1])
+            i += 2
+            continue
+        if parts[i].startswith("--shard="):
+            shard = parse_shard(parts[i][len("--shard="):])
+        else:
+            base.append(parts[i])
+        i += 1
+    return shlex.join(base), shard
+
+
+def get_costs(costs_file: typing.Optional[str], prefix: str) -> typing.Dict[typing.Tuple, float]:
+    """
+    Get the expected wall clock time of a single run for each configuration of each benchmark of a suite, from the
+    results of an earlier run. The same file should be given to each shard, so that they split the cells the same way.
+    :param costs_file: The results database with the earlier results, or None if there are none.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :return: The expected wall clock time, see planner.get_costs.
+    """
+    if costs_file is None:
+        return {}
+    if not os.path.isfile(costs_file):
+        print(f"The results database {costs_file} does not exist.")
+        exit(-1)
+    c = sqlite3.connect(costs_file)
+    result = planner.get_costs(c, prefix)
+    c.close()
+    return result
+
+
+def assign(costs: typing.List[float], count: int) -> typing.List[int]:
+    """
+    Assign units of work to shards, so that the expected cost of each shard is about the same. The most expensive units
+    are assigned first, each to the shard with the lowest expected cost so far. Ties are broken on the position of the
+    unit and the index of the shard, so that each shard gets the same assignment.
+    :param costs: The expected cost of each unit.
+    :param count: The number of shards.
+    :return: The shard of each unit.
+    """
+    loads = [(0.0, shard) for shard in range(count)]
+    result = [0] * len(costs)
+    for unit in sorted(range(len(costs)), key=lambda x: (-costs[x], x)):
+        load, shard = heapq.heappop(loads)
+        result[unit] = shard
+        heapq.heappush(loads, (load + costs[unit], shard))
+    return result
+
+
+def select_groups(
+        groups: typing.List[typing.List[classes.Cell]],
+        prefix: str,
+        options: classes.RunOptions,
+        whole_groups: bool,
+        iterations: int
+) -> typing.List[typing.List[classes.Cell]]:
+    """
+    Select the cells of a suite that are run by the current shard. The cells are split individually, unless the cells of
+    a row depend on each other, which is the case when sampling the compilations adaptively.
+    :param groups: The cells of each row, see common.get_groups.
+    :param prefix: The prefix used in the name of the rows of the csv files, which identifies the suite.
+    :param options: The options for how the benchmarks are executed, with the shard and the earlier results to estimate
+    the cost of a cell.
+    :param whole_groups: If the cells of a row should be in the same shard.
+    :param iterations: The number of runs within a cell.
+    :return: The cells of each row that are run by the current shard, without the rows that have no cells.
+    """
+    index, count = options.shard
+    costs = get_costs(options.shard_costs, prefix)
+    default = planner.get_default_cost(costs)
+    units = groups if whole_groups else [[cell] for group in groups for cell in group]
+    shards = assign([sum(map(lambda x: planner.get_cost(costs, default, x, iterations), unit)) for unit in units], count)
+    selected = set(cell.position for unit, shard in zip(units, shards) if shard == index for cell in unit)
+    result = []
+    for group in groups:
+        group = [cell for cell in group if cell.position in selected]
+        if len(group) != 0:
+            result.append(group)
+    return result
+
+
+def get_shard_runs(databases: typing.List[str]) -> typing.Tuple[str, typing.List[typing.Tuple[str, int]]]:
+    """
+    Find the runs of the shards in the results databases of the machines. From each database the most recent run of
+    each shard is taken that has the same arguments as the most recent sharded run in that database, and together the
+    databases should contain each shard exactly once.
+    :param databases: The results databases.
+    :return: The arguments without the shard, and the database and id of the run of each shard, ordered on the index
+    of the shard.
+    """
+    found: typing.Dict[int, typing.Tuple[str, int]] = {}
+    base_arguments = None
+    shard_count = None
+    for database in databases:
+        if not os.path.isfile(database):
+            print(f"The results database {database} does not exist.")
+            exit(-1)
+        c = sqlite3.connect(database)
+        runs = list(map(lambda x: (x[0],) + split_arguments(x[1]), c.execute("SELECT id, arguments FROM runs ORDER BY id")))
+        c.close()
+        runs = list(filter(lambda x: x[2] is not None, runs))
+        if len(runs) == 0:
+            print(f"There are no sharded runs in {database}.")
+            exit(-1)
+        latest = runs[-1]
+        if base_arguments is None:
+            base_arguments, shard_count = latest[1], latest[2][1]
+        elif base_arguments != latest[1] or shard_count != latest[2][1]:
+            print(f"The shards in {database} are for different arguments than the other shards.")
+            exit(-1)
+        latest_runs = {}
+        for run_id, arguments, (index, count) in runs:
+            if arguments == base_arguments and count == shard_count:
+                latest_runs[index] = run_id
+        for index, run_id in latest_runs.items():
+            if index in found:
+                print(f"Shard {index}/{shard_count} is in multiple databases.")
+                exit(-1)
+            found[index] = (database, run_id)
+    missing = [str(i) for i in range(shard_count) if i not in found]
+    if len(missing) != 0:
+        print(f"The shards {', '.join(missing)} of {shard_count} are missing.")
+        exit(-1)
+    return base_arguments, [found[i] for i in range(shard_count)]
+
+
+def merge_databases(target: str, base_arguments: str, shard_runs: typing.List[typing.Tuple[str, int]]) -> int:
+    """
+    Copy the results of the runs of the shards into a single run in a new database, where the machine of each result
+    is kept.
+    :param target: The new database.
+    :param base_arguments: The arguments without the shard.
+    :param shard_runs: The database and id of the run of each shard.
+    :return: The id of the merged run.
+    """
+    if os.path.exists(target):
+        os.remove(target)
+    c = results.connect(target)
+    columns = ", ".join(results.RESULT_COLUMNS)
+    with c:
+        started = []
+        for database, run_id in shard_runs:
+            source = sqlite3.connect(database)
+            started.append(source.execute("SELECT started FROM runs WHERE id = ?", (run_id,)).fetchone()[0])
+            source.close()
+        merged_run = c.execute("INSERT INTO runs (started, arguments) VALUES (?, ?)", (min(started), base_arguments)).lastrowid
+    for database, run_id in shard_runs:
+        c.execute("ATTACH DATABASE ? AS shard", (database,))
+        with c:
+            first, last = c.execute("SELECT MIN(id), MAX(id) FROM shard.results WHERE run_id = ?", (run_id,)).fetchone()
+            if first is not None:
+                offset = c.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()[0] + 1 - first
+                c.execute(f"INSERT INTO results (id, run_id, {columns}) SELECT id + ?, ?, {columns} FROM shard.results "
+                          f"WHERE run_id = ? ORDER BY id", (offset, merged_run, run_id))
+                for table, table_columns in [
+                    ("journal", "time_data, other_data, counter_data, wall_ms"),
+                    ("telemetry", "part, tag, value"),
+                    ("counters", "event, value")
+                ]:
+                    c.execute(f"INSERT INTO {table} (result_id, {table_columns}) SELECT result_id + ?, {table_columns} "
+                              f"FROM shard.{table} WHERE result_id BETWEEN ? AND ? AND result_id IN "
+                              f"(SELECT id FROM shard.results WHERE run_id = ?)", (offset, first, last, run_id))
+        c.execute("DETACH DATABASE shard")
+    c.close()
+    return merged_run
+
+
+def main():
+    """
+    The main function to merge the results of the shards.
+    """
+    parser = argparse.ArgumentParser(
+        prog="shard",
+        description="Merge the results of the shards of a run of the benchmarks into a single dataset."
+    )
+    parser.add_argument("databases", nargs="*", default=[files.get_results_file()],
+                        help="The results databases of the machines, the default is the database in the data directory.")
+    parser.add_argument("-o", required=True,
+                        help="The directory to place the merged results database and csv files in.")
+    args = parser.parse_args()
+    base_arguments, shard_runs = get_shard_runs(args.databases)
+    target = os.path.join(args.o, os.path.basename(files.get_results_file()))
+    os.makedirs(args.o, exist_ok=True)
+    merged_run = merge_databases(target, base_arguments, shard_runs)
+    c = results.connect(target)
+    results.export_csv(c, merged_run, args.o)
+    c.close()
+    print(f"Merged {len(shard_runs)} shards of {base_arguments}.")
+
+
+if __name__ == '__main__':
+    main()
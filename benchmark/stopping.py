@@ -0,0 +1,110 @@
+"""
+This module contains the statistical stopping rule that decides if enough samples have been taken for a benchmark, based
+on the width of the 95% confidence interval of the mean or median.
+"""
+
+import math
+import typing
+
+
+T_QUANTILES = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+"""
+The 0.975 quantiles of the t-distribution for 1 up to and including 30 degrees of freedom.
+"""
+
+
+def get_statistics() -> typing.List[str]:
+    """
+    Get the statistics for which a confidence interval can be computed.
+    :return: The names of the statistics.
+    """
+    return ["mean", "median"]
+
+
+def t_quantile(degrees_of_freedom: int) -> float:
+    """
+    Get the 0.975 quantile of the t-distribution, used for a two-sided 95% confidence interval.
+    :param degrees_of_freedom: The degrees of freedom.
+    :return: The quantile.
+    """
+    if degrees_of_freedom <= len(T_QUANTILES):
+        return T_QUANTILES[degrees_of_freedom - 1]
+    elif degrees_of_freedom <= 40:
+        return 2.021
+    elif degrees_of_freedom <= 60:
+        return 2.000
+    elif degrees_of_freedom <= 120:
+        return 1.980
+    return 1.960
+
+
+def mean_interval(samples: typing.List[float]) -> typing.Tuple[float, float, float]:
+    """
+    Compute the 95% confidence interval of the mean with the t-distribution.
+    :param samples: The samples, at least two are needed.
+    :return: The mean, and the lower and upper bound of the interval.
+    """
+    n = len(samples)
+    mean = sum(samples) / n
+    variance = sum(map(lambda x: (x - mean) ** 2, samples)) / (n - 1)
+    half = t_quantile(n - 1) * math.sqrt(variance / n)
+    return mean, mean - half, mean + half
+
+
+def median_interval(samples: typing.List[float]) -> typing.Tuple[float, float, float]:
+    """
+    Compute the distribution free 95% confidence interval of the median, which is based on the order statistics.
+    :param samples: The samples, at least two are needed.
+    :return: The median, and the lower and upper bound of the interval.
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+    if n % 2 == 1:
+        median = ordered[n // 2]
+    else:
+        median = (ordered[n // 2 - 1] + ordered[n // 2]) / 2
+    spread = 1.96 * math.sqrt(n) / 2
+    lower = max(int(math.floor(n / 2 - spread)), 0)
+    upper = min(int(math.ceil(n / 2 + spread)), n - 1)
+    return median, ordered[lower], ordered[upper]
+
+
+def relative_width(samples: typing.List[float], statistic: str) -> float:
+    """
+    Compute the width of the 95% confidence interval relative to the statistic itself.
+    :param samples: The samples.
+    :param statistic: The statistic to use, see get_statistics.
+    :return: The relative width, which is infinite if it can not be computed.
+    """
+    if len(samples) < 2:
+        return math.inf
+    if statistic == "median":
+        center, lower, upper = median_interval(samples)
+    else:
+        center, lower, upper = mean_interval(samples)
+    if upper == lower:
+        return 0.0
+    if center == 0:
+        return math.inf
+    return (upper - lower) / abs(center)
+
+
+def should_stop(samples: typing.List[float], statistic: str, precision: float, minimum: int, maximum: int) -> bool:
+    """
+    Decide if enough samples have been taken.
+    :param samples: The samples taken so far.
+    :param statistic: The statistic for which the confidence interval is computed, see get_statistics.
+    :param precision: The relative width of the confidence interval below which no more samples are needed.
+    :param minimum: The minimum number of samples.
+    :param maximum: The maximum number of samples.
+    :return: True if no more samples should be taken, otherwise False.
+    """
+    if len(samples) >= maximum:
+        return True
+    if len(samples) < minimum:
+        return False
+    return relative_width(samples, statistic) <= precision
@@ -0,0 +1,27 @@
+"""
+This module contains the logic to run a command directly, without a shell in between, while measuring the resources it
+uses.
+"""
+
+import asyncio
+import typing
+
+from . import classes
+from . import orchestration
+
+
+def spawn(
+        command: typing.List[str],
+        telemetry: typing.Optional[classes.LogStream] = None,
+        telemetry_fd: typing.Optional[int] = None
+) -> classes.Measurement:
+    """
+    Run a command directly with posix_spawn, and measure the resources it used with wait4, see orchestration.spawn.
+    :param command: The command to run, the first element is searched for in the PATH.
+    :param telemetry: A parser that gets the standard output while the command is running, in which case the standard
+    output itself is not kept.
+    :param telemetry_fd: The file descriptor in the command on which it writes binary log data for the parser, or None
+    if there is no binary log data.
+    :return: The measurement of the command.
+    """
+    return asyncio.run(orchestration.spawn(command, telemetry, telemetry_fd))
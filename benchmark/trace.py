@@ -0,0 +1,185 @@
+"""
+This module contains the export of the events the JIT logs during a run as a timeline in the trace event format of
+Chrome, which can be opened in Perfetto or chrome://tracing. Every run of the JIT becomes a process in the timeline,
+with a track for the program, one for the compilation and linking of modules, one for the optimization pipelines, and
+one for the reoptimizations from their request until the redirect, so that it can be seen when the lazy compilation and
+the reoptimization overlap with the execution of the program.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import typing
+
+from . import analyze
+from . import files
+from . import profile
+from . import results
+
+
+TRACKS = {"program": 0, "compile": 1, "optimize": 2, "reoptimize": 3}
+"""
+The thread id of each track of a run in the timeline.
+"""
+
+LEGACY_LIMIT = 10 ** 14
+"""
+The timestamps of the JIT are in microseconds since the epoch, a timestamp below this limit is from an older JIT that
+logged in milliseconds.
+"""
+
+
+def get_events(
+        pid: int,
+        tags: typing.Dict[typing.Tuple[str, str], str],
+        wall_ns: int
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Get the trace events of a single run of the JIT. The compilation and optimization of a module are logged when they
+    are finished with their duration in milliseconds, so they start that long before the time of the log. The execution
+    of the program lasts from the entry of main until the end of the run, as given by the wall clock time of the run
+    from the start of the JIT.
+    :param pid: The id of the process of the run in the timeline.
+    :param tags: The stored value of each tag of the run, keyed on the part and tag.
+    :param wall_ns: The wall clock time of the run in nanoseconds.
+    :return: The trace events, with the timestamps in microseconds relative to the start of the JIT.
+    """
+    entries = {key: profile.parse_events(value) for key, value in tags.items()}
+    first = min([time for events in entries.values() for time, _ in events], default=0)
+    scale = 1000 if 0 < first < LEGACY_LIMIT else 1
+    start = first * scale
+    for _, data in entries.get(("Whole", "Start"), []):
+        if data.isdigit():
+            start = int(data) * scale
+    functions = {}
+    for _, data in entries.get(("BackEnd", "Compile"), []):
+        parts = data.rsplit(" ", 2)
+        if len(parts) == 3:
+            functions[parts[0]] = parts[1]
+
+    events = []
+
+    def __temp__(name: str, category: str, track: str, end: float, duration: typing.Optional[float], args: typing.Dict[str, str]):
+        event = {"name": name, "cat": category, "pid": pid, "tid": TRACKS[track], "args": args}
+        if duration is None:
+            event.update({"ph": "i", "s": "t", "ts": end - start})
+        else:
+            event.update({"ph": "X", "ts": end - duration - start, "dur": duration})
+        events.append(event)
+
+    linking: typing.Dict[str, typing.List[int]] = {}
+    for (part, tag), values in sorted(entries.items()):
+        for time, data in values:
+            time *= scale
+            if tag in ["Start", "Main_Entry"] and data.isdigit():
+                __temp__(tag, "program", "program", int(data) * scale, None, {})
+                if tag == "Main_Entry":
+                    __temp__("Execution", "program", "program", start + wall_ns / 1000, start + wall_ns / 1000 - int(data) * scale, {})
+            elif tag == "Compile" and len(data.rsplit(" ", 2)) == 3:
+                module, function, elapsed = data.rsplit(" ", 2)
+                __temp__(function, "compile", "compile", time, float(elapsed) * 1000, {"module": module})
+            elif tag in profile.EVENT_TAGS and len(data.rsplit(" ", 1)) == 2:
+                module, elapsed = data.rsplit(" ", 1)
+                __temp__(functions.get(module, module), profile.EVENT_NAMES[tag], "optimize", time, float(elapsed) * 1000,
+                         {"module": module})
+            elif tag == "ReOptimize" and len(data.rsplit(" ", 4)) == 5:
+                function, version, trigger, latency, success = data.rsplit(" ", 4)
+                __temp__(function, "reoptimize", "reoptimize", int(trigger) + float(latency) * 1000, float(latency) * 1000,
+                         {"version": version, "success": success})
+            elif tag == "Begin_Linking":
+                linking.setdefault(data.rsplit(" ", 1)[0], []).append(time)
+            elif tag == "End_Linking" and len(linking.get(data.rsplit(" ", 1)[0], [])) != 0:
+                symbols = data.rsplit(" ", 1)[0]
+                begin = linking[symbols].pop(0)
+                __temp__("link", "link", "compile", time, time - begin, {"symbols": symbols})
+            elif tag not in ["Begin_Linking", "End_Linking"]:
+                __temp__(tag, part, "program", time, None, {"data": data})
+    return events
+
+
+def get_runs(
+        database_file: typing.Optional[str],
+        run: typing.Optional[int],
+        patterns: typing.Optional[typing.List[str]],
+        median: bool
+) -> typing.List[typing.Tuple[int, str, str, str, int, int, int]]:
+    """
+    Get the runs of the JIT of a run of the harness to export.
+    :param database_file: The results database, or None for the database in the data directory.
+    :param run: The id of the run of the harness, or None for the most recent run.
+    :param patterns: The patterns of the benchmarks to export, given as suite/benchmark, or None for every benchmark.
+    :param median: If only the run with the median wall clock time of each configuration of each benchmark is exported.
+    :return: The id, suite, benchmark, configuration, recompilation, iteration, and wall clock time in nanoseconds of
+    each run.
+    """
+    c = results.connect(database_file)
+    if run is None:
+        run = results.get_latest_run(c)
+    rows = c.execute(
+        "SELECT id, suite, benchmark, front_end, back_end, recompilation, iteration, wall_ns FROM results "
+        "WHERE run_id = ? AND component = 'jit' ORDER BY id",
+        (run,)
+    ).fetchall()
+    c.close()
+    runs = [(result_id, suite, benchmark, analyze.get_config_name(front_end, back_end), recompilation, iteration, wall_ns)
+            for result_id, suite, benchmark, front_end, back_end, recompilation, iteration, wall_ns in rows
+            if patterns is None or any(map(lambda x: fnmatch.fnmatchcase(f"{suite}/{benchmark}", x), patterns))]
+    if not median:
+        return runs
+    configurations: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.Tuple]] = {}
+    for row in runs:
+        configurations.setdefault(row[1:4], []).append(row)
+    return [sorted(rows, key=lambda x: x[6])[(len(rows) - 1) // 2] for _, rows in sorted(configurations.items())]
+
+
+def get_trace(database_file: typing.Optional[str], runs: typing.List[typing.Tuple[int, str, str, str, int, int, int]]) -> typing.Dict[str, typing.Any]:
+    """
+    Get the timeline of runs of the JIT.
+    :param database_file: The results database, or None for the database in the data directory.
+    :param runs: The runs, see get_runs.
+    :return: The timeline in the trace event format.
+    """
+    c = results.connect(database_file)
+    events = []
+    for result_id, suite, benchmark, config, recompilation, iteration, wall_ns in runs:
+        tags = {(part, tag): value for part, tag, value in
+                c.execute("SELECT part, tag, value FROM telemetry WHERE result_id = ?", (result_id,))}
+        events.append({"name": "process_name", "ph": "M", "pid": result_id,
+                       "args": {"name": f"{suite}/{benchmark} {config} #{recompilation}.{iteration}"}})
+        for track, tid in TRACKS.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": result_id, "tid": tid, "args": {"name": track}})
+        events += get_events(result_id, tags, wall_ns)
+    c.close()
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main():
+    """
+    The main function to export the timeline of the runs of the JIT.
+    """
+    parser = argparse.ArgumentParser(
+        prog="trace",
+        description="Export the events logged by the JIT in each run as a timeline in the Chrome trace event format."
+    )
+    parser.add_argument("-d", default=files.get_results_file(),
+                        help="The results database, the default is the database in the data directory.")
+    parser.add_argument("--run", type=int, help="The run in the database to export, the default is the most recent run.")
+    parser.add_argument("--benchmarks", nargs="+", help="The patterns of the benchmarks to export, given as suite/benchmark.")
+    parser.add_argument("--median", action="store_true",
+                        help="Only export the run with the median wall clock time of each configuration of each benchmark.")
+    parser.add_argument("-o", required=True, help="The json file to write the timeline to.")
+    args = parser.parse_args()
+    if not os.path.isfile(args.d):
+        print(f"The database {args.d} does not exist.")
+        exit(-1)
+    runs = get_runs(args.d, args.run, args.benchmarks, args.median)
+    if len(runs) == 0:
+        print("There are no runs of the JIT to export.")
+        exit(-1)
+    with open(args.o, "w") as f:
+        json.dump(get_trace(args.d, runs), f)
+
+
+if __name__ == '__main__':
+    main()
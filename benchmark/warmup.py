@@ -0,0 +1,210 @@
+"""
+This module contains the analysis of the warm-up of the JIT within a single run, when the entry point of a benchmark is
+called multiple times, see --in-process. The duration of each iteration, as logged by the front-end under the Iteration
+tag, is split into segments with a changepoint analysis, where the last segment is the steady state. Each run is then
+classified as warming up, flat, or slowing down, and the time spent before the steady state is reached is separated from
+the time of an iteration in the steady state.
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import typing
+
+from . import analyze
+from . import classes
+from . import files
+from . import profile
+from . import results
+
+
+CLASSES = ["warmup", "flat", "slowdown"]
+"""
+The classification of a run, from the steady state being faster than the first iterations, to being about as fast, to
+being slower.
+"""
+
+
+def get_changepoints(series: typing.List[float], penalty: float, min_size: int = 2) -> typing.List[int]:
+    """
+    Find the changepoints of the mean of a series with optimal partitioning, where the cost of a segment is the sum of
+    the squared deviations from its mean, and each segment costs the penalty. Every split is tried, which is quadratic
+    in the length of the series, but the number of iterations of a run is small.
+    :param series: The series.
+    :param penalty: The penalty of adding a segment.
+    :param min_size: The minimum length of a segment.
+    :return: The indices at which a new segment starts, without the start of the series.
+    """
+    n = len(series)
+    sums = [0.0]
+    squares = [0.0]
+    for value in series:
+        sums.append(sums[-1] + value)
+        squares.append(squares[-1] + value * value)
+
+    def __temp__(start: int, end: int) -> float:
+        return squares[end] - squares[start] - (sums[end] - sums[start]) ** 2 / (end - start)
+
+    best = [-penalty] + [math.inf] * n
+    last = [0] * (n + 1)
+    for end in range(min_size, n + 1):
+        for start in [0] + list(range(min_size, end - min_size + 1)):
+            cost = best[start] + __temp__(start, end) + penalty
+            if cost < best[end]:
+                best[end], last[end] = cost, start
+    changepoints = []
+    end = n
+    while end > 0 and last[end] > 0:
+        changepoints.append(last[end])
+        end = last[end]
+    return sorted(changepoints)
+
+
+def classify(series: typing.List[float], penalty: float, tolerance: float) -> typing.Tuple[str, int, float, float]:
+    """
+    Classify the iterations of a single run. The variance of the noise is estimated from the differences between
+    consecutive iterations, so that the penalty is relative to the noise of the run, and the last segment is the steady
+    state.
+    :param series: The duration of each iteration in milliseconds.
+    :param penalty: The penalty of adding a segment, which is multiplied by the variance of the noise and the log of
+    the number of iterations.
+    :param tolerance: The relative difference between the first and last segment below which the run is flat.
+    :return: The classification, see CLASSES, the iteration at which the steady state starts, the mean duration of an
+    iteration in the steady state, and the warm-up cost, which is the time spent in the iterations before the steady
+    state beyond the time they would take in the steady state.
+    """
+    if len(series) < 4:
+        return "flat", 0, statistics.mean(series), 0.0
+    differences = [abs(b - a) for a, b in zip(series, series[1:])]
+    sigma = statistics.median(differences) / (math.sqrt(2) * 0.6745)
+    sigma = max(sigma, 0.001 * statistics.median(series), 1e-9)
+    changepoints = get_changepoints(series, penalty * sigma * sigma * math.log(len(series)))
+    start = changepoints[-1] if len(changepoints) != 0 else 0
+    steady = statistics.mean(series[start:])
+    first = statistics.mean(series[:changepoints[0]]) if len(changepoints) != 0 else steady
+    if abs(steady - first) <= tolerance * first:
+        kind = "flat"
+    else:
+        kind = "warmup" if steady < first else "slowdown"
+    return kind, start, steady, sum(series[:start]) - steady * start
+
+
+def get_iterations(tags: typing.Dict[str, str]) -> typing.List[float]:
+    """
+    Get the duration of each iteration of a single run of the JIT.
+    :param tags: The stored value of the Iteration tag of the front-end.
+    :return: The duration of each iteration in milliseconds, in the order of the iterations.
+    """
+    iterations = []
+    for _, data in profile.parse_events(tags.get("Iteration", "")):
+        parts = data.split(" ")
+        if len(parts) == 2 and parts[0].isdigit():
+            try:
+                iterations.append((int(parts[0]), float(parts[1])))
+            except ValueError:
+                continue
+    return list(map(lambda x: x[1], sorted(iterations)))
+
+
+def get_runs(
+        database_file: typing.Optional[str],
+        run: typing.Optional[int],
+        penalty: float,
+        tolerance: float
+) -> typing.List[typing.List[typing.Any]]:
+    """
+    Classify each run of the JIT of a run of the harness with multiple iterations.
+    :param database_file: The results database, or None for the database in the data directory.
+    :param run: The id of the run of the harness, or None for the most recent run.
+    :param penalty: The penalty of adding a segment, see classify.
+    :param tolerance: The relative difference below which a run is flat, see classify.
+    :return: The id, suite, benchmark, configuration, number of iterations, duration of the first iteration in
+    milliseconds, and the classification of each run, see classify.
+    """
+    c = results.connect(database_file)
+    if run is None:
+        run = results.get_latest_run(c)
+    rows = c.execute(
+        "SELECT r.id, r.suite, r.benchmark, r.front_end, r.back_end, t.value FROM results r "
+        "JOIN telemetry t ON t.result_id = r.id WHERE r.run_id = ? AND r.component = 'jit' AND t.part = ? "
+        "AND t.tag = 'Iteration' ORDER BY r.id",
+        (run, classes.LogPart.FrontEnd.name)
+    ).fetchall()
+    c.close()
+    runs = []
+    for result_id, suite, benchmark, front_end, back_end, value in rows:
+        series = get_iterations({"Iteration": value})
+        if len(series) < 2:
+            continue
+        runs.append([result_id, suite, benchmark, analyze.get_config_name(front_end, back_end), len(series), series[0]] +
+                    list(classify(series, penalty, tolerance)))
+    return runs
+
+
+def summarize(runs: typing.List[typing.List[typing.Any]]) -> typing.List[typing.List[typing.Any]]:
+    """
+    Summarize the classification of the runs for each configuration of each benchmark.
+    :param runs: The classification of each run, see get_runs.
+    :return: The suite, benchmark, configuration, number of runs, the classification, which is inconsistent when the
+    runs do not agree, the number of runs of each classification, and the median duration of the first iteration,
+    warm-up cost, and duration of an iteration in the steady state, in milliseconds.
+    """
+    configurations: typing.Dict[typing.Tuple[str, str, str], typing.List[typing.List[typing.Any]]] = {}
+    for row in runs:
+        configurations.setdefault(tuple(row[1:4]), []).append(row)
+    summary = []
+    for key, rows in sorted(configurations.items()):
+        kinds = list(map(lambda x: x[6], rows))
+        summary.append(list(key) + [
+            len(rows),
+            kinds[0] if kinds.count(kinds[0]) == len(kinds) else "inconsistent"
+        ] + [kinds.count(kind) for kind in CLASSES] + [
+            statistics.median(map(lambda x: x[5], rows)),
+            statistics.median(map(lambda x: x[9], rows)),
+            statistics.median(map(lambda x: x[8], rows))
+        ])
+    return summary
+
+
+def main():
+    """
+    The main function to analyze the warm-up of the JIT within a run.
+    """
+    parser = argparse.ArgumentParser(
+        prog="warmup",
+        description="Classify the warm-up of the JIT over the iterations within a run, and separate the warm-up cost from the steady state."
+    )
+    parser.add_argument("-d", default=files.get_results_file(),
+                        help="The results database, the default is the database in the data directory.")
+    parser.add_argument("--run", type=int, help="The run in the database to analyze, the default is the most recent run.")
+    parser.add_argument("--penalty", type=float, default=15.0,
+                        help="The penalty of a changepoint, times the variance of the noise and the log of the number of iterations.")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="The relative difference between the first and steady state below which a run is flat.")
+    parser.add_argument("-o", help="The csv file to write the classification of each run to.")
+    args = parser.parse_args()
+    if not os.path.isfile(args.d):
+        print(f"The database {args.d} does not exist.")
+        exit(-1)
+    if args.penalty <= 0 or args.tolerance < 0:
+        print("The penalty should be positive and the tolerance can not be negative.")
+        exit(-1)
+    runs = get_runs(args.d, args.run, args.penalty, args.tolerance)
+    if len(runs) == 0:
+        print("There are no runs with multiple iterations, run the harness with --in-process.")
+        exit(-1)
+    analyze.write_rows(sys.stdout, [
+        "suite", "benchmark", "config", "runs", "classification"
+    ] + CLASSES + ["first ms", "warmup ms", "steady ms"], summarize(runs))
+    if args.o is not None:
+        with open(args.o, "w", newline="") as f:
+            analyze.write_rows(f, [
+                "id", "suite", "benchmark", "config", "iterations", "first ms", "classification", "steady from",
+                "steady ms", "warmup ms"
+            ], runs)
+
+
+if __name__ == '__main__':
+    main()
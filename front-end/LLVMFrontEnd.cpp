@@ -1,10 +1,22 @@
 #include "LLVMFrontEnd.h"
 #include "../util/Util.h"
 
-LLVMFrontEnd::LLVMFrontEnd(std::unique_ptr<llvm::orc::BaseJIT> JIT)
-    : JIT(std::move(JIT)) {}
+LLVMFrontEnd::LLVMFrontEnd(std::unique_ptr<llvm::orc::BaseJIT> JIT, uint64_t Iterations)
+    : JIT(std::move(JIT)), Iterations(Iterations) {}
 
 llvm::Expected<std::unique_ptr<BaseFrontEnd>> LLVMFrontEnd::create(std::vector<std::string> Arguments, std::vector<std::string> Files, std::unique_ptr<llvm::orc::BaseJIT> JIT) {
+    uint64_t iterations = 1;
+    for (const auto& argument : Arguments) {
+        auto splitArgument = split_once(argument, '=');
+        if (splitArgument[0] == "-iterations") {
+            PRINT_ERROR(
+                    !is_number(splitArgument[1]) || std::stoull(splitArgument[1]) == 0,
+                    "An invalid value was given for the iterations."
+            )
+            iterations = std::stoull(splitArgument[1]);
+        }
+    }
+
     auto result = JIT->entryPoint("main");
     if (result)
         return result;
@@ -20,7 +32,7 @@ llvm::Expected<std::unique_ptr<BaseFrontEnd>> LLVMFrontEnd::create(std::vector<s
         if (addError)
             return addError;
     }
-    return std::make_unique<LLVMFrontEnd>(std::move(JIT));
+    return std::make_unique<LLVMFrontEnd>(std::move(JIT), iterations);
 }
 
 llvm::Expected<struct llvm::orc::CaptureModule> LLVMFrontEnd::requestModule(llvm::StringRef Name) {
@@ -33,5 +45,19 @@ llvm::Expected<int> LLVMFrontEnd::start(int argc, char **argv) {
         return mainSymbol.takeError();
 
     auto main = mainSymbol->toPtr<int(*)(int,char**)>();
-    return main(argc, argv);
+    int result = 0;
+    for (uint64_t i = 0; i < this->Iterations; i++) {
+#ifdef LOG
+        auto start = std::chrono::high_resolution_clock::now();
+#endif
+        result = main(argc, argv);
+#ifdef LOG
+        auto end = std::chrono::high_resolution_clock::now();
+        auto elapsed = std::chrono::duration<double,std::milli>(end-start).count();
+        print_log_data("Iteration", LogType::List, LogPart::FrontEnd, std::to_string(i) + " " + std::to_string(elapsed));
+#endif
+        if (result != 0)
+            break;
+    }
+    return result;
 }
\ No newline at end of file
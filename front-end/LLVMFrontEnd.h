@@ -9,18 +9,23 @@ protected:
      * The JIT to execute.
      */
     std::unique_ptr<llvm::orc::BaseJIT> JIT;
+    /**
+     * How many times the entry point is called within the same process.
+     */
+    uint64_t Iterations;
 public:
     /**
      * The constructor for the front-end.
      * @param JIT The JIT to execute.
+     * @param Iterations How many times the entry point is called within the same process.
      */
-    LLVMFrontEnd(std::unique_ptr<llvm::orc::BaseJIT> JIT);
+    LLVMFrontEnd(std::unique_ptr<llvm::orc::BaseJIT> JIT, uint64_t Iterations = 1);
     /**
      * The destructor to deallocate resource associated with the front-end.
      */
     ~LLVMFrontEnd() override = default;
     /**
-     * Create the front-end based on a compiler flag.
+     * Create the front-end based on a compiler flag. With -iterations=N the entry point is called N times.
      * @param Arguments Arguments for the front-end.
      * @param Files The files the front-end should load.
      * @param JIT The back-end that will execute the code.
@@ -34,7 +39,12 @@ public:
      */
     static llvm::Expected<struct llvm::orc::CaptureModule> requestModule(llvm::StringRef Name);
     /**
-     * @copydoc BaseFrontEnd::start(int, char**)
+     * Start the JIT with the given arguments, by calling the entry point as many times as there are iterations, where
+     * the duration of each iteration is logged. It stops at the first iteration that does not exit with 0.
+     * @param argc The number of arguments.
+     * @param argv The arguments.
+     * @return An object with either the exit code of the last iteration of the application or an error depending on
+     * if the lookup was successful.
      */
     llvm::Expected<int> start(int argc, char **argv) override;
 };
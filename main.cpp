@@ -10,13 +10,16 @@ int main(int argc, char **argv) {
 #ifdef LOG
     std::chrono::time_point<std::chrono::system_clock> now = std::chrono::system_clock::now();
     auto duration = now.time_since_epoch();
-    auto millis = std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
-    print_log_data("Start", LogType::List, LogPart::Whole, std::to_string(millis));
+    auto micros = std::chrono::duration_cast<std::chrono::microseconds>(duration).count();
 #endif
     llvm::InitializeNativeTarget();
     llvm::InitializeNativeTargetAsmPrinter();
 
     struct Arguments arguments = getArguments(argc, argv);
+#ifdef LOG
+    set_telemetry_fd(arguments.TelemetryFd);
+    print_log_data("Start", LogType::List, LogPart::Whole, std::to_string(micros));
+#endif
 
     PRINT_ERROR(
             arguments.ApplicationArguments.empty(),
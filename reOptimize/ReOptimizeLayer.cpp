@@ -1,9 +1,37 @@
 #include <iostream>
 #include "ReOptimizeLayer.h"
+#ifdef LOG
+#include "../util/Util.h"
+#endif
 
 using namespace llvm;
 using namespace orc;
 
+#ifdef LOG
+/**
+ * Log a reoptimization of a materialization unit, with the first function it defines, the version it is reoptimized
+ * to, the time in microseconds at which it was requested, the time in milliseconds it took until the redirect, and if
+ * it succeeded.
+ * @param Function The first function defined by the materialization unit.
+ * @param Version The version it is reoptimized to.
+ * @param Trigger The time at which the reoptimization was requested.
+ * @param Success If the reoptimization succeeded.
+ */
+static void logReoptimize(const std::string &Function, uint32_t Version,
+                          std::chrono::system_clock::time_point Trigger, bool Success) {
+    auto End = std::chrono::system_clock::now();
+    auto TriggerMicros = std::chrono::duration_cast<std::chrono::microseconds>(Trigger.time_since_epoch()).count();
+    auto Latency = std::chrono::duration<double, std::milli>(End - Trigger).count();
+    print_log_data("ReOptimize", LogType::List, LogPart::BackEnd,
+                   Function + " " + std::to_string(Version) + " " + std::to_string(TriggerMicros) + " " +
+                   std::to_string(Latency) + " " + (Success ? "1" : "0"));
+}
+
+#define LOG_REOPTIMIZE(Success) logReoptimize(FunctionName, CurVersion + 1, Trigger, Success)
+#else
+#define LOG_REOPTIMIZE(Success)
+#endif
+
 uint64_t ReOptimizeLayer::CallCountThreshold = 1000;
 
 bool ReOptimizeLayer::ReOptMaterializationUnitState::tryStartReoptimize() {
@@ -160,6 +188,9 @@ ReOptimizeLayer::emitMUImplSymbols(ReOptMaterializationUnitState &MUState,
 void ReOptimizeLayer::rt_reoptimize(SendErrorFn SendResult,
                                     ReOptMaterializationUnitID MUID,
                                     uint32_t CurVersion) {
+#ifdef LOG
+    auto Trigger = std::chrono::system_clock::now();
+#endif
     auto &MUState = getMaterializationUnitState(MUID);
     if (CurVersion < MUState.getCurVersion() || !MUState.tryStartReoptimize()) {
         SendResult(Error::success());
@@ -167,12 +198,23 @@ void ReOptimizeLayer::rt_reoptimize(SendErrorFn SendResult,
     }
 
     ThreadSafeModule TSM = cloneToNewContext(MUState.getThreadSafeModule());
+#ifdef LOG
+    std::string FunctionName;
+    TSM.withModuleDo([&](Module &M) {
+        for (auto &F : M)
+            if (!F.isDeclaration()) {
+                FunctionName = F.getName().str();
+                break;
+            }
+    });
+#endif
     auto OldRT = MUState.getResourceTracker();
     auto &JD = OldRT->getJITDylib();
 
     if (auto Err = ReOptFunc(*this, MUID, CurVersion + 1, OldRT, TSM)) {
         ES.reportError(std::move(Err));
         MUState.reoptimizeFailed();
+        LOG_REOPTIMIZE(false);
         SendResult(Error::success());
         return;
     }
@@ -182,6 +224,7 @@ void ReOptimizeLayer::rt_reoptimize(SendErrorFn SendResult,
     if (!SymbolDests) {
         ES.reportError(SymbolDests.takeError());
         MUState.reoptimizeFailed();
+        LOG_REOPTIMIZE(false);
         SendResult(Error::success());
         return;
     }
@@ -189,11 +232,13 @@ void ReOptimizeLayer::rt_reoptimize(SendErrorFn SendResult,
     if (auto Err = RSManager->redirect(JD, std::move(*SymbolDests))) {
         ES.reportError(std::move(Err));
         MUState.reoptimizeFailed();
+        LOG_REOPTIMIZE(false);
         SendResult(Error::success());
         return;
     }
 
     MUState.reoptimizeSucceeded();
+    LOG_REOPTIMIZE(true);
     SendResult(Error::success());
 }
 
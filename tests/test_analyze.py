@@ -0,0 +1,46 @@
+import numpy as np
+
+from benchmark import analyze
+
+
+def get_groups(groups):
+    """
+    Get the values, starts, and sizes of groups of values.
+    """
+    sizes = np.array(list(map(len, groups)), dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    return np.concatenate(list(map(lambda x: np.array(x, dtype=float), groups))), starts, sizes
+
+
+def test_bootstrap_means_resample_within_groups():
+    values, starts, sizes = get_groups([[1.0, 2.0], [10.0] * 5 + [20.0] * 95, [7.0]])
+    means = analyze.bootstrap_means(values, starts, sizes, 2000, np.random.default_rng(0))
+    assert means.shape == (2000, 3)
+    assert np.all((means[:, 0] == 1.0) | (means[:, 0] == 1.5) | (means[:, 0] == 2.0))
+    assert np.all(means[:, 2] == 7.0)
+    counts = (100 * means[:, 1] - 2000) / -10
+    assert np.allclose(counts, np.round(counts))
+    assert abs(counts.mean() - 5) < 0.2
+    assert abs(counts.var() - 100 * 0.05 * 0.95) < 0.5
+
+
+def test_bootstrap_means_do_not_depend_on_chunk():
+    values, starts, sizes = get_groups([[1.0, 2.0, 4.0], list(range(200)), [3.0, 5.0]])
+    full = analyze.bootstrap_means(values, starts, sizes, 100, np.random.default_rng(1))
+    chunked = analyze.bootstrap_means(values, starts, sizes, 100, np.random.default_rng(1), values.size * 3)
+    single = analyze.bootstrap_means(values, starts, sizes, 100, np.random.default_rng(1), 1)
+    assert np.array_equal(full, chunked)
+    assert np.array_equal(full, single)
+
+
+def test_analyze_speedup():
+    runs = {
+        "suite": np.array(["s"] * 6, dtype=object),
+        "benchmark": np.array(["b"] * 6, dtype=object),
+        "config": np.array([analyze.REFERENCE] * 3 + ["O2"] * 3, dtype=object),
+        "wall_ms": np.array([10.0, 10.0, 10.0, 5.0, 5.0, 5.0]),
+        "returncode": np.zeros(6)
+    }
+    benchmark_rows, suite_rows = analyze.analyze(runs, 100, 0)
+    assert benchmark_rows == [["s", "b", "O2", 10.0, 5.0, 2.0, 2.0, 2.0, 3, 3]]
+    assert suite_rows == [["s", "O2", 2.0, 2.0, 2.0, 1]]
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from benchmark import classes
+from benchmark import default
+
+
+RECORDS = [
+    (1, 0, 0, "Parse", "main"),
+    (2, 1, 1, "Size", "10"),
+    (3, 0, 2, "Empty", ""),
+    (4, 1, 1, "Size", "30"),
+    (5, 0, 0, "Parse", "fünf → functions"),
+    (6, 0, 2, "", "no tag"),
+]
+
+EXPECTED = {
+    (classes.LogPart.FrontEnd, "Parse"): (classes.LogType.List, [(1, "main"), (5, "fünf → functions")], 0, 0),
+    (classes.LogPart.BackEnd, "Size"): (classes.LogType.Average, [], 40, 2),
+    (classes.LogPart.Whole, "Empty"): (classes.LogType.List, [(3, "")], 0, 0),
+    (classes.LogPart.Whole, ""): (classes.LogType.List, [(6, "no tag")], 0, 0),
+}
+
+
+def pack(time, type, part, tag, data):
+    """
+    Encode a record the way the JIT writes it, see print_log_data in util/Util.h.
+    """
+    tag = tag.encode()
+    data = data.encode()
+    return default.TELEMETRY_HEADER.pack(time, type, part, len(tag), len(data)) + tag + data
+
+
+LOG = b"".join(pack(*record) for record in RECORDS)
+
+
+def get_aggregates(stream):
+    """
+    Get the aggregated data of a parser as plain values.
+    """
+    return {
+        key: (aggregate.type, aggregate.entries, aggregate.total, aggregate.count)
+        for key, aggregate in stream.aggregates.items()
+    }
+
+
+def read(log, sizes):
+    """
+    Decode a log given in chunks of the given sizes, where the last chunk is the rest of the log.
+    """
+    stream = classes.LogStream()
+    reader = default.binary_log_reader(stream)
+    offset = 0
+    for size in sizes:
+        reader(log[offset:offset + size])
+        offset += size
+    reader(log[offset:])
+    return get_aggregates(stream)
+
+
+def test_header_size():
+    assert default.TELEMETRY_HEADER.size == 16
+
+
+def test_whole_log():
+    assert read(LOG, []) == EXPECTED
+
+
+def test_single_bytes():
+    assert read(LOG, [1] * len(LOG)) == EXPECTED
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_reads(seed):
+    rng = random.Random(seed)
+    sizes = []
+    while sum(sizes) < len(LOG):
+        sizes.append(rng.randint(1, 30))
+    assert read(LOG, sizes) == EXPECTED
+
+
+def test_record_split_in_header_and_in_data():
+    second = len(pack(*RECORDS[0]))
+    assert read(LOG, [second + 5, default.TELEMETRY_HEADER.size + 2]) == EXPECTED
+
+
+def test_truncated_record_at_end():
+    last = pack(7, 0, 2, "Cut", "off")
+    for length in range(len(last)):
+        assert read(LOG + last[:length], []) == EXPECTED
+    assert read(LOG + last, []) == {
+        **EXPECTED,
+        (classes.LogPart.Whole, "Cut"): (classes.LogType.List, [(7, "off")], 0, 0)
+    }
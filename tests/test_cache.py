@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from benchmark import cache
+from benchmark import files
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    """
+    A cache in a temporary directory.
+    """
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(files, "get_cache_directory", lambda: str(directory))
+    return directory
+
+
+def make_build(tmp_path, name, contents):
+    """
+    Make a directory with compiled files.
+    """
+    build = tmp_path / name
+    build.mkdir()
+    for file, content in contents.items():
+        (build / file).write_bytes(content)
+    return str(build)
+
+
+def set_age(directory, key, age):
+    """
+    Set the time at which an entry was last used to the given number of seconds ago.
+    """
+    entry = os.path.join(directory, key)
+    used = os.path.getmtime(entry) - age
+    os.utime(entry, (used, used))
+
+
+def test_store_and_lookup(directory, tmp_path):
+    cache.store("a", make_build(tmp_path, "build", {"a.out": b"binary", "a.ll": b"ir"}), 12.5, 1 << 20)
+    target = tmp_path / "target"
+    target.mkdir()
+    assert cache.lookup("a", str(target)) == 12.5
+    assert (target / "a.out").read_bytes() == b"binary"
+    assert (target / "a.ll").read_bytes() == b"ir"
+    assert cache.lookup("b", str(target)) is None
+
+
+def test_lookup_refreshes_entry(directory, tmp_path):
+    cache.store("a", make_build(tmp_path, "build", {"a.out": b"binary"}), 1.0, 1 << 20)
+    set_age(directory, "a", 1000)
+    before = os.path.getmtime(directory / "a")
+    target = tmp_path / "target"
+    target.mkdir()
+    cache.lookup("a", str(target))
+    assert os.path.getmtime(directory / "a") > before
+
+
+def test_evict_least_recently_used_first(directory, tmp_path):
+    build = make_build(tmp_path, "build", {"a.out": b"x" * 1000})
+    for key, age in [("old", 300), ("middle", 200), ("new", 100)]:
+        cache.store(key, build, 1.0, 1 << 20)
+        set_age(directory, key, age)
+    size = cache.get_size(str(directory / "old"))
+    cache.evict(2 * size)
+    assert sorted(os.listdir(directory)) == ["middle", "new"]
+    cache.evict(size)
+    assert os.listdir(directory) == ["new"]
+
+
+def test_evict_keeps_entry_that_was_looked_up(directory, tmp_path):
+    build = make_build(tmp_path, "build", {"a.out": b"x" * 1000})
+    for key, age in [("old", 300), ("new", 100)]:
+        cache.store(key, build, 1.0, 1 << 20)
+        set_age(directory, key, age)
+    target = tmp_path / "target"
+    target.mkdir()
+    cache.lookup("old", str(target))
+    cache.evict(cache.get_size(str(directory / "old")))
+    assert os.listdir(directory) == ["old"]
+
+
+def test_store_leaves_no_temporary_directories(directory, tmp_path):
+    build = make_build(tmp_path, "build", {"a.out": b"binary"})
+    cache.store("a", build, 1.0, 1 << 20)
+    cache.store("a", make_build(tmp_path, "other", {"a.out": b"other"}), 2.0, 1 << 20)
+    assert os.listdir(directory) == ["a"]
+    assert (directory / "a" / "a.out").read_bytes() == b"binary"
+
+
+def test_store_loses_race_without_corrupting_entry(directory, tmp_path, monkeypatch):
+    rename = os.rename
+
+    def racing_rename(source, destination):
+        os.makedirs(destination)
+        with open(cache.get_metadata_file(destination), "w") as f:
+            f.write('{"files": [], "time": 3.0}')
+        rename(source, destination)
+
+    monkeypatch.setattr(cache.os, "rename", racing_rename)
+    cache.store("a", make_build(tmp_path, "build", {"a.out": b"binary"}), 1.0, 1 << 20)
+    assert os.listdir(directory) == ["a"]
+    assert cache.lookup("a", str(tmp_path)) == 3.0
+
+
+def test_lookup_ignores_incomplete_entry(directory, tmp_path):
+    (directory / "a").mkdir(parents=True)
+    assert cache.lookup("a", str(tmp_path)) is None
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from benchmark import classes
+
+
+LOG = (
+    b"[DATA,1,LIST,FRONT-END,Parse] main\n"
+    b"Some output of the program\n"
+    b"[DATA,2,AVERAGE,BACK-END,Size] 10\r\n"
+    + b"x" * 300 + b" [DATA,3,LIST,WHOLE,Fake] inside a line that is not logged data\n"
+    b"[DAT is not logged data either\n"
+    b"[DATA,4,AVERAGE,BACK-END,Size] 30\n"
+    b"\n"
+    b"[DATA,5,LIST,FRONT-END,Parse] helper function\n"
+    b"[DATA,6,LIST,WHOLE,Empty]\n"
+    + b"y" * 50 + b"\n"
+    b"[DATA,7,LIST,WHOLE,End] last line without a newline"
+)
+
+EXPECTED = {
+    (classes.LogPart.FrontEnd, "Parse"): (classes.LogType.List, [(1, "main"), (5, "helper function")], 0, 0),
+    (classes.LogPart.BackEnd, "Size"): (classes.LogType.Average, [], 40, 2),
+    (classes.LogPart.Whole, "Empty"): (classes.LogType.List, [(6, "")], 0, 0),
+    (classes.LogPart.Whole, "End"): (classes.LogType.List, [(7, "last line without a newline")], 0, 0),
+}
+
+
+def get_aggregates(stream):
+    """
+    Get the aggregated data of a parser as plain values.
+    """
+    return {
+        key: (aggregate.type, aggregate.entries, aggregate.total, aggregate.count)
+        for key, aggregate in stream.aggregates.items()
+    }
+
+
+def parse(log, sizes):
+    """
+    Parse a log given in chunks of the given sizes, where the last chunk is the rest of the log.
+    """
+    stream = classes.LogStream()
+    offset = 0
+    for size in sizes:
+        stream.feed(log[offset:offset + size])
+        offset += size
+    stream.feed(log[offset:])
+    stream.close()
+    return get_aggregates(stream)
+
+
+def test_whole_log():
+    assert parse(LOG, []) == EXPECTED
+
+
+def test_single_bytes():
+    assert parse(LOG, [1] * len(LOG)) == EXPECTED
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunks(seed):
+    rng = random.Random(seed)
+    sizes = []
+    while sum(sizes) < len(LOG):
+        sizes.append(rng.randint(1, 40))
+    assert parse(LOG, sizes) == EXPECTED
+
+
+def test_record_split_across_chunks():
+    split = LOG.index(b"Size] 30") + 3
+    assert parse(LOG, [split]) == EXPECTED
+
+
+def test_skipping_line_longer_than_chunk():
+    stream = classes.LogStream()
+    stream.feed(b"not logged ")
+    assert stream.skipping
+    stream.feed(b"[DATA,1,LIST,WHOLE,Fake] still the same line")
+    assert stream.skipping
+    stream.feed(b"\n[DATA,2,LIST,WHOLE,Real] ")
+    assert not stream.skipping
+    stream.feed(b"data\n")
+    stream.close()
+    assert get_aggregates(stream) == {(classes.LogPart.Whole, "Real"): (classes.LogType.List, [(2, "data")], 0, 0)}
+
+
+def test_partial_trailing_line():
+    stream = classes.LogStream()
+    stream.feed(b"[DATA,1,AVERAGE,WHOLE,Count] 5\n[DATA,2,AVERAGE,WHOLE,Count] 7")
+    assert get_aggregates(stream)[(classes.LogPart.Whole, "Count")][2:] == (5, 1)
+    stream.close()
+    assert get_aggregates(stream)[(classes.LogPart.Whole, "Count")][2:] == (12, 2)
+
+
+def test_partial_trailing_line_that_is_not_logged_data():
+    stream = classes.LogStream()
+    stream.feed(b"[DATA,1,LIST,WHOLE,Line] a\n[DAT")
+    stream.close()
+    assert get_aggregates(stream) == {(classes.LogPart.Whole, "Line"): (classes.LogType.List, [(1, "a")], 0, 0)}
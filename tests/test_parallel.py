@@ -0,0 +1,116 @@
+import pytest
+
+from benchmark import classes
+from benchmark import environment
+from benchmark import parallel
+
+
+GROUPS = [[0, 1, 2], [3, 4], [5, 6, 7, 8]]
+
+
+class FakePlan:
+    """
+    A plan that drops the given cells, and records which cells are skipped, cancelled, and finished.
+    """
+    def __init__(self, dropped):
+        self.dropped = set(dropped)
+        self.skipped = []
+        self.cancelled = []
+        self.finished = []
+
+    def skip(self, index):
+        if index in self.dropped:
+            self.skipped.append(index)
+            return True
+        return False
+
+    def cancel(self, index):
+        self.cancelled.append(index)
+
+    def finish(self, index):
+        self.finished.append(index)
+
+
+@pytest.fixture(params=[1, 2], ids=["serial", "pool"])
+def workers(request, monkeypatch):
+    """
+    The number of workers, where the pool pins every worker to the first core so that it also runs on a single core.
+    """
+    core = min(parallel.os.sched_getaffinity(0))
+    monkeypatch.setattr(parallel, "get_core_sets", lambda count: [[core] for _ in range(count)])
+    return request.param
+
+
+def run(workers, stop, plan=None, order=None):
+    return list(parallel.run_groups(GROUPS, lambda index: index * 10, stop, workers, 1, plan, order))
+
+
+def test_groups_in_order(workers):
+    assert run(workers, lambda results: False) == [[0, 10, 20], [30, 40], [50, 60, 70, 80]]
+
+
+def test_groups_in_order_when_started_out_of_order(workers):
+    assert run(workers, lambda results: False, order=[2, 0, 1]) == [[0, 10, 20], [30, 40], [50, 60, 70, 80]]
+
+
+def test_stop_cuts_off_group(workers):
+    plan = FakePlan([])
+    assert run(workers, lambda results: len(results) == 2, plan) == [[0, 10], [30, 40], [50, 60]]
+    assert sorted(plan.cancelled) == [2, 7, 8]
+    assert sorted(plan.finished) == [0, 1, 3, 4, 5, 6]
+
+
+def test_plan_accounts_for_every_cell(workers):
+    plan = FakePlan([1, 4, 6])
+    assert run(workers, lambda results: len(results) == 2, plan) == [[0, 20], [30], [50, 70]]
+    assert sorted(plan.skipped) == [1, 4, 6]
+    assert sorted(plan.cancelled) == [8]
+    assert sorted(plan.finished) == [0, 2, 3, 5, 7]
+    cells = plan.skipped + plan.cancelled + plan.finished
+    assert sorted(cells) == list(range(9))
+
+
+def get_cells():
+    """
+    Get the cells of two benchmarks with the reference implementation and two configurations of the JIT, compiled three
+    times each, grouped on the rows of the csv files when a single iteration happens within a compilation.
+    """
+    groups = []
+    position = 0
+    for benchmark in ["a", "b"]:
+        for jit, back_end in [(False, None), (True, classes.Args("O1", "-O1")), (True, classes.Args("O2", "-O2"))]:
+            groups.append([classes.Cell(jit, benchmark, None, back_end, j, position + j) for j in range(3)])
+            position += 3
+    return groups
+
+
+def test_interleaving_is_reproducible():
+    cells = [cell for group in get_cells() for cell in group]
+    order = environment.get_interleaving(cells, 42)
+    assert order == environment.get_interleaving(cells, 42)
+    assert sorted(order) == list(range(len(cells)))
+    assert any(environment.get_interleaving(cells, seed) != order for seed in range(5))
+
+
+def test_interleaving_runs_rounds_in_order():
+    cells = [cell for group in get_cells() for cell in group]
+    order = environment.get_interleaving(cells, 7)
+    ran = [(cells[index].source_directory, cells[index].recompilation) for index in order]
+    assert ran == sorted(ran)
+
+
+def test_interleaved_serial_run_gives_rows_in_csv_order():
+    groups = get_cells()
+    cells = [cell for group in groups for cell in group]
+    indices = [[cell.position for cell in group] for group in groups]
+    ran = []
+
+    def execute(index):
+        ran.append(index)
+        return index
+
+    for seed in range(10):
+        ran.clear()
+        order = environment.get_interleaving(cells, seed)
+        assert list(parallel.run_serial(indices, execute, lambda results: False, None, order)) == indices
+        assert ran == order
@@ -0,0 +1,206 @@
+import os
+import random
+import sqlite3
+import sys
+import types
+
+import pytest
+
+from benchmark import classes
+from benchmark import common
+from benchmark import files
+from benchmark import results
+from benchmark import shard
+
+
+PREFIX = "llvm/suite"
+
+BENCHMARKS = ["a", "b/c", "d"]
+
+BACK_ENDS = [classes.Args("O1", "-O1"), classes.Args("O2", "-O2")]
+
+RECOMPILATIONS = 3
+
+
+def get_groups():
+    """
+    Get the cells of each row of a suite when a single iteration happens within a compilation.
+    """
+    component_data = types.SimpleNamespace(
+        for_reference=lambda: True,
+        for_jit=lambda: True,
+        front_end_args=[classes.Args("None", "")],
+        back_end_args=BACK_ENDS
+    )
+    return common.get_groups(BENCHMARKS, component_data, True, RECOMPILATIONS)
+
+
+def spawn(command, telemetry=None, telemetry_fd=None):
+    """
+    Pretend to run a command, with resources that only depend on the command, and log data for the telemetry.
+    """
+    seed = sum(map(ord, " ".join(command)))
+    if telemetry is not None:
+        telemetry.feed(f"[DATA,{seed},LIST,BACK-END,Compile] {command[1]}\n".encode())
+        telemetry.close()
+    return classes.Measurement(command, 0, b"", b"", seed * 1000, seed, seed, seed, 1, 0, 2, 3, telemetry)
+
+
+def run_cell(cell):
+    """
+    Run a cell the way common.measure_cell does.
+    """
+    name, extra_base = common.get_row_name(PREFIX, cell)
+    config = cell.back_end_args.name if cell.jit else "reference"
+    extra = f"{cell.recompilation}"
+    return [common.run_command(
+        name,
+        ["run", cell.source_directory, config, str(cell.recompilation)],
+        cell.recompilation == 0,
+        lambda _, process: [str(process.wall_ns)],
+        f"{extra_base},\"{extra}\"" if cell.jit else extra,
+        extra_base,
+        extra=extra
+    )]
+
+
+@pytest.fixture
+def use_database(monkeypatch):
+    """
+    Switch the harness to another results database, as if it was started with the given arguments.
+    """
+    monkeypatch.setattr(common.timing, "spawn", spawn)
+
+    def __temp__(database, arguments):
+        monkeypatch.setattr(files, "get_results_file", lambda: str(database))
+        monkeypatch.setattr(results, "connection", None)
+        monkeypatch.setattr(results, "run_id", None)
+        monkeypatch.setattr(sys, "argv", ["run.py"] + arguments)
+    return __temp__
+
+
+def store(cells):
+    """
+    Run and store cells in the current results database, and close it.
+    """
+    for cell in cells:
+        results.store_cell(PREFIX, cell, run_cell(cell))
+    run = results.get_run()
+    results.get_connection().close()
+    return run
+
+
+def read_files(directory):
+    """
+    Get the contents of the csv files in a directory.
+    """
+    contents = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "r") as f:
+            contents[name] = f.read()
+    return contents
+
+
+def export(database, run, directory):
+    """
+    Export the csv files of a run.
+    """
+    c = results.connect(str(database))
+    results.export_csv(c, run, str(directory))
+    c.close()
+    return read_files(directory)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5])
+def test_assign_covers_every_unit_once(count):
+    rng = random.Random(count)
+    costs = [rng.uniform(0.1, 10) for _ in range(40)]
+    assigned = shard.assign(costs, count)
+    assert len(assigned) == len(costs)
+    assert all(0 <= x < count for x in assigned)
+    loads = [sum(cost for cost, x in zip(costs, assigned) if x == i) for i in range(count)]
+    assert abs(sum(loads) - sum(costs)) < 1e-9
+    assert max(loads) <= sum(costs) / count + max(costs)
+    assert shard.assign(costs, count) == assigned
+
+
+@pytest.mark.parametrize("whole_groups", [False, True])
+def test_select_groups_covers_every_cell_once(whole_groups):
+    groups = get_groups()
+    selected = []
+    for index in range(3):
+        options = types.SimpleNamespace(shard=(index, 3), shard_costs=None)
+        shard_groups = shard.select_groups(groups, PREFIX, options, whole_groups, 1)
+        if whole_groups:
+            assert all(group in groups for group in shard_groups)
+        selected += [cell.position for group in shard_groups for cell in group]
+    assert sorted(selected) == [cell.position for group in groups for cell in group]
+
+
+def test_split_arguments():
+    assert shard.split_arguments("-f llvm --shard 1/4 -j 'a b'") == ("-f llvm -j 'a b'", (1, 4))
+    assert shard.split_arguments("--shard=0/2 -f llvm") == ("-f llvm", (0, 2))
+    assert shard.split_arguments("-f llvm") == ("-f llvm", None)
+
+
+def test_merge_offsets_overlapping_ids(tmp_path, use_database):
+    groups = get_groups()
+    cells = [cell for group in groups for cell in group]
+    databases = [tmp_path / "0.sqlite", tmp_path / "1.sqlite"]
+    use_database(databases[0], ["-f", "llvm"])
+    store(cells[:2])
+    for index, database in enumerate(databases):
+        use_database(database, ["-f", "llvm", "--shard", f"{index}/2"])
+        store(cells[index::2])
+    base_arguments, shard_runs = shard.get_shard_runs(list(map(str, databases)))
+    assert base_arguments == "-f llvm"
+    assert list(map(lambda x: x[1], shard_runs)) == [2, 1]
+    target = tmp_path / "merged" / "results.sqlite"
+    merged_run = shard.merge_databases(str(target), base_arguments, shard_runs)
+    c = sqlite3.connect(target)
+    rows = c.execute(
+        "SELECT r.id, r.benchmark, r.back_end, r.recompilation, r.position, r.wall_ns, j.wall_ms, t.value, k.value "
+        "FROM results r JOIN journal j ON j.result_id = r.id JOIN telemetry t ON t.result_id = r.id "
+        "LEFT JOIN counters k ON k.result_id = r.id WHERE r.run_id = ? ORDER BY r.id",
+        (merged_run,)
+    ).fetchall()
+    assert c.execute("SELECT COUNT(*) FROM results").fetchone()[0] == len(cells)
+    assert c.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == len(cells)
+    assert c.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0] == len(cells)
+    c.close()
+    assert sorted(map(lambda x: x[4], rows)) == list(range(len(cells)))
+    assert len(set(map(lambda x: x[0], rows))) == len(cells)
+    for _, benchmark, back_end, recompilation, position, wall_ns, wall_ms, telemetry, counter in rows:
+        cell = cells[position]
+        assert (benchmark, recompilation) == (cell.source_directory, cell.recompilation)
+        assert back_end == (cell.back_end_args.name if cell.jit else "")
+        assert wall_ms == wall_ns / 1_000_000
+        assert telemetry.endswith(cell.source_directory)
+        assert counter is None
+
+
+def test_merged_csv_equals_single_machine(tmp_path, use_database):
+    groups = get_groups()
+    cells = [cell for group in groups for cell in group]
+    single = tmp_path / "single.sqlite"
+    use_database(single, ["-f", "llvm"])
+    shuffled = cells[:]
+    random.Random(0).shuffle(shuffled)
+    single_run = store(shuffled)
+    expected = export(single, single_run, tmp_path / "single")
+    assert set(expected) == {"time_data_reference.csv", "other_data_reference.csv", "time_data_jit.csv", "other_data_jit.csv"}
+    assert len(expected["time_data_jit.csv"].splitlines()) == len(BENCHMARKS) * len(BACK_ENDS)
+
+    databases = [tmp_path / "0.sqlite", tmp_path / "1.sqlite"]
+    split_rows = 0
+    for index, database in enumerate(databases):
+        use_database(database, ["-f", "llvm", "--shard", f"{index}/2"])
+        options = types.SimpleNamespace(shard=(index, 2), shard_costs=None)
+        shard_groups = shard.select_groups(groups, PREFIX, options, False, 1)
+        split_rows += sum(map(lambda x: len(x) != RECOMPILATIONS, shard_groups))
+        store(reversed([cell for group in shard_groups for cell in group]))
+    assert split_rows != 0
+    base_arguments, shard_runs = shard.get_shard_runs(list(map(str, databases)))
+    target = tmp_path / "merged" / "results.sqlite"
+    merged_run = shard.merge_databases(str(target), base_arguments, shard_runs)
+    assert export(target, merged_run, tmp_path / "merged_csv") == expected
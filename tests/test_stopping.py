@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+from benchmark import stopping
+
+
+def get_sample_count(samples, statistic, precision, minimum, maximum):
+    """
+    Get the number of samples after which the stopping rule stops, when the samples are taken one after the other.
+    """
+    for count in range(1, len(samples) + 1):
+        if stopping.should_stop(samples[:count], statistic, precision, minimum, maximum):
+            return count
+    return None
+
+
+def test_t_quantile():
+    assert stopping.t_quantile(1) == 12.706
+    assert stopping.t_quantile(2) == 4.303
+    assert stopping.t_quantile(30) == 2.042
+    assert stopping.t_quantile(31) == 2.021
+    assert stopping.t_quantile(60) == 2.000
+    assert stopping.t_quantile(120) == 1.980
+    assert stopping.t_quantile(121) == 1.960
+
+
+def test_mean_interval():
+    mean, lower, upper = stopping.mean_interval([1.0, 2.0, 3.0])
+    half = 4.303 / math.sqrt(3)
+    assert mean == 2.0
+    assert lower == pytest.approx(2.0 - half)
+    assert upper == pytest.approx(2.0 + half)
+
+
+def test_median_interval():
+    samples = [float(x) for x in [7, 3, 9, 1, 5, 10, 2, 8, 4, 6]]
+    assert stopping.median_interval(samples) == (5.5, 2.0, 10.0)
+    assert stopping.median_interval([4.0, 1.0, 3.0, 2.0]) == (2.5, 1.0, 4.0)
+    assert stopping.median_interval([3.0, 1.0, 2.0]) == (2.0, 1.0, 3.0)
+
+
+def test_relative_width():
+    assert stopping.relative_width([1.0], "mean") == math.inf
+    assert stopping.relative_width([2.0, 2.0, 2.0], "mean") == 0.0
+    assert stopping.relative_width([-1.0, 1.0], "mean") == math.inf
+    assert stopping.relative_width([1.0, 2.0, 3.0], "mean") == pytest.approx(2 * 4.303 / math.sqrt(3) / 2)
+    assert stopping.relative_width([4.0, 1.0, 3.0, 2.0], "median") == pytest.approx(3 / 2.5)
+
+
+@pytest.mark.parametrize("statistic", stopping.get_statistics())
+def test_constant_samples_stop_at_minimum(statistic):
+    assert get_sample_count([10.0] * 20, statistic, 0.01, 5, 20) == 5
+
+
+@pytest.mark.parametrize("statistic", stopping.get_statistics())
+def test_zero_precision_runs_to_maximum(statistic):
+    assert get_sample_count([10.0, 11.0] * 20, statistic, 0.0, 3, 15) == 15
+
+
+@pytest.mark.parametrize("statistic", stopping.get_statistics())
+def test_stops_once_precise(statistic):
+    samples = [100.0 + (i % 5 - 2) for i in range(50)]
+    count = get_sample_count(samples, statistic, 0.02, 3, 50)
+    assert 3 < count < 50
+    assert stopping.relative_width(samples[:count], statistic) <= 0.02
+    assert stopping.relative_width(samples[:count - 1], statistic) > 0.02
@@ -0,0 +1,43 @@
+import pytest
+
+from benchmark import classes
+from benchmark import common
+
+
+def get_pairs(args):
+    """
+    Get the names and arguments of the configurations of the back-end.
+    """
+    return [(x.name, x.args) for x in args]
+
+
+def test_thread_args_keeps_in_place_configurations():
+    args = [classes.Args("O1", "-O1"), classes.Args("None", "")]
+    assert get_pairs(common.thread_args(args, [1, 4])) == [
+        ("O1", "-O1"),
+        ("None", ""),
+        ("O1-j1", "-O1 -threads=1"),
+        ("O1-j4", "-O1 -threads=4"),
+        ("None-j1", "-threads=1"),
+        ("None-j4", "-threads=4")
+    ]
+    assert get_pairs(common.thread_args(args, [])) == get_pairs(args)
+
+
+def test_standard_arguments_do_not_sweep_threads():
+    assert all("-threads=" not in args.args for args in common.back_end_args("recomp"))
+
+
+def test_parse_thread_counts():
+    assert common.parse_thread_counts("4,1,2,2", 8) == [1, 2, 4]
+
+
+def test_parse_thread_counts_skips_more_than_cores(capsys):
+    assert common.parse_thread_counts("1,2,4", 2) == [1, 2]
+    assert "Skipped 4 threads" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("threads", ["", "1,,2", "0", "two"])
+def test_parse_thread_counts_rejects_invalid(threads):
+    with pytest.raises(SystemExit):
+        common.parse_thread_counts(threads, 8)
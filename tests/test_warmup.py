@@ -0,0 +1,57 @@
+import itertools
+import random
+
+from benchmark import warmup
+
+
+def get_cost(series, changepoints, penalty):
+    """
+    Get the cost of a segmentation, the sum of the squared deviations of each segment from its mean plus the penalty
+    for each segment.
+    """
+    bounds = [0] + changepoints + [len(series)]
+    cost = 0.0
+    for start, end in zip(bounds, bounds[1:]):
+        segment = series[start:end]
+        mean = sum(segment) / len(segment)
+        cost += sum((x - mean) ** 2 for x in segment) + penalty
+    return cost
+
+
+def get_brute_force(series, penalty, min_size):
+    """
+    Get the cost of the best segmentation by trying every set of changepoints with segments of at least min_size.
+    """
+    n = len(series)
+    best = None
+    for count in range(n // min_size):
+        for changepoints in itertools.combinations(range(min_size, n - min_size + 1), count):
+            bounds = (0,) + changepoints + (n,)
+            if any(end - start < min_size for start, end in zip(bounds, bounds[1:])):
+                continue
+            cost = get_cost(series, list(changepoints), penalty)
+            if best is None or cost < best:
+                best = cost
+    return best
+
+
+def test_changepoints_are_optimal():
+    rng = random.Random(0)
+    for _ in range(500):
+        n = rng.randint(4, 14)
+        series = [rng.choice([1.0, 5.0, 10.0]) + rng.gauss(0, 1) for _ in range(n)]
+        penalty = rng.uniform(0.5, 20)
+        min_size = rng.randint(1, 3)
+        changepoints = warmup.get_changepoints(series, penalty, min_size)
+        bounds = [0] + changepoints + [n]
+        assert all(end - start >= min_size for start, end in zip(bounds, bounds[1:]))
+        assert abs(get_cost(series, changepoints, penalty) - get_brute_force(series, penalty, min_size)) < 1e-6
+
+
+def test_classify_warmup():
+    rng = random.Random(1)
+    series = [100 + rng.gauss(0, 1) for _ in range(5)] + [50 + rng.gauss(0, 1) for _ in range(25)]
+    kind, start, steady, _ = warmup.classify(series, 15, 0.02)
+    assert kind == "warmup"
+    assert start == 5
+    assert abs(steady - 50) < 1
@@ -0,0 +1,125 @@
+#include "llvm/ADT/SmallString.h"
+#include "llvm/ADT/StringExtras.h"
+#include "llvm/Bitcode/BitcodeReader.h"
+#include "llvm/Bitcode/BitcodeWriter.h"
+#include "llvm/Support/CachePruning.h"
+#include "llvm/Support/FileSystem.h"
+#include "llvm/Support/Path.h"
+#include "llvm/Support/SHA1.h"
+#include "llvm/Support/raw_ostream.h"
+#include "llvm/TargetParser/Host.h"
+
+#include "DiskObjectCache.h"
+#include "Util.h"
+
+const char *DiskObjectCache::Prefix = "llvmcache-";
+
+DiskObjectCache::DiskObjectCache(std::string Directory, const llvm::orc::JITTargetMachineBuilder &JTMB,
+                                 uint64_t MaxSize, bool Cold)
+        : Directory(std::move(Directory)), MaxSize(MaxSize), Cold(Cold) {
+    PRINT_ERROR(llvm::sys::fs::create_directories(this->Directory), "The directory of the object cache could not be created.")
+    // The target machine builder of the JIT leaves the cpu to the default, which is the host.
+    std::string cpu = JTMB.getCPU().empty() ? llvm::sys::getHostCPUName().str() : JTMB.getCPU();
+    this->Salt = JTMB.getTargetTriple().str() + '\0' + cpu + '\0' + JTMB.getFeatures().getString() + '\0' +
+                 std::to_string(static_cast<int>(JTMB.getCodeGenOptLevel()));
+}
+
+DiskObjectCache::~DiskObjectCache() {
+    llvm::CachePruningPolicy policy;
+    policy.Interval = std::chrono::seconds(0);
+    policy.Expiration = std::chrono::seconds(0);
+    policy.MaxSizePercentageOfAvailableSpace = 0;
+    policy.MaxSizeBytes = this->MaxSize;
+    llvm::pruneCache(this->Directory, policy);
+}
+
+std::string DiskObjectCache::getKey(const llvm::Module &M, llvm::StringRef Pipeline) {
+    llvm::SmallVector<char, 0> bitcode;
+    llvm::raw_svector_ostream os(bitcode);
+    llvm::WriteBitcodeToFile(M, os);
+    llvm::SHA1 hasher;
+    hasher.update(this->Salt);
+    // The pipeline only determines the result of an optimization, an object only depends on the module and the target.
+    hasher.update(Pipeline);
+    hasher.update(llvm::StringRef(bitcode.data(), bitcode.size()));
+    return llvm::toHex(hasher.final(), true);
+}
+
+std::string DiskObjectCache::getPath(const std::string &Key, llvm::StringRef Extension) {
+    llvm::SmallString<256> path(this->Directory);
+    llvm::sys::path::append(path, Prefix + Key + Extension);
+    return path.str().str();
+}
+
+void DiskObjectCache::write(const std::string &Key, llvm::StringRef Extension, llvm::StringRef Data) {
+    // Write to a temporary file first, so that a concurrent run of the JIT never reads a partially written file.
+    int fd;
+    llvm::SmallString<256> temporary;
+    llvm::SmallString<256> model(this->Directory);
+    llvm::sys::path::append(model, "tmp-%%%%%%%%%%%%" + Extension);
+    if (llvm::sys::fs::createUniqueFile(model, fd, temporary))
+        return;
+    {
+        llvm::raw_fd_ostream os(fd, true);
+        os << Data;
+        os.close();
+        if (os.has_error()) {
+            os.clear_error();
+            llvm::sys::fs::remove(temporary);
+            return;
+        }
+    }
+    if (llvm::sys::fs::rename(temporary, this->getPath(Key, Extension)))
+        llvm::sys::fs::remove(temporary);
+}
+
+void DiskObjectCache::notifyObjectCompiled(const llvm::Module *M, llvm::MemoryBufferRef Obj) {
+    std::string key;
+    {
+        std::lock_guard<std::mutex> lock(this->Mutex);
+        auto pending = this->Pending.find(M);
+        if (pending != this->Pending.end()) {
+            key = std::move(pending->second);
+            this->Pending.erase(pending);
+        }
+    }
+    if (key.empty())
+        key = this->getKey(*M, "");
+    this->write(key, ".o", Obj.getBuffer());
+}
+
+std::unique_ptr<llvm::MemoryBuffer> DiskObjectCache::getObject(const llvm::Module *M) {
+    auto key = this->getKey(*M, "");
+    if (!this->Cold) {
+        auto buffer = llvm::MemoryBuffer::getFile(this->getPath(key, ".o"), false, false);
+        if (buffer)
+            return std::move(*buffer);
+    }
+    std::lock_guard<std::mutex> lock(this->Mutex);
+    this->Pending[M] = std::move(key);
+    return nullptr;
+}
+
+std::unique_ptr<llvm::Module> DiskObjectCache::getOptimizedModule(const llvm::Module &M, llvm::StringRef Pipeline,
+                                                                  std::string &Key) {
+    Key = this->getKey(M, Pipeline);
+    if (this->Cold)
+        return nullptr;
+    auto buffer = llvm::MemoryBuffer::getFile(this->getPath(Key, ".bc"), false, false);
+    if (!buffer)
+        return nullptr;
+    auto optimized = llvm::parseBitcodeFile((*buffer)->getMemBufferRef(), M.getContext());
+    if (!optimized) {
+        llvm::consumeError(optimized.takeError());
+        return nullptr;
+    }
+    (*optimized)->setModuleIdentifier(M.getModuleIdentifier());
+    return std::move(*optimized);
+}
+
+void DiskObjectCache::notifyModuleOptimized(const std::string &Key, const llvm::Module &M) {
+    llvm::SmallVector<char, 0> bitcode;
+    llvm::raw_svector_ostream os(bitcode);
+    llvm::WriteBitcodeToFile(M, os);
+    this->write(Key, ".bc", llvm::StringRef(bitcode.data(), bitcode.size()));
+}
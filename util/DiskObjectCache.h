@@ -0,0 +1,79 @@
+#ifndef JIT_DISKOBJECTCACHE_H
+#define JIT_DISKOBJECTCACHE_H
+
+#include "llvm/ADT/DenseMap.h"
+#include "llvm/ExecutionEngine/ObjectCache.h"
+#include "llvm/ExecutionEngine/Orc/JITTargetMachineBuilder.h"
+#include "llvm/IR/Module.h"
+#include "llvm/Support/MemoryBuffer.h"
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <string>
+
+/**
+ * An object cache that persists the optimized modules and compiled objects on disk, so that work done by an earlier run
+ * of the JIT is loaded instead of done again. An optimized module is keyed on the hash of the bitcode of the module
+ * before it is optimized, the target, and the pass pipeline, so a hit skips the optimization. An object is keyed on the
+ * hash of the bitcode of the compiled module and the target, so a hit skips the code generation. The least recently used
+ * files are removed when the cache exceeds its size.
+ */
+class DiskObjectCache : public llvm::ObjectCache {
+private:
+    std::string Directory;
+    std::string Salt;
+    uint64_t MaxSize;
+    bool Cold;
+    std::mutex Mutex;
+    llvm::DenseMap<const llvm::Module*, std::string> Pending;
+
+    std::string getKey(const llvm::Module &M, llvm::StringRef Pipeline);
+    std::string getPath(const std::string &Key, llvm::StringRef Extension);
+    void write(const std::string &Key, llvm::StringRef Extension, llvm::StringRef Data);
+public:
+    /**
+     * The prefix of the files of the cache, which is needed to prune them.
+     */
+    static const char *Prefix;
+
+    /**
+     * The constructor for the cache.
+     * @param Directory The directory to store the objects in, which is created if it does not exist.
+     * @param JTMB The target machine builder, which gives the target the objects are compiled for.
+     * @param MaxSize The maximum size of the cache in bytes.
+     * @param Cold If the cache should only be written and not read, so that every module is compiled as on a cold cache.
+     */
+    DiskObjectCache(std::string Directory, const llvm::orc::JITTargetMachineBuilder &JTMB, uint64_t MaxSize, bool Cold);
+    /**
+     * The destructor, which prunes the cache to its maximum size.
+     */
+    ~DiskObjectCache() override;
+    /**
+     * Store a compiled object of a module in the cache.
+     * @param M The module that was compiled.
+     * @param Obj The compiled object.
+     */
+    void notifyObjectCompiled(const llvm::Module *M, llvm::MemoryBufferRef Obj) override;
+    /**
+     * Load the compiled object of a module from the cache.
+     * @param M The module to compile.
+     * @return The compiled object, or nullptr if it is not in the cache.
+     */
+    std::unique_ptr<llvm::MemoryBuffer> getObject(const llvm::Module *M) override;
+    /**
+     * Load the optimized version of a module from the cache.
+     * @param M The module to optimize.
+     * @param Pipeline The pass pipeline that optimizes the module.
+     * @param Key The key of the module, which is set so that the optimized module can be stored without hashing it again.
+     * @return The optimized module in the context of M, or nullptr if it is not in the cache.
+     */
+    std::unique_ptr<llvm::Module> getOptimizedModule(const llvm::Module &M, llvm::StringRef Pipeline, std::string &Key);
+    /**
+     * Store an optimized module in the cache.
+     * @param Key The key that was given by getOptimizedModule for the module before it was optimized.
+     * @param M The optimized module.
+     */
+    void notifyModuleOptimized(const std::string &Key, const llvm::Module &M);
+};
+
+#endif //JIT_DISKOBJECTCACHE_H
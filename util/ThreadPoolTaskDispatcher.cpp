@@ -0,0 +1,60 @@
+#include "ThreadPoolTaskDispatcher.h"
+
+/**
+ * If the current thread is one of the threads of a pool.
+ */
+static thread_local bool is_pool_thread = false;
+
+ThreadPoolTaskDispatcher::ThreadPoolTaskDispatcher(uint64_t Threads) {
+    for (uint64_t i = 0; i < Threads; i++)
+        this->Threads.emplace_back([this] { this->work(); });
+}
+
+ThreadPoolTaskDispatcher::~ThreadPoolTaskDispatcher() {
+    this->shutdown();
+}
+
+void ThreadPoolTaskDispatcher::work() {
+    is_pool_thread = true;
+    while (true) {
+        std::unique_ptr<llvm::orc::Task> task;
+        {
+            std::unique_lock<std::mutex> lock(this->Mutex);
+            this->Available.wait(lock, [this] { return !this->Tasks.empty() || !this->Running; });
+            if (this->Tasks.empty())
+                return;
+            task = std::move(this->Tasks.front());
+            this->Tasks.pop_front();
+        }
+        task->run();
+        task.reset();
+        std::lock_guard<std::mutex> lock(this->Mutex);
+        if (--this->Outstanding == 0)
+            this->Finished.notify_all();
+    }
+}
+
+void ThreadPoolTaskDispatcher::dispatch(std::unique_ptr<llvm::orc::Task> T) {
+    if (!is_pool_thread) {
+        std::lock_guard<std::mutex> lock(this->Mutex);
+        if (this->Running) {
+            this->Tasks.push_back(std::move(T));
+            this->Outstanding++;
+            this->Available.notify_one();
+            return;
+        }
+    }
+    T->run();
+}
+
+void ThreadPoolTaskDispatcher::shutdown() {
+    {
+        std::unique_lock<std::mutex> lock(this->Mutex);
+        this->Finished.wait(lock, [this] { return this->Outstanding == 0; });
+        this->Running = false;
+        this->Available.notify_all();
+    }
+    for (auto &thread : this->Threads)
+        if (thread.joinable())
+            thread.join();
+}
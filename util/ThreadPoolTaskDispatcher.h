@@ -0,0 +1,51 @@
+#ifndef JIT_THREADPOOLTASKDISPATCHER_H
+#define JIT_THREADPOOLTASKDISPATCHER_H
+
+#include "llvm/ExecutionEngine/Orc/TaskDispatch.h"
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+/**
+ * A task dispatcher that runs the tasks of the execution session, such as the materialization of modules, on a fixed
+ * number of threads, so that lazy compilation and optimization run concurrently with the program and with each other.
+ * A task that is dispatched by one of the threads of the pool is run in place, as a materialization can block on a
+ * lookup that needs another materialization, which would otherwise wait for a free thread forever.
+ */
+class ThreadPoolTaskDispatcher : public llvm::orc::TaskDispatcher {
+private:
+    std::vector<std::thread> Threads;
+    std::deque<std::unique_ptr<llvm::orc::Task>> Tasks;
+    std::mutex Mutex;
+    std::condition_variable Available;
+    std::condition_variable Finished;
+    size_t Outstanding = 0;
+    bool Running = true;
+
+    void work();
+public:
+    /**
+     * The constructor for the dispatcher.
+     * @param Threads The number of threads to run the tasks on.
+     */
+    explicit ThreadPoolTaskDispatcher(uint64_t Threads);
+    /**
+     * The destructor, which shuts the pool down if the execution session did not.
+     */
+    ~ThreadPoolTaskDispatcher() override;
+    /**
+     * Run a task on the pool, or in place if it is dispatched by the pool itself or the pool is shut down.
+     * @param T The task to run.
+     */
+    void dispatch(std::unique_ptr<llvm::orc::Task> T) override;
+    /**
+     * Wait until all dispatched tasks have finished, and stop the threads of the pool.
+     */
+    void shutdown() override;
+};
+
+#endif //JIT_THREADPOOLTASKDISPATCHER_H
@@ -4,6 +4,8 @@
 #include <filesystem>
 #include <getopt.h>
 #include <numeric>
+#include <cerrno>
+#include <unistd.h>
 
 #include "Util.h"
 
@@ -24,18 +26,66 @@ char const *log_part_name[] =
         };
 #undef X
 
+/**
+ * The file descriptor to write the binary log data to, or -1 if it is printed to the console.
+ */
+static int telemetry_fd = -1;
+/**
+ * The binary log data that is not yet written.
+ */
+static std::vector<char> telemetry_buffer;
+/**
+ * The size at which the buffer of binary log data is written.
+ */
+static const size_t telemetry_buffer_size = 1 << 16;
+/**
+ * The mutex guarding the log data, so that log data of different threads is not interleaved.
+ */
+static std::mutex log_mutex;
+
+/**
+ * Add a value to the buffer of binary log data in the native byte order.
+ * @tparam T The type of the value.
+ * @param value The value to add.
+ */
+template<typename T>
+static void append_telemetry(T value) {
+    auto bytes = reinterpret_cast<const char *>(&value);
+    telemetry_buffer.insert(telemetry_buffer.end(), bytes, bytes + sizeof(T));
+}
+
+/**
+ * Write the buffer of binary log data to the file descriptor, the log mutex must be held.
+ */
+static void write_telemetry() {
+    size_t written = 0;
+    while (written < telemetry_buffer.size()) {
+        auto r = write(telemetry_fd, telemetry_buffer.data() + written, telemetry_buffer.size() - written);
+        if (r < 0) {
+            if (errno == EINTR)
+                continue;
+            break;
+        }
+        written += r;
+    }
+    telemetry_buffer.clear();
+}
+
 /**
  * A ir compiler to include time spend compiling.
  */
 class LogCompiler : public llvm::orc::ConcurrentIRCompiler {
+private:
+    llvm::ObjectCache *ObjCache;
 public:
     /**
-     * The constructor for the compiler.
+     * The constructor for the compiler. The cache is not given to the base compiler, so that looking up and storing an
+     * object, which hashes the module, is not part of the logged compile time.
      * @param JTMB The target machine builder.
      * @param ObjCache The cache for objects.
      */
     explicit LogCompiler(llvm::orc::JITTargetMachineBuilder JTMB, llvm::ObjectCache *ObjCache = nullptr)
-            : llvm::orc::ConcurrentIRCompiler(JTMB, ObjCache) {}
+            : llvm::orc::ConcurrentIRCompiler(JTMB), ObjCache(ObjCache) {}
 
     /**
      * Compile a module.
@@ -43,6 +93,16 @@ public:
      * @return The compiled module.
      */
     llvm::Expected<std::unique_ptr<llvm::MemoryBuffer>> operator()(llvm::Module &M) override {
+        if (this->ObjCache != nullptr) {
+            auto start = std::chrono::high_resolution_clock::now();
+            auto cached = this->ObjCache->getObject(&M);
+            auto end = std::chrono::high_resolution_clock::now();
+            auto elapsed = std::chrono::duration<double,std::milli>(end-start).count();
+            print_log_data("Cache", LogType::List, LogPart::BackEnd, M.getModuleIdentifier() + " Compile" +
+                           (cached ? " hit " : " miss ") + std::to_string(elapsed));
+            if (cached)
+                return std::move(cached);
+        }
         auto start = std::chrono::high_resolution_clock::now();
         auto r = llvm::orc::ConcurrentIRCompiler::operator()(M);
         auto end = std::chrono::high_resolution_clock::now();
@@ -57,6 +117,8 @@ public:
         if (compile.empty())
             compile = "print_main_entry_time";
         print_log_data("Compile", LogType::List, LogPart::BackEnd, M.getModuleIdentifier() + " " + compile + " " + std::to_string(elapsed));
+        if (r && this->ObjCache != nullptr)
+            this->ObjCache->notifyObjectCompiled(&M, (*r)->getMemBufferRef());
         return r;
     }
 };
@@ -84,24 +146,24 @@ public:
     void notifyLoaded(llvm::orc::MaterializationResponsibility &MR) override {
         auto now = std::chrono::system_clock::now();
         auto duration = now.time_since_epoch();
-        auto millis = std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
+        auto micros = std::chrono::duration_cast<std::chrono::microseconds>(duration).count();
         print_log_data(
                 "Begin_Linking",
                 LogType::List,
                 LogPart::BackEnd,
-                getSymbols(MR) + " " + std::to_string(millis)
+                getSymbols(MR) + " " + std::to_string(micros)
         );
     }
 
     llvm::Error notifyEmitted(llvm::orc::MaterializationResponsibility &MR) override {
         auto now = std::chrono::system_clock::now();
         auto duration = now.time_since_epoch();
-        auto millis = std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
+        auto micros = std::chrono::duration_cast<std::chrono::microseconds>(duration).count();
         print_log_data(
                 "End_Linking",
                 LogType::List,
                 LogPart::BackEnd,
-                getSymbols(MR) + " " + std::to_string(millis)
+                getSymbols(MR) + " " + std::to_string(micros)
         );
         return llvm::Error::success();
     }
@@ -125,8 +187,8 @@ public:
 void print_main_entry_time() {
     std::chrono::time_point<std::chrono::system_clock> now = std::chrono::system_clock::now();
     auto duration = now.time_since_epoch();
-    auto millis = std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
-    print_log_data("Main_Entry", LogType::List, LogPart::Whole, std::to_string(millis));
+    auto micros = std::chrono::duration_cast<std::chrono::microseconds>(duration).count();
+    print_log_data("Main_Entry", LogType::List, LogPart::Whole, std::to_string(micros));
 }
 
 bool is_number(const std::string& s)
@@ -138,9 +200,37 @@ bool is_number(const std::string& s)
 void print_log_data(const std::string& tag, LogType type, LogPart part, const std::string& data) {
     auto now = std::chrono::system_clock::now();
     auto duration = now.time_since_epoch();
-    auto millis = std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
-    std::cout << "[DATA," << millis << "," << log_type_name[type] << "," << log_part_name[part] << "," << tag << "] " << " "
-              << data << std::endl;
+    auto micros = std::chrono::duration_cast<std::chrono::microseconds>(duration).count();
+    std::lock_guard<std::mutex> lock(log_mutex);
+    if (telemetry_fd < 0) {
+        std::cout << "[DATA," << micros << "," << log_type_name[type] << "," << log_part_name[part] << "," << tag << "] " << " "
+                  << data << std::endl;
+        return;
+    }
+    append_telemetry<uint64_t>(micros);
+    append_telemetry<uint8_t>(type);
+    append_telemetry<uint8_t>(part);
+    append_telemetry<uint16_t>(tag.size());
+    append_telemetry<uint32_t>(data.size());
+    telemetry_buffer.insert(telemetry_buffer.end(), tag.begin(), tag.end());
+    telemetry_buffer.insert(telemetry_buffer.end(), data.begin(), data.end());
+    if (telemetry_buffer.size() >= telemetry_buffer_size)
+        write_telemetry();
+}
+
+void set_telemetry_fd(int fd) {
+    std::lock_guard<std::mutex> lock(log_mutex);
+    telemetry_fd = fd;
+    if (fd >= 0) {
+        telemetry_buffer.reserve(telemetry_buffer_size);
+        std::atexit(flush_log_data);
+    }
+}
+
+void flush_log_data() {
+    std::lock_guard<std::mutex> lock(log_mutex);
+    if (telemetry_fd >= 0)
+        write_telemetry();
 }
 
 std::vector<std::string> split(const std::string& string, const char delimiter) {
@@ -164,11 +254,12 @@ struct Arguments getArguments(int argc, char **argv) {
             .Files = {},
             .FrontEndArguments = "",
             .BackEndArguments = "",
-            .ApplicationArguments = ""
+            .ApplicationArguments = "",
+            .TelemetryFd = -1
     };
     int character;
     while (true) {
-        character = getopt(argc, argv, "i:r:b:a:");
+        character = getopt(argc, argv, "i:r:b:a:t:");
         if (character == -1)
             break;
 
@@ -185,6 +276,13 @@ struct Arguments getArguments(int argc, char **argv) {
             case 'a':
                 arguments.ApplicationArguments = optarg;
                 break;
+            case 't':
+                PRINT_ERROR(
+                        !is_number(optarg),
+                        "Invalid file descriptor for the log data: " << optarg
+                )
+                arguments.TelemetryFd = std::stoi(optarg);
+                break;
             default:
                 std::cerr << "Invalid argument given." << std::endl;
                 exit(-1);
@@ -20,6 +20,7 @@
 #include <utility>
 #include <vector>
 #include <chrono>
+#include <mutex>
 
 
 #define PRINT_ERROR(condition, message) PRINT_ERROR_FULL(condition, {}, message)
@@ -58,6 +59,10 @@ struct Arguments {
      * The arguments for the application.
      */
     std::string ApplicationArguments;
+    /**
+     * The file descriptor to write the log data to in the binary format, or -1 to print it to the console.
+     */
+    int TelemetryFd;
 };
 
 #define LOG_TYPES     \
@@ -84,8 +89,8 @@ enum LogPart : size_t
 #undef X
 
 /**
- * Print the current time as part of a log which can be used for getting the time the entry point of an application
- * was called.
+ * Print the current time in microseconds as part of a log which can be used for getting the time the entry point of an
+ * application was called.
  */
 void print_main_entry_time();
 
@@ -97,7 +102,10 @@ void print_main_entry_time();
 bool is_number(const std::string& s);
 
 /**
- * Print data to the console.
+ * Print data to the console, or add it to the buffer of the binary log data if a file descriptor for it is set. The
+ * time of the log is given in microseconds since the epoch. A binary record consists of the time as an uint64_t, the
+ * type and part as an uint8_t each, the length of the tag as an uint16_t, and the length of the data as an uint32_t,
+ * all in the native byte order, followed by the tag and the data.
  * @param tag A tag for the data to group the data by.
  * @param type The type of the data.
  * @param part The part of the jit for which the log is.
@@ -105,6 +113,18 @@ bool is_number(const std::string& s);
  */
 void print_log_data(const std::string& tag, LogType type, LogPart part, const std::string& data);
 
+/**
+ * Write the log data in the binary format to a file descriptor instead of printing it to the console. The data is
+ * buffered, and the buffer is written when it is full and when the application exits.
+ * @param fd The file descriptor to write to, or -1 to print to the console.
+ */
+void set_telemetry_fd(int fd);
+
+/**
+ * Write the buffered binary log data to the file descriptor.
+ */
+void flush_log_data();
+
 /**
  * Split the string based on a delimiter.
  * @param string The string to split.